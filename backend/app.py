@@ -1,18 +1,22 @@
 from __future__ import annotations
 
-from manager import ProcurementManager
-from printer import Printer
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session
+from manager import ProcurementManager, COMPLIANCE_PAGE_SIZE
+from printer import make_printer
+from inventory_cache import InventoryCache
+from storage import get_store, SkuConflictError
+from streaming import iterate_events, format_sse, format_ndjson
+from inventory_import import parse_pages, import_frames
+from schema_inference import iter_frames
+from pdf_extract import extract_pages
+from jobs import get_job_queue, job_handler, TERMINAL_STATUSES, JOB_STREAM_MAX_SECONDS, JOB_STREAM_POLL_INTERVAL
+from plan_cache import action_plans
+from image_proxy import get_image_proxy, ImageProxyError, THUMBNAIL_MAX_AGE
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, Response
 from flask_cors import CORS
 import os
 from werkzeug.utils import secure_filename
-import json
+import time
 from datetime import datetime
-from typing import List, Dict
-import pandas as pd
-import PyPDF2
-import io
-from openai import OpenAI
 from dotenv import load_dotenv
 from working_agents.market_intelligence_agent import market_intelligence_agent, MarketIntelligence
 from agents import Runner, FileSearchTool, custom_span, gen_trace_id, trace, ItemHelpers, Agent
@@ -26,23 +30,9 @@ load_dotenv()
 if not os.getenv('OPENAI_API_KEY'):
     raise ValueError("OPENAI_API_KEY environment variable is not set")
 
-# Load shared inventory data
-def load_inventory_data():
-    try:
-        file_path = os.path.join(os.path.dirname(__file__), 'shared_data/inventory.json')
-        print(f"Loading inventory data from: {file_path}")  # Debug print
-        
-        if not os.path.exists(file_path):
-            print(f"Error: File not found at {file_path}")  # Debug print
-            return {"items": []}
-            
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            print(f"Successfully loaded {len(data.get('items', []))} items")  # Debug print
-            return data
-    except Exception as e:
-        print(f"Error loading inventory data: {str(e)}")  # Debug print
-        return {"items": []}
+# Shared SQLite store; the inventory cache reloads whenever any worker mutates it
+store = get_store()
+inventory_cache = InventoryCache(store)
 
 app = Flask(__name__)
 # Enable CORS for all routes with all origins
@@ -78,7 +68,7 @@ async def search():
     if request.method == 'POST':
         query = request.form['query']
         action = request.form.get('action')
-        printer = Printer()
+        printer = make_printer()
         manager = ProcurementManager(printer)
         
         # Set compliance file ID from session if available
@@ -96,6 +86,8 @@ async def search():
             elif action == 'search':
                 # Second step - run actual search with selected websites
                 selected_websites = request.form.getlist('websites')
+                if request.form.get('async'):
+                    return submit_search_job(query, selected_websites)
                 results = await manager.run(query, selected_websites)
                 return render_template('search.html',
                                      query=query,
@@ -107,7 +99,7 @@ async def search():
 
 @app.route('/api/compliance', methods=['GET', 'POST'])
 async def compliance():
-    printer = Printer()
+    printer = make_printer()
     manager = ProcurementManager(printer)
     message = None
     message_type = None
@@ -119,53 +111,121 @@ async def compliance():
                                      message='No file selected', 
                                      message_type='error')
             
-            file = request.files['file']
-            if file.filename == '':
+            files = [f for f in request.files.getlist('file') if f.filename]
+            if not files:
                 return render_template('compliance.html', 
                                      message='No file selected', 
                                      message_type='error')
 
-            if file:
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-
-                try:
-                    # Add timestamp when uploading the file
-                    upload_time = datetime.now().timestamp()
-                    
-                    # Upload file and add to vector store
-                    file_id = await manager.upload_compliance_doc(filepath, upload_time)
-                    session['compliance_file_id'] = file_id
-                    
+            try:
+                # Add timestamp when uploading the files
+                upload_time = datetime.now().timestamp()
+                
+                # Upload files straight from the request and add them to the vector store
+                result = await manager.ingest_compliance_docs(
+                    [(secure_filename(f.filename), f.stream) for f in files],
+                    upload_time
+                )
+                if result['files']:
+                    session['compliance_file_id'] = result['files'][-1]['file_id']
+                
+                if result['failed']:
+                    message = (f"Uploaded {len(result['files'])} of {len(files)} files; failed: "
+                               + ', '.join(f['filename'] for f in result['failed']))
+                    message_type = 'error'
+                else:
                     message = 'File uploaded successfully and added to vector store!'
                     message_type = 'success'
-                except Exception as e:
-                    message = f'Error uploading file: {str(e)}'
-                    message_type = 'error'
-                finally:
-                    # Clean up the temporary file
-                    os.remove(filepath)
+            except Exception as e:
+                message = f'Error uploading file: {str(e)}'
+                message_type = 'error'
 
-        # Get list of compliance files
-        compliance_files = await manager.list_compliance_files()
-        
-        # Ensure each file in compliance_files has an upload_time
-        if compliance_files:
-            for file in compliance_files:
-                if 'upload_time' not in file:
-                    file['upload_time'] = datetime.now().timestamp()  # Default to current time if not set
+        # Get one page of compliance files (?refresh=1 re-reads the whole remote listing)
+        try:
+            page = await manager.page_compliance_files(
+                cursor=request.args.get('cursor'),
+                purpose=request.args.get('purpose', 'assistants'),
+                refresh=bool(request.args.get('refresh'))
+            )
+        except ValueError:
+            page = await manager.page_compliance_files(purpose='assistants')
         
         return render_template('compliance.html', 
-                             compliance_files=compliance_files,
+                             compliance_files=page['files'],
+                             next_cursor=page['next_cursor'],
                              message=message,
                              message_type=message_type)
     finally:
         printer.end()
 
+@app.route('/api/compliance_files', methods=['GET'])
+async def compliance_files():
+    """Cursor-paginated compliance files: ?limit=&cursor=&purpose=&status=&q=&refresh="""
+    manager = ProcurementManager(make_printer())
+    
+    try:
+        page = await manager.page_compliance_files(
+            limit=request.args.get('limit', COMPLIANCE_PAGE_SIZE, type=int),
+            cursor=request.args.get('cursor'),
+            purpose=request.args.get('purpose'),
+            status=request.args.get('status'),
+            q=request.args.get('q'),
+            refresh=bool(request.args.get('refresh'))
+        )
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        manager.printer.end()
+
+@app.route('/api/compliance/upload_batch', methods=['POST'])
+async def upload_compliance_batch():
+    """Upload several compliance documents at once; indexing continues in the background"""
+    manager = ProcurementManager(make_printer())
+    
+    try:
+        files = [f for f in request.files.getlist('files') if f.filename]
+        if not files:
+            return jsonify({"error": "No files provided"}), 400
+        
+        result = await manager.ingest_compliance_docs(
+            [(secure_filename(f.filename), f.stream) for f in files],
+            datetime.now().timestamp()
+        )
+        if not result['files']:
+            return jsonify(result), 500
+        session['compliance_file_id'] = result['files'][-1]['file_id']
+        if result['batch_id'] is None:
+            # Every file was a duplicate of one already indexed
+            return jsonify(result)
+        result['status_url'] = url_for('compliance_batch_status', batch_id=result['batch_id'])
+        return jsonify(result), 202
+    except Exception as e:
+        print(f"Error in batch upload: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        manager.printer.end()
+
+@app.route('/api/compliance/batches/<batch_id>', methods=['GET'])
+async def compliance_batch_status(batch_id):
+    manager = ProcurementManager(make_printer())
+    
+    try:
+        status = await manager.compliance_batch_status(
+            batch_id,
+            include_files=request.args.get('files', '1') != '0'
+        )
+        return jsonify(status)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        manager.printer.end()
+
 @app.route('/api/view_file/<file_id>')
 async def view_file(file_id):
-    printer = Printer()
+    printer = make_printer()
     manager = ProcurementManager(printer)
     
     try:
@@ -178,19 +238,13 @@ async def view_file(file_id):
 
 @app.route('/api/delete_file/<file_id>', methods=['POST'])
 async def delete_file(file_id):
-    printer = Printer()
+    printer = make_printer()
     manager = ProcurementManager(printer)
     
     try:
-        # Get vector store ID
-        vector_store_id = await manager.get_or_create_vector_store()
-        
         # First remove file from vector store
         try:
-            await manager.client.vector_stores.files.delete(
-                vector_store_id=vector_store_id,
-                file_id=file_id
-            )
+            await manager.remove_from_vector_store(file_id)
         except Exception as e:
             print(f"Error removing file from vector store: {str(e)}")
         
@@ -210,16 +264,10 @@ async def delete_file(file_id):
 
 @app.route('/api/orders')
 def orders():
-    # TODO: In the future, fetch orders from your database
-    mock_orders = [
-        {
-            'id': 1,
-            'created_at': datetime.now(),
-            'status': 'Pending',
-            'items_count': 0  # Changed to use items_count instead of items list
-        }
-    ]
-    return render_template('orders.html', orders=mock_orders)
+    order_list = store.list_orders()
+    for order in order_list:
+        order['created_at'] = datetime.fromtimestamp(order['created_at'])
+    return render_template('orders.html', orders=order_list)
 
 @app.route('/api/order/new')
 def create_order():
@@ -227,32 +275,30 @@ def create_order():
 
 @app.route('/api/order/<int:order_id>')
 def view_order(order_id):
-    # TODO: In the future, fetch order from your database
-    # For now, we'll use mock data
-    mock_order = {
-        'id': order_id,
-        'items': [
-            {
-                'product_name': 'Sample Product',
-                'manufacturer_id': 'MFG123',
-                'packaging': 'Box',
-                'unit_of_measure': 'Pieces',
-                'quantity': 10
-            }
-        ]
-    }
-    return render_template('order_detail.html', order=mock_order)
+    order = store.get_order(order_id)
+    if order is None:
+        return render_template('order_detail.html', order=None), 404
+    return render_template('order_detail.html', order=order)
 
 @app.route('/api/order/save', methods=['POST'])
 def save_order():
     try:
         data = request.get_json()
-        # TODO: In the future, save order to your database
-        # For now, we'll just return success
+        order_id = store.save_order(
+            data.get('items', []),
+            status=data.get('status', 'Pending'),
+            order_id=data.get('id')
+        )
         return jsonify({
             'success': True,
-            'message': 'Order saved successfully'
+            'message': 'Order saved successfully',
+            'order_id': order_id
         })
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
     except Exception as e:
         return jsonify({
             'success': False,
@@ -261,7 +307,7 @@ def save_order():
 
 @app.route('/api/plan_search', methods=['POST'])
 async def plan_search():
-    printer = Printer()
+    printer = make_printer()
     manager = ProcurementManager(printer)
     
     try:
@@ -280,7 +326,7 @@ async def plan_search():
 
 @app.route('/api/run_search', methods=['POST'])
 async def run_search():
-    printer = Printer()
+    printer = make_printer()
     manager = ProcurementManager(printer)
     
     try:
@@ -291,6 +337,9 @@ async def run_search():
         query = data['query']
         websites = data['websites']
         
+        if data.get('async'):
+            return submit_search_job(query, websites)
+        
         results = await manager.run(query, websites)
         return jsonify(results)
     except Exception as e:
@@ -299,9 +348,131 @@ async def run_search():
     finally:
         printer.end()
 
+@app.route('/api/run_search/stream', methods=['GET', 'POST'])
+def run_search_stream():
+    """
+    Stream search progress and results as Server-Sent Events, or as NDJSON
+    when requested with ?format=ndjson or an application/x-ndjson Accept header.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        query = data.get('query')
+        websites = data.get('websites')
+    else:
+        query = request.args.get('query')
+        websites = request.args.getlist('websites')
+
+    if not query or not websites:
+        return jsonify({'error': 'Missing query or websites'}), 400
+
+    use_ndjson = (request.args.get('format') == 'ndjson'
+                  or 'application/x-ndjson' in request.headers.get('Accept', ''))
+    encode = format_ndjson if use_ndjson else format_sse
+    compliance_file_id = session.get('compliance_file_id')
+
+    def generate():
+        printer = make_printer()
+        manager = ProcurementManager(printer)
+        manager._compliance_file_id = compliance_file_id
+        try:
+            for event in iterate_events(lambda: manager.run_streamed(query, websites)):
+                yield encode(event)
+        finally:
+            printer.end()
+
+    return Response(
+        generate(),
+        mimetype='application/x-ndjson' if use_ndjson else 'text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@job_handler('search')
+async def run_search_job(params, printer):
+    """Background version of /api/run_search"""
+    manager = ProcurementManager(printer)
+    manager._compliance_file_id = params.get('compliance_file_id')
+    return await manager.run(params['query'], params['websites'])
+
+def submit_search_job(query, websites):
+    job_id = get_job_queue().submit('search', {
+        'query': query,
+        'websites': websites,
+        'compliance_file_id': session.get('compliance_file_id')
+    })
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id),
+        'events_url': url_for('job_events', job_id=job_id)
+    }), 202
+
+@app.route('/api/jobs/search', methods=['POST'])
+def create_search_job():
+    data = request.get_json(silent=True)
+    if not data or 'query' not in data or 'websites' not in data:
+        return jsonify({'error': 'Missing query or websites'}), 400
+    return submit_search_job(data['query'], data['websites'])
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = store.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    job.pop('params', None)
+    job.pop('owner_pid', None)
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Progress events after ?after=<seq>. With ?stream=1 (or an event-stream
+    Accept header) the events are pushed as SSE until the job finishes, or
+    for at most JOB_STREAM_MAX_SECONDS, ending with a 'reconnect' event that
+    carries the seq to resume after.
+    """
+    if store.get_job(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    after = request.args.get('after', 0, type=int)
+
+    if not (request.args.get('stream') or 'text/event-stream' in request.headers.get('Accept', '')):
+        return jsonify({'events': store.job_events(job_id, after)})
+
+    def generate():
+        last_seq = after
+        deadline = time.monotonic() + JOB_STREAM_MAX_SECONDS
+        while True:
+            for event in store.job_events(job_id, last_seq):
+                last_seq = event['seq']
+                yield format_sse(event)
+            job = store.get_job(job_id)
+            if job is None or job['status'] in TERMINAL_STATUSES:
+                status = job['status'] if job else 'expired'
+                yield format_sse({'type': 'complete', 'status': status})
+                return
+            if time.monotonic() >= deadline:
+                # Free the worker thread; the client picks up where it left off
+                yield format_sse({'type': 'reconnect', 'after': last_seq})
+                return
+            time.sleep(JOB_STREAM_POLL_INTERVAL)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    if get_job_queue().cancel(job_id):
+        return jsonify({'success': True, 'message': 'Cancellation requested'})
+    return jsonify({'success': False, 'message': 'Job not found or already finished'}), 404
+
 @app.route('/api/check_compliance', methods=['POST'])
 async def check_compliance():
-    printer = Printer()
+    printer = make_printer()
     manager = ProcurementManager(printer)
     
     try:
@@ -341,8 +512,14 @@ async def check_compliance():
 @app.route('/api/inventory')
 def inventory():
     try:
-        inventory_data = load_inventory_data()
-        return jsonify(inventory_data['items'])
+        category = request.args.get('category')
+        sku = request.args.get('sku')
+        if sku:
+            item = inventory_cache.get_by_sku(sku)
+            return jsonify([item] if item else [])
+        if category:
+            return Response(inventory_cache.category_json(category), mimetype='application/json')
+        return Response(inventory_cache.items_json(), mimetype='application/json')
     except Exception as e:
         print(f"Error in inventory endpoint: {str(e)}")  # Debug print
         return jsonify({"error": str(e)}), 500
@@ -351,11 +528,16 @@ def inventory():
 def add_inventory_item():
     try:
         data = request.get_json()
-        # TODO: Add item to database
+        if not data:
+            return jsonify({'success': False, 'message': 'No item provided'}), 400
+        item_ids = store.upsert_items([data])
         return jsonify({
             'success': True,
-            'message': 'Item added successfully'
+            'message': 'Item added successfully',
+            'id': item_ids[0]
         })
+    except SkuConflictError as e:
+        return jsonify({'success': False, 'message': str(e)}), 409
     except Exception as e:
         return jsonify({
             'success': False,
@@ -366,11 +548,16 @@ def add_inventory_item():
 def update_inventory_item(item_code):
     try:
         data = request.get_json()
-        # TODO: Update item in database
+        item = store.update_item(item_code, data or {})
+        if item is None:
+            return jsonify({'success': False, 'message': 'Item not found'}), 404
         return jsonify({
             'success': True,
-            'message': 'Item updated successfully'
+            'message': 'Item updated successfully',
+            'item': item
         })
+    except SkuConflictError as e:
+        return jsonify({'success': False, 'message': str(e)}), 409
     except Exception as e:
         return jsonify({
             'success': False,
@@ -380,7 +567,8 @@ def update_inventory_item(item_code):
 @app.route('/api/inventory/delete/<item_code>', methods=['DELETE'])
 def delete_inventory_item(item_code):
     try:
-        # TODO: Delete item from database
+        if not store.delete_item(item_code):
+            return jsonify({'success': False, 'message': 'Item not found'}), 404
         return jsonify({
             'success': True,
             'message': 'Item deleted successfully'
@@ -394,18 +582,13 @@ def delete_inventory_item(item_code):
 @app.route('/api/inventory/item/<item_id>')
 def inventory_item(item_id):
     try:
-        print(f"Received request for item ID: {item_id}")  # Debug print
-        inventory_data = load_inventory_data()
-        print(f"Loaded inventory data with {len(inventory_data.get('items', []))} items")  # Debug print
-        
-        item = next((item for item in inventory_data['items'] if item['id'] == item_id), None)
+        item_json = inventory_cache.get_json(item_id)
         
-        if item is None:
+        if item_json is None:
             print(f"Item not found with ID: {item_id}")  # Debug print
             return jsonify({'error': 'Item not found'}), 404
             
-        print(f"Found item: {item['name']}")  # Debug print
-        return jsonify(item)
+        return Response(item_json, mimetype='application/json')
     except Exception as e:
         print(f"Error in inventory_item endpoint: {str(e)}")  # Debug print
         return jsonify({"error": str(e)}), 500
@@ -423,124 +606,56 @@ async def upload_inventory():
         return jsonify({'success': False, 'message': 'Invalid file type'})
 
     try:
-        # Add debug prints
-        print(f"Current working directory: {os.getcwd()}")
-        print(f"Upload folder path: {app.config['UPLOAD_FOLDER']}")
-        print(f"Upload folder exists: {os.path.exists(app.config['UPLOAD_FOLDER'])}")
-        print(f"Attempting to upload file: {file.filename}")
-        
-        # Create uploads directory if it doesn't exist
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        # Save file temporarily
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        print(f"Full file path: {filepath}")
+        file_ext = filename.rsplit('.', 1)[1].lower()
+        print(f"Processing uploaded file: {filename}")
         
-        file.save(filepath)
-        print(f"File saved successfully: {os.path.exists(filepath)}")
+        printer = make_printer()
+
+        def report_progress(completed, total):
+            # total stays None while chunks are still being read
+            of_total = f"/{total}" if total is not None else ""
+            printer.update_item(
+                "parsing",
+                f"Parsed {completed}{of_total} chunks of {filename}",
+                is_done=total is not None and completed == total
+            )
 
-        # Process file based on type
-        file_ext = filename.rsplit('.', 1)[1].lower()
+        # Read straight from the upload's spooled stream instead of saving a copy
+        try:
+            if file_ext == 'pdf':
+                # Pages are extracted in a process pool and parsed as they arrive
+                pages = extract_pages(file.stream)
+                parsed = await parse_pages(pages, on_progress=report_progress)
+            else:
+                # Handle CSV/Excel chunk by chunk: map columns locally, falling back to GPT
+                frames = iter_frames(file.stream, file_ext)
+                parsed = await import_frames(frames, on_progress=report_progress)
+        finally:
+            printer.end()
+        items = parsed['items']
         
-        if file_ext == 'pdf':
-            text_content = extract_pdf_text(filepath)
-            items = await process_text_with_gpt(text_content)
-        else:
-            # Handle CSV/Excel
-            if file_ext in ['csv']:
-                df = pd.read_csv(filepath)
-            else:  # xlsx or xls
-                df = pd.read_excel(filepath)
-            items = await process_dataframe_with_gpt(df.to_json(orient='records'))
-
-        # Clean up the temporary file
-        if os.path.exists(filepath):
-            os.remove(filepath)
-            print("Temporary file removed successfully")
+        # Persist the parsed rows in one transaction
+        item_ids = store.upsert_items(items)
         
         # Return both success status and processed items
+        message = 'File processed successfully'
+        if parsed['failed_chunks']:
+            message = f"File processed with {len(parsed['failed_chunks'])} of {parsed['chunks']} chunks failing to parse"
         return jsonify({
             'success': True, 
-            'message': 'File processed successfully',
-            'items': items
+            'message': message,
+            'items': items,
+            'item_ids': item_ids,
+            'chunks': parsed['chunks'],
+            'failed_chunks': parsed['failed_chunks'],
+            'method': parsed.get('method', 'llm')
         })
 
     except Exception as e:
         print(f"Error during file processing: {str(e)}")
-        # Clean up the temporary file if it exists
-        if 'filepath' in locals() and os.path.exists(filepath):
-            os.remove(filepath)
         return jsonify({'success': False, 'message': str(e)})
 
-def extract_pdf_text(filepath):
-    text = ""
-    with open(filepath, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        for page in reader.pages:
-            text += page.extract_text()
-    return text
-
-async def process_text_with_gpt(text):
-    """Process extracted text with GPT to identify inventory items"""
-    prompt = f"""
-    Parse the following text and return a JSON object containing an 'items' array. Each item in the array should have these exact fields:
-    - product_name: The name of the product
-    - item_code: The product's unique identifier
-    - unit_size: The size per unit (e.g., "100/box")
-    - unit_type: The type of unit (e.g., "box", "case", "each")
-    - current_stock: The current quantity in stock (as a number)
-    - reorder_level: The minimum stock level before reordering (as a number)
-    
-    Use reasonable default values for any fields that cannot be determined.
-    Your response must be a valid JSON object.
-    
-    Text to parse:
-    {text}
-    """
-    
-    response = OpenAI().chat.completions.create(
-        model="gpt-4o-mini-2024-07-18",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant that parses inventory documents and returns JSON. Your response must be a valid JSON object with an 'items' array."},
-            {"role": "user", "content": prompt}
-        ],
-        response_format={ "type": "json_object" }
-    )
-    
-    result = json.loads(response.choices[0].message.content)
-    return result.get('items', [])
-
-async def process_dataframe_with_gpt(json_data):
-    """Process structured data with GPT to standardize format"""
-    prompt = f"""
-    Convert the following inventory data into a JSON object containing an 'items' array.
-    Each item must have these exact fields:
-    - product_name
-    - item_code (if available)
-    - unit_size
-    - unit_type
-    - current_stock
-    - reorder_level
-    
-    Your response must be a valid JSON object.
-    
-    Data to process:
-    {json_data}
-    """
-    
-    response = OpenAI().chat.completions.create(
-        model="gpt-4o-mini-2024-07-18",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant that standardizes inventory data into JSON format. Your response must be a valid JSON object with an 'items' array."},
-            {"role": "user", "content": prompt}
-        ],
-        response_format={ "type": "json_object" }
-    )
-    
-    result = json.loads(response.choices[0].message.content)
-    return result.get('items', [])
-
 @app.route('/api/send_rfq', methods=['POST'])
 async def send_rfq():
     try:
@@ -557,12 +672,21 @@ async def send_rfq():
         # In a real implementation, you would:
         # 1. Format the content properly
         # 2. Send actual emails to vendors
-        # 3. Store the RFQ in a database
         
-        # For now, we'll just simulate success
+        # For now, we'll just record the RFQ and simulate success
+        rfq_id = data.get('rfq_id') or f"RFQ_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if not store.get_rfq(rfq_id):
+            store.save_rfq({
+                'id': rfq_id,
+                'date': datetime.now().isoformat(),
+                'content': content
+            })
+        store.mark_rfq_sent(rfq_id, emails)
+        
         return jsonify({
             'success': True,
-            'message': f'RFQ sent to {len(emails)} vendors'
+            'message': f'RFQ sent to {len(emails)} vendors',
+            'rfq_id': rfq_id
         })
         
     except Exception as e:
@@ -614,13 +738,16 @@ async def create_chat_plan():
         if not message:
             return jsonify({'error': 'No message provided'}), 400
             
-        # Create action plan using chat agent
-        result = await Runner.run(chat_agent, message)
-        action_plan = result.final_output_as(ActionPlan)
+        plan = action_plans.get(message)
+        if plan is None:
+            # Create action plan using chat agent
+            result = await Runner.run(chat_agent, message)
+            plan = result.final_output_as(ActionPlan).dict()
+            action_plans.put(message, plan)
         
         return jsonify({
             'success': True,
-            'plan': action_plan.dict()
+            'plan': plan
         })
         
     except Exception as e:
@@ -636,12 +763,14 @@ async def execute_chat_plan():
         if not plan:
             return jsonify({'error': 'No plan provided'}), 400
             
-        printer = Printer()
+        printer = make_printer()
         manager = ProcurementManager(printer)
         
         try:
             # Execute the plan based on action type
             if plan['action_type'] in ['price_check', 'product_search']:
+                if data.get('async'):
+                    return submit_search_job(plan['query'], plan['websites'])
                 results = await manager.run(plan['query'], plan['websites'])
                 return jsonify({
                     'success': True,
@@ -672,7 +801,7 @@ async def search_images():
                 'message': 'Product name and website URL are required'
             }), 400
             
-        printer = Printer()
+        printer = make_printer()
         manager = ProcurementManager(printer)
         
         try:
@@ -691,6 +820,36 @@ async def search_images():
             'message': str(e)
         }), 500
 
+@app.route('/api/image_proxy', methods=['GET'])
+async def image_proxy():
+    """Serve a cached thumbnail of a remote image: ?url=<image url>&w=<width>"""
+    try:
+        thumbnail = await get_image_proxy().thumbnail(request.args.get('url', ''), request.args.get('w', type=int))
+        response = Response(thumbnail['data'], mimetype=thumbnail['content_type'])
+        response.set_etag(thumbnail['etag'])
+        response.cache_control.public = True
+        response.cache_control.max_age = THUMBNAIL_MAX_AGE
+        response.cache_control.immutable = True
+        return response.make_conditional(request)
+    except ImageProxyError as e:
+        print(f"Error proxying image: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    except Exception as e:
+        print(f"Error proxying image: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/image_info', methods=['GET'])
+async def image_info():
+    """Width, height and content type of a remote image, read from its first bytes"""
+    try:
+        info = await get_image_proxy().info(request.args.get('url', ''))
+        return jsonify({'success': True, 'result': info})
+    except ImageProxyError as e:
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    except Exception as e:
+        print(f"Error reading image info: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 if __name__ == '__main__':
     print("Starting Flask server...")  # Debug print
     app.run(host='localhost', port=5001, debug=True) 
\ No newline at end of file
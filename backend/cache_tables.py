@@ -0,0 +1,217 @@
+import json
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Bookkeeping for the on-disk caches (product pages, thumbnails, PDF text).
+# The bodies live in files; these rows hold validators, sizes and LRU order.
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_cache (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    fresh_until REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_page_cache_accessed ON page_cache(accessed_at);
+
+CREATE TABLE IF NOT EXISTS page_images (
+    page_key TEXT NOT NULL REFERENCES page_cache(key) ON DELETE CASCADE,
+    product_key TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    images TEXT NOT NULL,
+    PRIMARY KEY (page_key, product_key)
+);
+
+CREATE TABLE IF NOT EXISTS image_meta (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    content_type TEXT,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS thumbnails (
+    key TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    content_type TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (key, width)
+);
+CREATE INDEX IF NOT EXISTS idx_thumbnails_accessed ON thumbnails(accessed_at);
+
+CREATE TABLE IF NOT EXISTS pdf_texts (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pdf_texts_accessed ON pdf_texts(accessed_at);
+"""
+
+SQL_SELECT_PAGE = "SELECT * FROM page_cache WHERE key = ?"
+SQL_PUT_PAGE = """
+    INSERT INTO page_cache (key, url, digest, etag, last_modified, size, fresh_until, accessed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(key) DO UPDATE SET
+        url = excluded.url, digest = excluded.digest, etag = excluded.etag,
+        last_modified = excluded.last_modified, size = excluded.size,
+        fresh_until = excluded.fresh_until, accessed_at = excluded.accessed_at
+"""
+SQL_REVALIDATE_PAGE = "UPDATE page_cache SET fresh_until = ?, accessed_at = ? WHERE key = ?"
+SQL_TOUCH_PAGE = "UPDATE page_cache SET accessed_at = ? WHERE key = ?"
+SQL_DELETE_PAGE = "DELETE FROM page_cache WHERE key = ?"
+SQL_PAGE_CACHE_SIZE = "SELECT COALESCE(SUM(size), 0) AS size FROM page_cache"
+SQL_OLDEST_PAGES = "SELECT key, digest, size FROM page_cache ORDER BY accessed_at LIMIT ?"
+SQL_SELECT_PAGE_IMAGES = "SELECT images FROM page_images WHERE page_key = ? AND product_key = ? AND digest = ?"
+SQL_SELECT_IMAGE_META = "SELECT url, width, height, content_type FROM image_meta WHERE key = ?"
+SQL_PUT_IMAGE_META = """
+    INSERT INTO image_meta (key, url, width, height, content_type, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(key) DO UPDATE SET
+        url = excluded.url, width = excluded.width, height = excluded.height,
+        content_type = excluded.content_type, updated_at = excluded.updated_at
+"""
+SQL_SELECT_THUMBNAIL = "SELECT * FROM thumbnails WHERE key = ? AND width = ?"
+SQL_PUT_THUMBNAIL = """
+    INSERT INTO thumbnails (key, width, content_type, etag, size, accessed_at) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(key, width) DO UPDATE SET
+        content_type = excluded.content_type, etag = excluded.etag,
+        size = excluded.size, accessed_at = excluded.accessed_at
+"""
+SQL_TOUCH_THUMBNAIL = "UPDATE thumbnails SET accessed_at = ? WHERE key = ? AND width = ?"
+SQL_DELETE_THUMBNAIL = "DELETE FROM thumbnails WHERE key = ? AND width = ?"
+SQL_THUMBNAIL_CACHE_SIZE = "SELECT COALESCE(SUM(size), 0) AS size FROM thumbnails"
+SQL_OLDEST_THUMBNAILS = "SELECT key, width, size FROM thumbnails ORDER BY accessed_at LIMIT ?"
+SQL_PUT_PDF_TEXT = """
+    INSERT INTO pdf_texts (digest, size, accessed_at) VALUES (?, ?, ?)
+    ON CONFLICT(digest) DO UPDATE SET size = excluded.size, accessed_at = excluded.accessed_at
+"""
+SQL_DELETE_PDF_TEXT = "DELETE FROM pdf_texts WHERE digest = ?"
+SQL_PDF_TEXT_CACHE_SIZE = "SELECT COALESCE(SUM(size), 0) AS size FROM pdf_texts"
+SQL_OLDEST_PDF_TEXTS = "SELECT digest, size FROM pdf_texts ORDER BY accessed_at LIMIT ?"
+SQL_PUT_PAGE_IMAGES = """
+    INSERT INTO page_images (page_key, product_key, digest, images) VALUES (?, ?, ?, ?)
+    ON CONFLICT(page_key, product_key) DO UPDATE SET digest = excluded.digest, images = excluded.images
+"""
+
+
+def _evict(conn: sqlite3.Connection, max_bytes: int, batch: int, size_sql: str, oldest_sql: str,
+           delete_sql: str, key: Callable[[sqlite3.Row], Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+    """Delete the least recently used rows of one cache until its total size fits in max_bytes"""
+    evicted: List[Dict[str, Any]] = []
+    excess = conn.execute(size_sql).fetchone()['size'] - max_bytes
+    while excess > 0:
+        rows = conn.execute(oldest_sql, (batch,)).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            conn.execute(delete_sql, key(row))
+            evicted.append(dict(row))
+            excess -= row['size']
+            if excess <= 0:
+                break
+    return evicted
+
+
+class CacheTables:
+    """
+    ProcurementStore methods for the disk cache tables, kept apart from the
+    inventory, order and job tables. Relies on the store's connection() and
+    transaction().
+    """
+
+    def get_page(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(SQL_SELECT_PAGE, (key,)).fetchone()
+        return dict(row) if row else None
+
+    def put_page(self, page: Dict[str, Any]) -> None:
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(SQL_PUT_PAGE, (
+                page['key'], page['url'], page['digest'], page.get('etag'), page.get('last_modified'),
+                page['size'], page['fresh_until'], now
+            ))
+
+    def revalidate_page(self, key: str, fresh_until: float) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_REVALIDATE_PAGE, (fresh_until, time.time(), key))
+
+    def touch_page(self, key: str) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_TOUCH_PAGE, (time.time(), key))
+
+    def delete_page(self, key: str) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_DELETE_PAGE, (key,))
+
+    def evict_pages(self, max_bytes: int, batch: int = 64) -> List[Dict[str, Any]]:
+        """
+        Drop least recently used pages until the cached bodies fit in max_bytes.
+        Returns the evicted rows so the caller can remove their body files.
+        """
+        with self.transaction() as conn:
+            return _evict(conn, max_bytes, batch, SQL_PAGE_CACHE_SIZE, SQL_OLDEST_PAGES, SQL_DELETE_PAGE,
+                          lambda row: (row['key'],))
+
+    def get_page_images(self, page_key: str, product_key: str, digest: str) -> Optional[List[Dict[str, Any]]]:
+        row = self.connection().execute(SQL_SELECT_PAGE_IMAGES, (page_key, product_key, digest)).fetchone()
+        return json.loads(row['images']) if row else None
+
+    def put_page_images(self, page_key: str, product_key: str, digest: str, images: List[Dict[str, Any]]) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_PUT_PAGE_IMAGES, (page_key, product_key, digest, json.dumps(images)))
+
+    # Image proxy
+
+    def get_image_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(SQL_SELECT_IMAGE_META, (key,)).fetchone()
+        return dict(row) if row else None
+
+    def put_image_meta(self, key: str, meta: Dict[str, Any]) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_PUT_IMAGE_META, (
+                key, meta['url'], meta.get('width'), meta.get('height'), meta.get('content_type'), time.time()
+            ))
+
+    def get_thumbnail(self, key: str, width: int) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(SQL_SELECT_THUMBNAIL, (key, width)).fetchone()
+        return dict(row) if row else None
+
+    def put_thumbnails(self, key: str, thumbnails: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(SQL_PUT_THUMBNAIL, [
+                (key, t['width'], t['content_type'], t['etag'], t['size'], now) for t in thumbnails
+            ])
+
+    def touch_thumbnail(self, key: str, width: int) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_TOUCH_THUMBNAIL, (time.time(), key, width))
+
+    def delete_thumbnail(self, key: str, width: int) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_DELETE_THUMBNAIL, (key, width))
+
+    def evict_thumbnails(self, max_bytes: int, batch: int = 64) -> List[Dict[str, Any]]:
+        """Drop least recently used thumbnails until they fit in max_bytes; returns the evicted rows"""
+        with self.transaction() as conn:
+            return _evict(conn, max_bytes, batch, SQL_THUMBNAIL_CACHE_SIZE, SQL_OLDEST_THUMBNAILS,
+                          SQL_DELETE_THUMBNAIL, lambda row: (row['key'], row['width']))
+
+    # PDF text cache
+
+    def put_pdf_text(self, digest: str, size: int) -> None:
+        """Record (or mark as just used) a cached PDF text file"""
+        with self.transaction() as conn:
+            conn.execute(SQL_PUT_PDF_TEXT, (digest, size, time.time()))
+
+    def evict_pdf_texts(self, max_bytes: int, batch: int = 64) -> List[Dict[str, Any]]:
+        """Drop least recently used PDF texts until they fit in max_bytes; returns the evicted rows"""
+        with self.transaction() as conn:
+            return _evict(conn, max_bytes, batch, SQL_PDF_TEXT_CACHE_SIZE, SQL_OLDEST_PDF_TEXTS,
+                          SQL_DELETE_PDF_TEXT, lambda row: (row['digest'],))
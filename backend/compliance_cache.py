@@ -0,0 +1,93 @@
+import hashlib
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from search_cache import normalize_query, normalize_website
+from storage import ProcurementStore, get_store
+from working_agents.compliance_agent import ComplianceResult
+
+DOCSET_META_KEY = 'compliance_docset_version'
+
+# Fields that identify a manufacturer part, in the spellings our product dicts use
+_MPN_FIELDS = ('mpn', 'manufacturer_id', 'sku', 'item_code', 'model_number')
+
+
+def product_fingerprint(product: Dict[str, Any]) -> str:
+    """Stable hash of what a compliance verdict depends on: name, MPN and website"""
+    mpn = next((str(product[f]).strip().lower() for f in _MPN_FIELDS if product.get(f)), '')
+    parts = [
+        normalize_query(str(product.get('name', ''))),
+        mpn,
+        normalize_website(str(product.get('website', ''))),
+    ]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def docset_hash(file_ids: Iterable[str], nonce: Optional[float] = None) -> str:
+    """
+    Version of a compliance document set. Changes pass a nonce so the version
+    moves even if the vector store listing has not caught up yet.
+    """
+    payload = json.dumps([sorted(file_ids), nonce])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ComplianceCache:
+    """
+    Persistent compliance verdicts keyed by product fingerprint and the
+    version of the compliance document set they were checked against.
+    """
+
+    namespace = 'compliance_results'
+
+    def __init__(self, store: ProcurementStore):
+        self.store = store
+
+    def docset_version(self) -> Optional[str]:
+        return self.store.get_meta(DOCSET_META_KEY)
+
+    def init_docset_version(self, file_ids: Iterable[str]) -> str:
+        """Record the version for a fresh database, keeping one another worker already set"""
+        return self.store.set_meta(DOCSET_META_KEY, docset_hash(file_ids), overwrite=False)
+
+    def invalidate(self, file_ids: Iterable[str]) -> str:
+        """Move to a new document-set version and drop every cached verdict"""
+        version = self.store.set_meta(DOCSET_META_KEY, docset_hash(file_ids, nonce=time.time()))
+        self.store.cache_delete(self.namespace)
+        return version
+
+    def _key(self, product: Dict[str, Any], version: str) -> str:
+        return f"{version}:{product_fingerprint(product)}"
+
+    def get_many(self, products: List[Dict[str, Any]], version: str) -> List[Optional[ComplianceResult]]:
+        results: List[Optional[ComplianceResult]] = []
+        for product in products:
+            try:
+                entry = self.store.cache_get(self.namespace, self._key(product, version))
+            except Exception as e:
+                print(f"Error reading compliance cache: {str(e)}")
+                entry = None
+            if entry is None:
+                results.append(None)
+                continue
+            result = ComplianceResult(**entry[0])
+            result.product_name = product['name']
+            results.append(result)
+        return results
+
+    def put(self, product: Dict[str, Any], version: str, result: ComplianceResult) -> None:
+        try:
+            self.store.cache_put(self.namespace, self._key(product, version), result.dict())
+        except Exception as e:
+            print(f"Error writing compliance cache: {str(e)}")
+
+
+_cache: Optional[ComplianceCache] = None
+
+
+def get_compliance_cache() -> ComplianceCache:
+    global _cache
+    if _cache is None:
+        _cache = ComplianceCache(get_store())
+    return _cache
@@ -0,0 +1,174 @@
+import heapq
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import ProcurementStore, get_store
+
+PASSAGE_WORDS = int(os.getenv('COMPLIANCE_PASSAGE_WORDS', '120'))
+PASSAGE_OVERLAP = int(os.getenv('COMPLIANCE_PASSAGE_OVERLAP', '30'))
+# Passages stating requirements that go into every prompt, whatever the product
+REQUIREMENT_PASSAGES = int(os.getenv('COMPLIANCE_REQUIREMENT_PASSAGES', '5'))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_WORD = re.compile(r'\S+')
+_REQUIREMENT = re.compile(
+    r'\b(?:must|shall|required|requires|mandatory|only|prohibited|banned|not exceed|may not)\b', re.I
+)
+
+STOPWORDS = frozenset("""
+a an the and or of for to in on at by with from as is are was were be been being this that these those
+it its their there which who whom what when where how all any each other such than then so not no nor
+shall must may can will should would could has have had do does did per via into onto upon
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def split_passages(text: str, words: int = PASSAGE_WORDS, overlap: int = PASSAGE_OVERLAP) -> List[str]:
+    """Overlapping windows of `words` words, so a rule is never cut off from its context"""
+    tokens = _WORD.findall(text)
+    if not tokens:
+        return []
+    step = max(1, words - overlap)
+    passages = []
+    for start in range(0, len(tokens), step):
+        passages.append(' '.join(tokens[start:start + words]))
+        if start + words >= len(tokens):
+            break
+    return passages
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of passages, backed by an inverted index"""
+
+    def __init__(self, passages: List[Dict[str, Any]], k1: float = BM25_K1, b: float = BM25_B):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for i, passage in enumerate(passages):
+            counts = Counter(tokenize(passage['text']))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((i, tf))
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        # Per-passage length normalization is fixed, so fold it in once
+        self._norm = [k1 * (1 - b + b * length / avg_length) if avg_length else k1 for length in lengths]
+        n = len(passages)
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for i, tf in postings:
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + self._norm[i])
+        best = heapq.nlargest(k, scores.items(), key=lambda s: s[1])
+        return [{**self.passages[i], 'score': score} for i, score in best]
+
+
+def requirement_passages(passages: List[Dict[str, Any]], k: int = REQUIREMENT_PASSAGES) -> List[Dict[str, Any]]:
+    """
+    The `k` passages with the most requirement wording (must, shall, only...),
+    in document order. A product-name query rarely finds general rules such as
+    certifications or price ceilings, so these are always sent along.
+    """
+    counted = [(len(_REQUIREMENT.findall(passage['text'])), i) for i, passage in enumerate(passages)]
+    best = heapq.nlargest(k, (c for c in counted if c[0]), key=lambda c: c[0])
+    return [passages[i] for _, i in sorted(best, key=lambda c: c[1])]
+
+
+class ComplianceIndex:
+    """
+    Process-wide BM25 index over the extracted text of uploaded compliance
+    documents. It is rebuilt from the ProcurementStore whenever the stored
+    passages change, which every worker sees through the text version.
+    """
+
+    def __init__(self, store: ProcurementStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._index = BM25Index([])
+        self._requirements: List[Dict[str, Any]] = []
+
+    def _refresh(self) -> BM25Index:
+        version = self.store.compliance_text_version()
+        if version == self._version:
+            return self._index
+        with self._lock:
+            if version != self._version:
+                try:
+                    passages = self.store.compliance_passages()
+                    self._index = BM25Index(passages)
+                    self._requirements = requirement_passages(passages)
+                except Exception as e:
+                    print(f"Error building compliance index: {str(e)}")
+                self._version = version
+            return self._index
+
+    def has_documents(self) -> bool:
+        return len(self._refresh()) > 0
+
+    def covers_all_documents(self) -> bool:
+        """Whether every file in the compliance vector store has text here, so none is reachable only through file search"""
+        try:
+            return self.has_documents() and self.store.count_compliance_files_without_text() == 0
+        except Exception as e:
+            print(f"Error checking compliance index coverage: {str(e)}")
+            return False
+
+    def requirements(self) -> List[Dict[str, Any]]:
+        self._refresh()
+        return self._requirements
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        return self._refresh().search(query, k)
+
+
+def format_passages(passages: List[Dict[str, Any]]) -> str:
+    """Render retrieved passages for a compliance prompt"""
+    if not passages:
+        return "No relevant passages were found in the compliance documents."
+    return "\n\n".join(
+        f"[{i}] ({passage.get('filename') or passage['file_id']})\n{passage['text']}"
+        for i, passage in enumerate(passages, start=1)
+    )
+
+
+_index: Optional[ComplianceIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_compliance_index() -> ComplianceIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ComplianceIndex(get_store())
+    return _index
@@ -0,0 +1,330 @@
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from storage import ProcurementStore, get_store
+from working_agents.compliance_agent import ComplianceResult
+
+# 'reject_only' settles failures locally and leaves every pass to the LLM. 'screen' also
+# settles passes, but only when the extracted rules cover every requirement in the documents.
+RULES_MODE = os.getenv('COMPLIANCE_RULES_MODE', 'reject_only')
+
+PASS, UNKNOWN, FAIL = 1, 0, -1
+
+# Sentences, keeping decimal points such as $12.50 inside them
+_SENTENCE = re.compile(r'(?:[^.;\n]|(?<=\d)\.(?=\d))+')
+_REQUIREMENT = re.compile(r'\b(must|shall|required|requires|mandatory|only)\b', re.I)
+_CERTIFICATION = re.compile(
+    r'\b(ISO\s?\d{4,5}(?:[-:]\d+)?|c?GMP|FDA(?:\s510\(k\)|\s510k)?|CE\smark(?:ed)?|HIPAA|HIPPA|NIOSH|ASTM\s?[A-Z]?\d+)(?!\w)'
+)
+_BANNED_MAKERS = re.compile(
+    r'\b(?:banned|prohibited|excluded|disallowed|unapproved|not approved)\s+'
+    r'(?:manufacturers?|vendors?|suppliers?|brands?)\s*(?:include|includes|are|is|:)?\s*:?\s*([^.;\n]+)',
+    re.I
+)
+_BANNED_MAKERS_AFTER = re.compile(
+    r'\b(?:products?|items?|supplies)\s+(?:from|by|made by)\s+([^.;\n]+?)\s+(?:are|is)\s+'
+    r'(?:banned|prohibited|not permitted|not allowed|excluded)',
+    re.I
+)
+# A ceiling needs a currency marker on the amount, so "at most 2 times" or "up to 30 days" never count
+_PRICE_CEILING = re.compile(
+    r'\b(?:price|cost|unit price|unit cost)s?\b[^.;\n]{0,40}?'
+    r'(?:not exceed|no more than|maximum of|max(?:imum)?|under|below|less than|at most|up to)\s*'
+    r'(?:(?:USD|US\$|\$)\s*([\d,]+(?:\.\d+)?)(?![\d,]|\.\d)|([\d,]+(?:\.\d+)?)\s*(?:USD|dollars)\b)'
+    r'(?!\s*(?:%|percent|times|days|months|years|hours))'
+    # A ceiling on a whole box or case is not a unit price; the LLM judges those
+    r'(?!\s*(?:/|per\s+|a\s+)\s*(?:box|bx|pack|pk|case|cs|carton|bag|package|pkg)\b)',
+    re.I
+)
+# Prices of a whole contract or period, not of one unit
+_AGGREGATE_PRICE = re.compile(r'\b(?:total|contract|annual|aggregate|overall|budget|yearly|lifetime)\b', re.I)
+# A banned-list sentence that points elsewhere ("are listed in Appendix B") names no one
+_LIST_REFERENCE = re.compile(
+    r'^\s*(?:listed|found|described|defined|set out|shown|specified|available|provided|detailed|identified|'
+    r'maintained|contained|kept|published)\b|\b(?:appendix|annex|attachment|exhibit|schedule|section|table)\b',
+    re.I
+)
+_BANNED_WORDS = re.compile(r'\b(?:banned|prohibited|excluded|disallowed|not permitted|not allowed|forbidden)\b', re.I)
+_LIST_SPLIT = re.compile(r'\s*(?:,|\band\b|\bor\b|/)\s*', re.I)
+_PRICE = re.compile(r'([\d,]+(?:\.\d+)?)')
+# A listed price that is already per unit: "$0.12/each", "$3 per piece", "$5 ea"
+_PER_UNIT_PRICE = re.compile(r'(?:/|\bper\s+)\s*(?:unit|each|ea|piece|pc|item)\b|\b(?:each|ea)\b', re.I)
+# Units in a pack, from the product name: "Box of 100", "100/box", "100 ct", "pack of 12"
+_PACK_SIZE = re.compile(
+    r'\b(?:box|pack|case|bag|carton|package|pkg|bottle|roll|tube|sleeve)\s+of\s+(\d[\d,]*)'
+    r'|\b(\d[\d,]*)\s*(?:/|per\s+)\s*(?:box|bx|pack|pk|case|cs|bag|carton|package|pkg)\b'
+    r'|\b(\d[\d,]*)\s*(?:ct|count|pcs|pieces|pc|units)\b',
+    re.I
+)
+
+# flag -> (requirement in a document, product text that satisfies it, product text that violates it)
+FLAGS: Dict[str, Tuple[str, str, str]] = {
+    'latex_free': (
+        r'latex[- ]free|free (?:of|from) (?:natural rubber )?latex|no latex|latex (?:is|are|products are) '
+        r'(?:prohibited|banned|not permitted|not allowed)',
+        r'latex[- ]free|non[- ]?latex|nitrile|vinyl|neoprene|polyisoprene',
+        r'\blatex\b',
+    ),
+    'powder_free': (
+        r'powder[- ]free|powdered (?:gloves? )?(?:are|is) (?:prohibited|banned|not permitted|not allowed)',
+        r'powder[- ]free|non[- ]?powdered|unpowdered',
+        r'\bpowdered\b',
+    ),
+    'sterile': (
+        r'(?:must|shall) be sterile|sterile (?:products|supplies|items) (?:are |is )?required|sterility is required',
+        r'(?<!non)(?<!non-)(?<!non )\bsterile\b',
+        r'non[- ]?sterile',
+    ),
+}
+_FLAG_REQUIREMENTS = {flag: re.compile(patterns[0], re.I) for flag, patterns in FLAGS.items()}
+FLAG_LABELS = {'latex_free': 'latex-free', 'powder_free': 'powder-free', 'sterile': 'sterile'}
+
+# Product fields searched for names, flags and certifications
+_TEXT_FIELDS = ('name', 'manufacturer', 'brand', 'description', 'certifications')
+
+
+def _clean_name(name: str) -> str:
+    return re.sub(r'^(?:the|any|all)\s+', '', name.strip(' "\'()'), flags=re.I).strip()
+
+
+def extract_rules(text: str) -> Dict[str, Any]:
+    """
+    Pull the mechanical requirements out of a compliance document: banned
+    manufacturers, required certifications, latex-free/powder-free/sterile
+    flags and a unit price ceiling. Anything else is left to the LLM;
+    'complete' says whether there was anything else.
+    """
+    banned: List[str] = []
+    certifications: List[str] = []
+    ceilings: List[float] = []
+    flags: Dict[str, None] = {}
+    # Whether every requirement sentence turned into at least one rule
+    complete = True
+
+    for sentence in _SENTENCE.findall(text):
+        found = False
+        for pattern in (_BANNED_MAKERS, _BANNED_MAKERS_AFTER):
+            for match in pattern.finditer(sentence):
+                if _LIST_REFERENCE.search(match.group(1)):
+                    continue
+                names = [n for n in map(_clean_name, _LIST_SPLIT.split(match.group(1))) if 2 <= len(n) <= 60]
+                banned.extend(names)
+                found = found or bool(names)
+        if _REQUIREMENT.search(sentence):
+            matched = [' '.join(c.upper().split()) for c in _CERTIFICATION.findall(sentence)]
+            certifications.extend(matched)
+            found = found or bool(matched)
+        if not _AGGREGATE_PRICE.search(sentence):
+            for match in _PRICE_CEILING.finditer(sentence):
+                ceilings.append(float((match.group(1) or match.group(2)).replace(',', '')))
+                found = True
+        for flag, pattern in _FLAG_REQUIREMENTS.items():
+            if pattern.search(sentence):
+                flags[flag] = None
+                found = True
+        if not found and (_REQUIREMENT.search(sentence) or _BANNED_WORDS.search(sentence)):
+            complete = False
+
+    return {
+        'banned_manufacturers': sorted(set(banned), key=str.lower),
+        'certifications': sorted(set(certifications)),
+        'flags': sorted(flags),
+        'max_price': min(ceilings) if ceilings else None,
+        'complete': complete,
+    }
+
+
+class RuleSet:
+    """Rules from every compliance document, compiled into a few regexes and one price ceiling"""
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        banned: Dict[str, None] = {}
+        certifications: Dict[str, None] = {}
+        flags: Dict[str, None] = {}
+        ceilings: List[float] = []
+        self.sources: Dict[str, List[str]] = {}
+        # Rules stored before 'complete' existed are assumed to leave requirements uncovered
+        self.complete = bool(documents) and all(d['rules'].get('complete', False) for d in documents)
+
+        def note(key: str, filename: str) -> None:
+            if filename not in self.sources.setdefault(key, []):
+                self.sources[key].append(filename)
+
+        for document in documents:
+            rules, filename = document['rules'], document.get('filename') or document['file_id']
+            for name in rules.get('banned_manufacturers', []):
+                banned[name.lower()] = None
+                note('banned', filename)
+            for certification in rules.get('certifications', []):
+                certifications[certification] = None
+                note(f"cert:{certification}", filename)
+            for flag in rules.get('flags', []):
+                flags[flag] = None
+                note(f"flag:{flag}", filename)
+            if rules.get('max_price') is not None:
+                ceilings.append(float(rules['max_price']))
+                note('price', filename)
+
+        self.banned_pattern = (
+            re.compile(r'\b(?:' + '|'.join(re.escape(n) for n in sorted(banned, key=len, reverse=True)) + r')\b')
+            if banned else None
+        )
+        self.certifications = list(certifications)
+        self.cert_patterns = {
+            c: re.compile(r'\b' + r'\s?'.join(re.escape(part) for part in c.split()) + r'(?!\w)', re.I)
+            for c in self.certifications
+        }
+        self.flags = list(flags)
+        self.max_price = min(ceilings) if ceilings else None
+
+    def __bool__(self) -> bool:
+        return bool(self.banned_pattern or self.certifications or self.flags or self.max_price is not None)
+
+    def evaluate(self, products: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Column-wise rule outcomes for a batch of products: one int8 column per
+        rule holding PASS, UNKNOWN or FAIL, plus the combined 'verdict'.
+        """
+        frame = pd.DataFrame(products)
+        text = pd.Series('', index=frame.index)
+        for field in _TEXT_FIELDS:
+            if field in frame:
+                text = text + ' ' + frame[field].fillna('').astype(str)
+        text = text.str.lower()
+
+        outcomes = pd.DataFrame(index=frame.index)
+        if self.banned_pattern is not None:
+            outcomes['banned'] = np.where(text.str.contains(self.banned_pattern), FAIL, PASS).astype(np.int8)
+        for flag in self.flags:
+            _, satisfies, violates = FLAGS[flag]
+            ok = text.str.contains(satisfies, regex=True)
+            bad = text.str.contains(violates, regex=True) & ~ok
+            outcomes[f"flag:{flag}"] = np.select([bad, ok], [FAIL, PASS], UNKNOWN).astype(np.int8)
+        for certification, pattern in self.cert_patterns.items():
+            # A catalog row that doesn't mention a certification hasn't disproved it
+            outcomes[f"cert:{certification}"] = np.where(text.str.contains(pattern), PASS, UNKNOWN).astype(np.int8)
+        if self.max_price is not None:
+            outcomes['price'] = self._price_outcomes(frame, text)
+
+        if outcomes.shape[1] == 0:
+            outcomes['verdict'] = np.int8(UNKNOWN)
+            return outcomes
+        values = outcomes.to_numpy()
+        outcomes['verdict'] = np.select(
+            [(values == FAIL).any(axis=1), (values == PASS).all(axis=1)], [FAIL, PASS], UNKNOWN
+        ).astype(np.int8)
+        return outcomes
+
+    def _price_outcomes(self, frame: pd.DataFrame, text: pd.Series) -> np.ndarray:
+        """
+        The ceiling is per unit, but a listed price is usually for a box or
+        case. Compare only prices that are marked per unit, or that can be
+        divided by a pack size in the product text; the rest go to the LLM.
+        """
+        prices = (frame['price'] if 'price' in frame else pd.Series('', index=frame.index)).fillna('').astype(str)
+        price = pd.to_numeric(prices.str.extract(_PRICE, expand=False).str.replace(',', ''), errors='coerce')
+        pack = pd.to_numeric(
+            text.str.extract(_PACK_SIZE).bfill(axis=1).iloc[:, 0].str.replace(',', ''), errors='coerce'
+        ).where(lambda n: n > 0)
+        unit_price = price.where(prices.str.contains(_PER_UNIT_PRICE), price / pack)
+        return np.select(
+            [unit_price > self.max_price, unit_price <= self.max_price], [FAIL, PASS], UNKNOWN
+        ).astype(np.int8)
+
+    def _describe(self, rule: str, passed: bool) -> str:
+        if rule == 'banned':
+            return "manufacturer is not banned" if passed else "manufacturer is on the banned list"
+        if rule == 'price':
+            return f"unit price is {'within' if passed else 'above'} the ${self.max_price:,.2f} ceiling"
+        if rule.startswith('flag:'):
+            label = FLAG_LABELS[rule[5:]]
+            return f"product is {label}" if passed else f"product is not {label}"
+        return f"{rule[5:]} certification is listed"
+
+    def screen(self, products: List[Dict[str, Any]], mode: str = RULES_MODE) -> List[Optional[ComplianceResult]]:
+        """
+        Settle what the rules can settle. Returns a result per product, or None
+        where the rules are inconclusive and the LLM should decide. Passes are
+        only settled in 'screen' mode, and only when the rules cover every
+        requirement in the documents; otherwise passing the rules just means
+        nothing they check is violated.
+        """
+        if not products or not self:
+            return [None] * len(products)
+        outcomes = self.evaluate(products)
+        rules = [c for c in outcomes.columns if c != 'verdict']
+        results: List[Optional[ComplianceResult]] = [None] * len(products)
+        verdicts = outcomes['verdict'].to_numpy()
+
+        # Products failing the same rules share one explanation
+        failures = outcomes[rules].to_numpy() == FAIL
+        explanations: Dict[bytes, Tuple[str, str]] = {}
+        for i in np.flatnonzero(verdicts == FAIL):
+            pattern = failures[i].tobytes()
+            if pattern not in explanations:
+                failed = [rule for rule, hit in zip(rules, failures[i]) if hit]
+                explanations[pattern] = (
+                    "Rejected by compliance rules: " + "; ".join(self._describe(r, False) for r in failed) + ".",
+                    ", ".join(sorted({source for rule in failed for source in self.sources.get(rule, [])}))
+                )
+            explanation, sources = explanations[pattern]
+            results[i] = ComplianceResult(
+                product_name=str(products[i].get('name', '')),
+                compliant=False,
+                explanation=explanation,
+                matched_file_info=sources,
+                drug_description=""
+            )
+        if mode == 'screen' and self.complete:
+            sources = sorted({source for rule in rules for source in self.sources.get(rule, [])})
+            explanation = "Meets every compliance rule: " + "; ".join(self._describe(r, True) for r in rules) + "."
+            for i in np.flatnonzero(verdicts == PASS):
+                results[i] = ComplianceResult(
+                    product_name=str(products[i].get('name', '')),
+                    compliant=True,
+                    explanation=explanation,
+                    matched_file_info=", ".join(sources),
+                    drug_description=""
+                )
+        return results
+
+
+class ComplianceRules:
+    """Process-wide RuleSet, recompiled when the stored rules change"""
+
+    def __init__(self, store: ProcurementStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._rules = RuleSet([])
+
+    def rule_set(self) -> RuleSet:
+        version = self.store.compliance_text_version()
+        if version == self._version:
+            return self._rules
+        with self._lock:
+            if version != self._version:
+                try:
+                    self._rules = RuleSet(self.store.compliance_rules())
+                except Exception as e:
+                    print(f"Error compiling compliance rules: {str(e)}")
+                self._version = version
+            return self._rules
+
+
+_rules: Optional[ComplianceRules] = None
+_rules_lock = threading.Lock()
+
+
+def get_compliance_rules() -> ComplianceRules:
+    global _rules
+    if _rules is None:
+        with _rules_lock:
+            if _rules is None:
+                _rules = ComplianceRules(get_store())
+    return _rules
@@ -0,0 +1,252 @@
+import heapq
+import os
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+IMAGE_TOP_K = int(os.getenv('IMAGE_SEARCH_TOP_K', '5'))
+IMAGE_MIN_SCORE = float(os.getenv('IMAGE_SEARCH_MIN_SCORE', '2'))
+# Bump when scoring changes so cached rankings are recomputed
+RANKING_VERSION = 'r1'
+
+# Wrappers whose <img> descendants are product images
+CONTAINER_CLASSES = frozenset({
+    'product-image', 'product-gallery', 'product-thumbnail', 'product-main-image',
+    'product-detail-image', 'product-img', 'product-media', 'product-photos',
+    'product-images', 'product-view', 'product-picture', 'product-photo',
+    'product-image-gallery', 'product-image-container', 'product-image-wrapper',
+    'product-image-slider', 'product-image-carousel',
+})
+CONTAINER_ID = 'product-image'
+CONTAINER_TESTID = 'product-image'
+
+_IMG_CLASS = re.compile(r'product|item|main|gallery|photo|picture|media')
+_IMG_SRC = re.compile(r'product|medical|supply|healthcare|hospital')
+_MEDICAL_CONTEXT = re.compile(r'medical|supply|healthcare|hospital|product')
+_WORD = re.compile(r'\w+')
+_TOKEN = re.compile(r'[a-z0-9]+')
+_NOISE = re.compile(r'logo|icon|sprite|banner|placeholder|spinner|loading|pixel|badge|avatar|social|payment|flag')
+_NUMBER = re.compile(r'(\d+)')
+_SRCSET_WIDTH = re.compile(r'\s(\d+)w\b')
+_URL_SIZE = re.compile(r'[?&](?:w|width|wid)=(\d{2,4})\b|(?<!\d)(\d{2,4})x\d{2,4}(?!\d)')
+# Query parameters CDNs use to serve the same image at another size or quality
+_SIZE_PARAMS = frozenset({'w', 'h', 'width', 'height', 'wid', 'hei', 'size', 'resize', 'fit', 'q', 'quality', 'dpr', 'fm', 'format', 'auto'})
+
+COMMON_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'})
+
+# Elements html.parser reports without a matching end tag
+_VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr',
+})
+
+
+def extract_keywords(text: str) -> Set[str]:
+    """Meaningful words of a product name, alt text or URL"""
+    return {word for word in _WORD.findall(text.lower()) if word not in COMMON_WORDS and len(word) > 2}
+
+
+def is_container(attrs: Dict[str, str]) -> bool:
+    classes = attrs.get('class')
+    if classes and not CONTAINER_CLASSES.isdisjoint(classes.split()):
+        return True
+    return attrs.get('id') == CONTAINER_ID or CONTAINER_TESTID in attrs.get('data-testid', '')
+
+
+def canonical_url(src: str, page_url: str) -> str:
+    """Absolute form of an <img> src: resolved against the page, host lowercased, fragment and default port dropped"""
+    parts = urlsplit(urljoin(page_url, src.strip()))
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+def dedupe_key(url: str) -> str:
+    """Canonical URL without resizing parameters, so one picture at several sizes counts once"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in _SIZE_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def _pixels(value: str) -> int:
+    if not value or '%' in value:
+        return 0
+    match = _NUMBER.match(value.strip())
+    return int(match.group(1)) if match else 0
+
+
+def size_hint(attrs: Dict[str, str], url: str) -> int:
+    """Largest dimension the markup or URL claims for an image, 0 when unknown"""
+    sizes = [_pixels(attrs.get('width', '')), _pixels(attrs.get('height', ''))]
+    sizes.extend(int(w) for w in _SRCSET_WIDTH.findall(attrs.get('srcset', '')))
+    sizes.extend(int(n) for match in _URL_SIZE.findall(url) for n in match if n)
+    return max(sizes)
+
+
+def extraction_key(product_name: str) -> str:
+    """
+    What the ranked images of a page depend on besides the page itself: the
+    product name (case and spacing aside) and the ranking settings.
+    """
+    return f"{RANKING_VERSION}:{IMAGE_TOP_K}:{IMAGE_MIN_SCORE:g}:{' '.join(product_name.lower().split())}"
+
+
+class _Classifier:
+    """
+    Scores each <img> of a page for one product, then dedupes and ranks them.
+    The patterns are compiled once; each image costs a few regex searches
+    and one set intersection.
+    """
+
+    def __init__(self, product_name: str, website_url: str):
+        self.name = product_name.lower()
+        self.keywords = extract_keywords(product_name)
+        self.website_url = website_url
+        self.candidates: Dict[str, Dict[str, Any]] = {}
+
+    def _score(self, src: str, url: str, alt_text: str, attrs: Dict[str, str], in_container: bool) -> float:
+        alt = alt_text.lower()
+        score = 0.0
+        if self.keywords:
+            words = set(_TOKEN.findall(f"{alt} {urlsplit(url).path.lower()}"))
+            score += 4.0 * len(self.keywords & words) / len(self.keywords)
+        if self.name and self.name in alt:
+            score += 2.0
+        if self.name and self.name in src.lower():
+            score += 1.0
+
+        # Selector specificity: explicit product markup beats a suggestive class or path
+        if in_container:
+            score += 3.0
+        if ('data-product-image' in attrs or attrs.get('data-image-type') == 'product'
+                or attrs.get('data-image') == 'product'):
+            score += 3.0
+        if _IMG_CLASS.search(attrs.get('class', '')):
+            score += 1.0
+        if 'product' in src:
+            score += 1.0
+        elif _IMG_SRC.search(src):
+            score += 0.5
+
+        size = size_hint(attrs, url)
+        if size:
+            if size <= 64:
+                score -= 4.0
+            elif size < 150:
+                score -= 1.0
+            elif size >= 600:
+                score += 1.5
+            elif size >= 300:
+                score += 1.0
+        if _NOISE.search(f"{url.lower()} {attrs.get('class', '').lower()} {alt}"):
+            score -= 3.0
+        if urlsplit(url).path.lower().endswith(('.svg', '.gif')):
+            score -= 1.0
+        return score
+
+    def add(self, attrs: Dict[str, str], in_container: bool) -> None:
+        src = attrs.get('src')
+        if not src:
+            return
+        url = canonical_url(src, self.website_url)
+        if not url.startswith('http'):
+            return
+        alt_text = attrs.get('alt') or ''
+        text = f"{alt_text} {url}".lower()
+        if not (_MEDICAL_CONTEXT.search(text) or not self.keywords.isdisjoint(_TOKEN.findall(text))):
+            return
+        score = self._score(src, url, alt_text, attrs, in_container)
+        key = dedupe_key(url)
+        current = self.candidates.get(key)
+        if current is None or score > current['score']:
+            self.candidates[key] = {
+                'url': url,
+                'alt_text': alt_text or (current['alt_text'] if current else ''),
+                'source_url': self.website_url,
+                'score': score,
+            }
+
+    def images(self, top_k: Optional[int] = None, min_score: Optional[float] = None) -> List[Dict[str, Any]]:
+        top_k = IMAGE_TOP_K if top_k is None else top_k
+        min_score = IMAGE_MIN_SCORE if min_score is None else min_score
+        # Ties keep page order, since the dict preserves first appearance
+        ranked = heapq.nlargest(
+            top_k,
+            (image for image in self.candidates.values() if image['score'] >= min_score),
+            key=lambda image: image['score']
+        )
+        return [{**image, 'score': round(image['score'], 2)} for image in ranked]
+
+
+class _ImageParser(HTMLParser):
+    """Stdlib fallback: one streaming pass, tracking open product containers on a stack"""
+
+    def __init__(self, classifier: _Classifier):
+        super().__init__()
+        self.classifier = classifier
+        self.stack: List[Tuple[str, bool]] = []
+        self.containers = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = {k: v or '' for k, v in attrs}
+        if tag == 'img':
+            self.classifier.add(attributes, self.containers > 0)
+            return
+        if tag in _VOID_TAGS:
+            return
+        container = is_container(attributes)
+        self.stack.append((tag, container))
+        self.containers += container
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == 'img':
+            self.classifier.add({k: v or '' for k, v in attrs}, self.containers > 0)
+
+    def handle_endtag(self, tag: str) -> None:
+        # Unclosed children are closed along with their parent, as browsers do
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                for _, container in self.stack[i:]:
+                    self.containers -= container
+                del self.stack[i:]
+                return
+
+
+def _walk_lxml(html: str, classifier: _Classifier) -> None:
+    parser = etree.HTMLParser(encoding='utf-8', recover=True, no_network=True)
+    root = etree.fromstring(html.encode('utf-8', errors='replace'), parser)
+    if root is None:
+        return
+    for img in root.iter('img'):
+        in_container = any(is_container(ancestor.attrib) for ancestor in img.iterancestors())
+        classifier.add(img.attrib, in_container)
+
+
+def _walk_stdlib(html: str, classifier: _Classifier) -> None:
+    parser = _ImageParser(classifier)
+    parser.feed(html)
+    parser.close()
+
+
+def extract_images(html: str, product_name: str, website_url: str) -> List[Dict[str, Any]]:
+    """
+    Find likely product images on a page in a single pass over its <img>
+    tags, deduped and ranked best first. Uses lxml when installed and
+    html.parser otherwise.
+    """
+    classifier = _Classifier(product_name, website_url)
+    if html.strip():
+        if etree is not None:
+            _walk_lxml(html, classifier)
+        else:
+            _walk_stdlib(html, classifier)
+    return classifier.images()
+
@@ -0,0 +1,323 @@
+import asyncio
+import hashlib
+import io
+import ipaddress
+import os
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from storage import ProcurementStore, get_store
+from web_fetch import FetchError, fetch
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+THUMBNAIL_DIR = os.getenv(
+    'THUMBNAIL_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shared_data', 'thumbnails')
+)
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv('THUMBNAIL_CACHE_MAX_BYTES', str(128 * 1024 * 1024)))
+# Requested sizes snap to these, so one source image has a bounded number of variants
+THUMBNAIL_WIDTHS = tuple(sorted(int(w) for w in os.getenv('THUMBNAIL_WIDTHS', '64,128,256,512').split(',')))
+DEFAULT_THUMBNAIL_WIDTH = int(os.getenv('THUMBNAIL_DEFAULT_WIDTH', '256'))
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '80'))
+# Thumbnails are immutable per URL and width, so browsers may keep them a long time
+THUMBNAIL_MAX_AGE = int(os.getenv('THUMBNAIL_MAX_AGE_SECONDS', str(30 * 24 * 3600)))
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_PROXY_MAX_BYTES', str(10 * 1024 * 1024)))
+# Enough for the dimensions of PNG, GIF, WebP and nearly every JPEG, EXIF included
+PROBE_BYTES = int(os.getenv('IMAGE_PROBE_BYTES', '65536'))
+ALLOW_PRIVATE_HOSTS = os.getenv('IMAGE_PROXY_ALLOW_PRIVATE', '0') == '1'
+MAX_REDIRECTS = int(os.getenv('IMAGE_PROXY_MAX_REDIRECTS', '5'))
+# Decoding cost grows with pixels, not bytes; a small PNG can expand to gigabytes
+MAX_PIXELS = int(os.getenv('IMAGE_PROXY_MAX_PIXELS', str(40_000_000)))
+
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class ImageProxyError(Exception):
+    """An image that cannot be proxied; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status: int = 502):
+        super().__init__(message)
+        self.status = status
+
+
+def image_key(url: str) -> str:
+    return hashlib.sha256(url.strip().encode('utf-8')).hexdigest()
+
+
+def snap_width(width: Optional[int]) -> int:
+    """The smallest configured width that covers the request, or the largest one"""
+    width = width or DEFAULT_THUMBNAIL_WIDTH
+    return next((w for w in THUMBNAIL_WIDTHS if w >= width), THUMBNAIL_WIDTHS[-1])
+
+
+def _jpeg_dimensions(head: bytes) -> Optional[Tuple[int, int]]:
+    i = 2
+    while i + 9 < len(head):
+        if head[i] != 0xFF:
+            i += 1
+            continue
+        marker = head[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack('>HH', head[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack('>H', head[i + 2:i + 4])[0]
+    return None
+
+
+def image_dimensions(head: bytes) -> Optional[Tuple[int, int, str]]:
+    """(width, height, content type) read from the first bytes of an image file, or None"""
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        width, height = struct.unpack('>II', head[16:24])
+        return width, height, 'image/png'
+    if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        width, height = struct.unpack('<HH', head[6:10])
+        return width, height, 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP' and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', head[26:30])
+            return width & 0x3FFF, height & 0x3FFF, 'image/webp'
+        if chunk == b'VP8L':
+            b0, b1, b2, b3 = head[21:25]
+            return 1 + (((b1 & 0x3F) << 8) | b0), 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6)), 'image/webp'
+        if chunk == b'VP8X':
+            return 1 + int.from_bytes(head[24:27], 'little'), 1 + int.from_bytes(head[27:30], 'little'), 'image/webp'
+        return None
+    if head[:2] == b'\xff\xd8':
+        dimensions = _jpeg_dimensions(head)
+        return (dimensions[0], dimensions[1], 'image/jpeg') if dimensions else None
+    if head[:2] == b'BM' and len(head) >= 26:
+        width, height = struct.unpack('<ii', head[18:26])
+        return width, abs(height), 'image/bmp'
+    return None
+
+
+async def check_url(url: str) -> Optional[str]:
+    """
+    Only proxy public http(s) URLs, so the endpoint cannot be pointed at
+    internal services. Returns the vetted address the fetch must connect to,
+    or None when IMAGE_PROXY_ALLOW_PRIVATE lets any host through.
+    """
+    parts = urlsplit(url or '')
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ImageProxyError("An absolute http(s) image URL is required", status=400)
+    if ALLOW_PRIVATE_HOSTS:
+        return None
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, parts.port or None)
+    except OSError as e:
+        raise ImageProxyError(f"Cannot resolve {parts.hostname}: {str(e)}", status=400)
+    addresses = [ipaddress.ip_address(info[4][0].split('%')[0]) for info in infos]
+    if not addresses or any(not address.is_global for address in addresses):
+        raise ImageProxyError(f"{parts.hostname} is not a public host", status=400)
+    return str(addresses[0])
+
+
+async def fetch_public(url: str, **options: Any) -> Dict[str, Any]:
+    """
+    web_fetch.fetch for untrusted URLs: every hop of a redirect chain is
+    checked with check_url and fetched from the address that was checked,
+    so neither a redirect nor a DNS change can reach a private host.
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        address = await check_url(url)
+        try:
+            response = await fetch(url, follow_redirects=False, connect_ip=address, **options)
+        except FetchError as e:
+            raise ImageProxyError(str(e))
+        if response['status'] not in _REDIRECT_STATUSES:
+            return response
+        location = response['headers'].get('location')
+        if not location:
+            raise ImageProxyError(f"{url} redirected without a Location")
+        url = urljoin(url, location)
+    raise ImageProxyError(f"Too many redirects fetching {url}")
+
+
+def _check_pixels(width: int, height: int) -> None:
+    if width * height > MAX_PIXELS:
+        raise ImageProxyError(f"Image is {width}x{height}, over the {MAX_PIXELS} pixel limit", status=413)
+
+
+def _render(content: bytes, widths: Tuple[int, ...]) -> Tuple[Tuple[int, int], Dict[int, Tuple[bytes, str]]]:
+    """Decode an image once and encode a WebP thumbnail for every width, largest first"""
+    image = Image.open(io.BytesIO(content))
+    source_size = image.size
+    # open() only reads the header, so this runs before any pixel is decoded
+    _check_pixels(*source_size)
+    # Lets the JPEG decoder downscale while decoding, which is much faster for large photos
+    image.draft('RGB', (widths[-1], widths[-1]))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    variants: Dict[int, Tuple[bytes, str]] = {}
+    for width in sorted(widths, reverse=True):
+        # Each size is made from the previous, larger one; thumbnail() never upscales
+        image.thumbnail((width, width), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, 'WEBP', quality=THUMBNAIL_QUALITY, method=4)
+        variants[width] = (out.getvalue(), 'image/webp')
+    return source_size, variants
+
+
+class ImageProxy:
+    """
+    Fetches a remote image once, stores a thumbnail for each configured width
+    on disk and serves those from then on. Which thumbnails exist, and when
+    each was last served, lives in the ProcurementStore; the least recently
+    served go first once the thumbnails exceed THUMBNAIL_CACHE_MAX_BYTES.
+    """
+
+    def __init__(self, store: ProcurementStore, directory: str = THUMBNAIL_DIR,
+                 max_bytes: int = THUMBNAIL_CACHE_MAX_BYTES):
+        self.store = store
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str, width: int) -> str:
+        return os.path.join(self.directory, f"{key}_{width}")
+
+    def _read(self, key: str, width: int) -> Optional[bytes]:
+        try:
+            with open(self._path(key, width), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, width: int, data: bytes) -> None:
+        tmp_path = f"{self._path(key, width)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key, width))
+
+    def _remove(self, key: str, width: int) -> None:
+        try:
+            os.remove(self._path(key, width))
+        except FileNotFoundError:
+            pass
+
+    def _cached(self, key: str, width: int) -> Optional[Dict[str, Any]]:
+        try:
+            row = self.store.get_thumbnail(key, width)
+            if row is None:
+                return None
+            data = self._read(key, width)
+            if data is None:
+                self.store.delete_thumbnail(key, width)
+                return None
+            self.store.touch_thumbnail(key, width)
+            return {'data': data, 'content_type': row['content_type'], 'etag': row['etag']}
+        except Exception as e:
+            print(f"Error reading thumbnail cache: {str(e)}")
+            return None
+
+    async def thumbnail(self, url: str, width: Optional[int] = None) -> Dict[str, Any]:
+        """The thumbnail bytes, content type and ETag for an image URL at a (snapped) width"""
+        width = snap_width(width)
+        key = image_key(url)
+        cached = self._cached(key, width)
+        if cached is not None:
+            return cached
+
+        response = await fetch_public(url, headers={'Accept': 'image/*'}, max_bytes=IMAGE_MAX_BYTES, binary=True)
+        content = response['content'] or b''
+        dimensions = image_dimensions(content[:PROBE_BYTES])
+        content_type = response['headers'].get('content-type', '').split(';')[0].strip()
+        if dimensions is None and not content_type.startswith('image/'):
+            raise ImageProxyError(f"{url} is not an image", status=415)
+        if dimensions is not None:
+            _check_pixels(dimensions[0], dimensions[1])
+
+        if Image is not None:
+            try:
+                source_size, variants = await asyncio.to_thread(_render, content, THUMBNAIL_WIDTHS)
+                dimensions = (source_size[0], source_size[1], (dimensions or (0, 0, content_type))[2])
+            except ImageProxyError:
+                raise
+            except Exception as e:
+                raise ImageProxyError(f"Cannot decode image {url}: {str(e)}")
+        else:
+            # Without Pillow the original is cached and served as-is
+            variants = {width: (content, dimensions[2] if dimensions else content_type)}
+
+        thumbnails: List[Dict[str, Any]] = []
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for variant_width, (data, variant_type) in variants.items():
+                self._write(key, variant_width, data)
+                thumbnails.append({
+                    'width': variant_width,
+                    'content_type': variant_type,
+                    'etag': hashlib.sha256(data).hexdigest()[:32],
+                    'size': len(data),
+                })
+            self.store.put_thumbnails(key, thumbnails)
+            if dimensions is not None:
+                self.store.put_image_meta(key, {
+                    'url': url, 'width': dimensions[0], 'height': dimensions[1], 'content_type': dimensions[2]
+                })
+            for evicted in self.store.evict_thumbnails(self.max_bytes):
+                self._remove(evicted['key'], evicted['width'])
+        except Exception as e:
+            print(f"Error writing thumbnail cache: {str(e)}")
+
+        served = next(t for t in thumbnails if t['width'] == width) if thumbnails else None
+        data, variant_type = variants[width]
+        etag = served['etag'] if served else hashlib.sha256(data).hexdigest()[:32]
+        return {'data': data, 'content_type': variant_type, 'etag': etag}
+
+    async def info(self, url: str) -> Dict[str, Any]:
+        """
+        Width, height and content type of an image. Unknown images are probed
+        with a Range request for their first PROBE_BYTES rather than downloaded.
+        """
+        key = image_key(url)
+        try:
+            meta = self.store.get_image_meta(key)
+        except Exception as e:
+            print(f"Error reading image metadata: {str(e)}")
+            meta = None
+        if meta is not None:
+            return meta
+
+        # Servers that ignore Range send the whole file; only the first bytes are read either way
+        response = await fetch_public(
+            url, headers={'Range': f"bytes=0-{PROBE_BYTES - 1}", 'Accept': 'image/*'},
+            max_bytes=PROBE_BYTES, truncate=True, binary=True
+        )
+        dimensions = image_dimensions(response['content'] or b'')
+        if dimensions is None:
+            raise ImageProxyError(f"Cannot read the dimensions of {url}", status=415)
+
+        meta = {'url': url, 'width': dimensions[0], 'height': dimensions[1], 'content_type': dimensions[2]}
+        try:
+            self.store.put_image_meta(key, meta)
+        except Exception as e:
+            print(f"Error writing image metadata: {str(e)}")
+        return meta
+
+
+_proxy: Optional[ImageProxy] = None
+_proxy_lock = threading.Lock()
+
+
+def get_image_proxy() -> ImageProxy:
+    global _proxy
+    if _proxy is None:
+        with _proxy_lock:
+            if _proxy is None:
+                _proxy = ImageProxy(get_store())
+    return _proxy
@@ -0,0 +1,107 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import ProcurementStore
+
+
+class InventoryCache:
+    """
+    Process-wide cache of the inventory held in the ProcurementStore.
+
+    Items are loaded once and only re-read when the store's inventory version
+    changes, which every worker sees as soon as any of them commits a mutation.
+    Items are indexed by id, sku and category, and the serialized JSON for the
+    list endpoints is built once per reload instead of once per request.
+    """
+
+    def __init__(self, store: ProcurementStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._items: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_sku: Dict[str, Dict[str, Any]] = {}
+        self._by_category: Dict[str, List[Dict[str, Any]]] = {}
+        self._items_json = b"[]"
+        self._serialized: Dict[Tuple[str, str], bytes] = {}
+
+    def _refresh(self) -> None:
+        """Reload and re-index the items if the store changed since the last load"""
+        version = self.store.inventory_version()
+        if version == self._version:
+            return
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            version = self.store.inventory_version()
+            if version == self._version:
+                return
+
+            try:
+                items = self.store.list_items()
+                print(f"Loaded {len(items)} inventory items (version {version})")
+            except Exception as e:
+                print(f"Error loading inventory data: {str(e)}")
+                items = []
+
+            self._index(items)
+            self._version = version
+
+    def _index(self, items: List[Dict[str, Any]]) -> None:
+        by_id: Dict[str, Dict[str, Any]] = {}
+        by_sku: Dict[str, Dict[str, Any]] = {}
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for item in items:
+            if item.get('id') is not None:
+                by_id[str(item['id'])] = item
+            if item.get('sku'):
+                by_sku[str(item['sku']).lower()] = item
+            by_category.setdefault(str(item.get('category', '')).lower(), []).append(item)
+
+        self._items = items
+        self._by_id = by_id
+        self._by_sku = by_sku
+        self._by_category = by_category
+        self._items_json = json.dumps(items).encode('utf-8')
+        self._serialized = {}
+
+    def _serialize(self, key: Tuple[str, str], value: Any) -> bytes:
+        data = self._serialized.get(key)
+        if data is None:
+            data = json.dumps(value).encode('utf-8')
+            self._serialized[key] = data
+        return data
+
+    def items(self) -> List[Dict[str, Any]]:
+        self._refresh()
+        return self._items
+
+    def items_json(self) -> bytes:
+        """Serialized JSON array of every item"""
+        self._refresh()
+        return self._items_json
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        return self._by_id.get(str(item_id))
+
+    def get_json(self, item_id: str) -> Optional[bytes]:
+        """Serialized JSON for a single item, or None if the id is unknown"""
+        item = self.get(item_id)
+        if item is None:
+            return None
+        return self._serialize(('id', str(item_id)), item)
+
+    def get_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        return self._by_sku.get(str(sku).lower())
+
+    def by_category(self, category: str) -> List[Dict[str, Any]]:
+        self._refresh()
+        return self._by_category.get(str(category).lower(), [])
+
+    def category_json(self, category: str) -> bytes:
+        """Serialized JSON array of the items in one category"""
+        items = self.by_category(category)
+        return self._serialize(('category', str(category).lower()), items)
@@ -0,0 +1,318 @@
+import asyncio
+import itertools
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+import llm_client
+from schema_inference import infer_column_mapping, map_dataframe, unmapped_candidates, TARGET_FIELDS
+
+# Rough budget per prompt chunk; ~4 characters per token for English/JSON text
+CHUNK_TOKENS = int(os.getenv('INVENTORY_CHUNK_TOKENS', '6000'))
+PARSE_CONCURRENCY = int(os.getenv('INVENTORY_PARSE_CONCURRENCY', '8'))
+CHARS_PER_TOKEN = 4
+
+# Called with (completed, total); total is None until the input is exhausted
+ProgressCallback = Callable[[int, Optional[int]], None]
+_END = object()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_records(records: Iterable[Dict[str, Any]], max_tokens: int = CHUNK_TOKENS) -> Iterator[str]:
+    """Lazily split spreadsheet rows into JSON arrays that each fit in max_tokens"""
+    current: List[str] = []
+    current_tokens = 0
+    for record in records:
+        encoded = json.dumps(record, default=str)
+        tokens = estimate_tokens(encoded)
+        if current and current_tokens + tokens > max_tokens:
+            yield "[" + ",".join(current) + "]"
+            current, current_tokens = [], 0
+        current.append(encoded)
+        current_tokens += tokens
+    if current:
+        yield "[" + ",".join(current) + "]"
+
+
+def chunk_pages(pages: Iterable[str], max_tokens: int = CHUNK_TOKENS) -> Iterator[str]:
+    """Lazily group page texts into chunks of at most max_tokens, splitting oversized pages by line"""
+    current: List[str] = []
+    current_tokens = 0
+    for page in pages:
+        pieces = [page] if estimate_tokens(page) <= max_tokens else page.splitlines()
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                yield "\n".join(current)
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        yield "\n".join(current)
+
+
+def _item_key(item: Dict[str, Any]) -> Optional[str]:
+    code = item.get('item_code')
+    if code is None or str(code).strip() == '':
+        return None
+    return str(code).strip().lower()
+
+
+def merge_items(partials: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge per-chunk item lists, de-duplicating by item_code. Rows for a code
+    seen earlier only fill in fields the first row left empty.
+    """
+    merged: List[Dict[str, Any]] = []
+    by_code: Dict[str, Dict[str, Any]] = {}
+    for items in partials:
+        for item in items:
+            key = _item_key(item)
+            if key is None:
+                merged.append(item)
+                continue
+            existing = by_code.get(key)
+            if existing is None:
+                by_code[key] = item
+                merged.append(item)
+                continue
+            for field, value in item.items():
+                if existing.get(field) in (None, '') and value not in (None, ''):
+                    existing[field] = value
+    return merged
+
+
+async def parse_chunks(
+    chunks: Iterable[str],
+    parse: Callable[[str], Awaitable[List[Dict[str, Any]]]],
+    concurrency: int = PARSE_CONCURRENCY,
+    on_progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Run parse over every chunk with at most `concurrency` requests in flight.
+
+    Chunks are pulled from the iterable (in a worker thread, so blocking
+    producers don't stall the event loop) only when a slot frees up, so a lazily
+    produced stream of chunks never has more than `concurrency` of them in
+    memory. Progress is reported with a total of None until the last chunk has
+    been read, since only then is the chunk count known. Returns the merged items along with the indexes of any chunks that
+    failed, so a single bad chunk does not throw away the rest of a large file.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    submitted = 0
+    completed = 0
+    total: Optional[int] = None
+    failed: List[int] = []
+
+    async def run(index: int, chunk: str) -> List[Dict[str, Any]]:
+        nonlocal completed
+        try:
+            return await parse(chunk)
+        except Exception as e:
+            print(f"Error parsing chunk {index + 1}: {str(e)}")
+            failed.append(index)
+            return []
+        finally:
+            semaphore.release()
+            completed += 1
+            if on_progress:
+                on_progress(completed, total)
+
+    tasks = []
+    iterator = iter(chunks)
+    try:
+        while True:
+            await semaphore.acquire()
+            # Producing a chunk may block on file reads or PDF extraction
+            chunk = await asyncio.to_thread(next, iterator, _END)
+            if chunk is _END:
+                semaphore.release()
+                total = submitted
+                if on_progress and completed == total:
+                    # Everything finished before the input ran out
+                    on_progress(completed, total)
+                break
+            tasks.append(asyncio.create_task(run(submitted, chunk)))
+            submitted += 1
+        partials = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if submitted and len(failed) == submitted:
+        raise RuntimeError(f"Failed to parse all {submitted} chunks")
+
+    return {
+        'items': merge_items(list(partials)),
+        'chunks': submitted,
+        'failed_chunks': sorted(failed),
+    }
+
+
+async def parse_records(records: Iterable[Dict[str, Any]], on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Standardize spreadsheet rows into inventory items, chunk by chunk"""
+    return await parse_chunks(chunk_records(records), process_dataframe_with_gpt, on_progress=on_progress)
+
+
+async def parse_pages(pages: Iterable[str], on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Extract inventory items from document pages, chunk by chunk"""
+    return await parse_chunks(chunk_pages(pages), process_text_with_gpt, on_progress=on_progress)
+
+
+async def resolve_mapping(df: pd.DataFrame) -> Tuple[Dict[str, str], str]:
+    """
+    Map columns with the local schema inference, asking GPT only about the
+    fields it could not place. Returns the mapping and how it was built.
+    """
+    mapping = infer_column_mapping(list(df.columns))
+    method = 'columns'
+
+    missing, leftover = unmapped_candidates(df, mapping)
+    if missing:
+        samples = {column: df[column].dropna().astype(str).head(5).tolist() for column in leftover}
+        try:
+            extra = await map_columns_with_gpt(samples, missing)
+        except Exception as e:
+            print(f"Error mapping columns with GPT: {str(e)}")
+            extra = {}
+        for field, column in extra.items():
+            if field in missing and column in leftover and column not in mapping.values():
+                mapping[field] = column
+        method = 'columns+llm'
+    print(f"Column mapping ({method}): {mapping}")
+    return mapping, method
+
+
+async def import_frames(frames: Iterator[pd.DataFrame], on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """
+    Convert a spreadsheet, delivered as a stream of DataFrame chunks, to
+    inventory items. The column mapping is inferred from the first chunk; each
+    chunk is then converted (or, without a product name column, sent to GPT)
+    and dropped before the next one is read.
+    """
+    first = next(frames, None)
+    if first is None:
+        return {'items': [], 'chunks': 0, 'failed_chunks': [], 'method': 'columns'}
+
+    mapping, method = await resolve_mapping(first)
+    all_frames = itertools.chain([first], frames)
+
+    if 'product_name' not in mapping:
+        records = (
+            record
+            for frame in all_frames
+            for record in json.loads(frame.to_json(orient='records'))
+        )
+        parsed = await parse_records(records, on_progress=on_progress)
+        parsed['method'] = 'llm'
+        return parsed
+
+    partials = []
+    for index, frame in enumerate(all_frames, 1):
+        partials.append(map_dataframe(frame, mapping))
+        if on_progress:
+            on_progress(index, None)
+    if on_progress:
+        on_progress(len(partials), len(partials))
+    return {
+        'items': merge_items(partials),
+        'chunks': len(partials),
+        'failed_chunks': [],
+        'method': method,
+        'mapping': mapping,
+    }
+
+
+async def map_columns_with_gpt(samples: Dict[str, List[str]], fields: List[str]) -> Dict[str, str]:
+    """Ask GPT which of the unmapped columns (given sample values) hold the missing fields"""
+    prompt = f"""
+    An inventory spreadsheet has these unmapped columns, shown with sample values:
+    {json.dumps(samples, indent=2)}
+
+    Choose which column, if any, holds each of these fields: {fields}
+    Field meanings:
+    - product_name: The name or description of the product
+    - current_stock: The current quantity in stock
+    - reorder_level: The minimum stock level before reordering
+
+    Return a JSON object mapping each field to a column name from the list above.
+    Omit fields that no column clearly holds.
+    """
+
+    response = await llm_client.chat_completion(
+        model="gpt-4o-mini-2024-07-18",
+        messages=[
+            {"role": "system", "content": "You map spreadsheet columns to inventory fields. Your response must be a valid JSON object."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={ "type": "json_object" }
+    )
+
+    result = json.loads(response.choices[0].message.content)
+    return {field: column for field, column in result.items() if field in TARGET_FIELDS and isinstance(column, str)}
+
+
+async def process_text_with_gpt(text):
+    """Process extracted text with GPT to identify inventory items"""
+    prompt = f"""
+    Parse the following text and return a JSON object containing an 'items' array. Each item in the array should have these exact fields:
+    - product_name: The name of the product
+    - item_code: The product's unique identifier
+    - unit_size: The size per unit (e.g., "100/box")
+    - unit_type: The type of unit (e.g., "box", "case", "each")
+    - current_stock: The current quantity in stock (as a number)
+    - reorder_level: The minimum stock level before reordering (as a number)
+
+    Use reasonable default values for any fields that cannot be determined.
+    Your response must be a valid JSON object.
+
+    Text to parse:
+    {text}
+    """
+
+    response = await llm_client.chat_completion(
+        model="gpt-4o-mini-2024-07-18",
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that parses inventory documents and returns JSON. Your response must be a valid JSON object with an 'items' array."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={ "type": "json_object" }
+    )
+
+    result = json.loads(response.choices[0].message.content)
+    return result.get('items', [])
+
+async def process_dataframe_with_gpt(json_data):
+    """Process structured data with GPT to standardize format"""
+    prompt = f"""
+    Convert the following inventory data into a JSON object containing an 'items' array.
+    Each item must have these exact fields:
+    - product_name
+    - item_code (if available)
+    - unit_size
+    - unit_type
+    - current_stock
+    - reorder_level
+
+    Your response must be a valid JSON object.
+
+    Data to process:
+    {json_data}
+    """
+
+    response = await llm_client.chat_completion(
+        model="gpt-4o-mini-2024-07-18",
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that standardizes inventory data into JSON format. Your response must be a valid JSON object with an 'items' array."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={ "type": "json_object" }
+    )
+
+    result = json.loads(response.choices[0].message.content)
+    return result.get('items', [])
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import threading
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from printer import ProgressSink
+from storage import ProcurementStore, get_store
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_TTL = float(os.getenv('JOB_TTL_SECONDS', '3600'))
+JOB_WATCH_INTERVAL = float(os.getenv('JOB_WATCH_INTERVAL', '1.0'))
+# An unfinished job with no heartbeat for this long lost its worker
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', '60'))
+JOB_STREAM_POLL_INTERVAL = float(os.getenv('JOB_STREAM_POLL_INTERVAL', '0.5'))
+# An SSE stream ends after this long; the client reconnects with ?after=<seq>
+JOB_STREAM_MAX_SECONDS = float(os.getenv('JOB_STREAM_MAX_SECONDS', '300'))
+
+TERMINAL_STATUSES = {'succeeded', 'failed', 'cancelled'}
+
+JobHandler = Callable[[Dict[str, Any], ProgressSink], Awaitable[Any]]
+
+# Registered at import time so every forked worker's queue knows every kind
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register an async function(params, printer) as the handler for a job kind"""
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+class JobPrinter(ProgressSink):
+    """Progress sink that records every update as an event on the job"""
+
+    def __init__(self, store: ProcurementStore, job_id: str, ttl: float = JOB_TTL):
+        super().__init__()
+        self.store = store
+        self.job_id = job_id
+        self.ttl = ttl
+
+    def on_update(self, item_id: str, content: str, is_done: bool) -> None:
+        try:
+            self.store.add_job_event(self.job_id, {
+                'type': 'progress',
+                'item': item_id,
+                'content': content,
+                'done': is_done
+            }, ttl=self.ttl)
+        except Exception as e:
+            print(f"Error recording job event: {str(e)}")
+
+
+class JobQueue:
+    """
+    Runs long procurement work in the background of a worker process.
+
+    Jobs execute on a dedicated event loop thread, at most `workers` at a time.
+    Their status, progress events and results live in the ProcurementStore, so
+    any gunicorn worker can answer a poll or take a cancel request; the owning
+    worker notices cancel requests and expired jobs on a short watch interval,
+    and heartbeats its unfinished jobs so that jobs orphaned by a dead worker
+    are failed instead of staying 'running' forever.
+    """
+
+    def __init__(self, store: ProcurementStore, workers: int = JOB_WORKERS, ttl: float = JOB_TTL):
+        self.store = store
+        self.ttl = ttl
+        self.pid = os.getpid()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.loop = asyncio.new_event_loop()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._workers = max(1, workers)
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), name='job-queue', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run_loop(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self._workers)
+        self.loop.create_task(self._watch())
+        ready.set()
+        self.loop.run_forever()
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        """Queue a job and return its id immediately"""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {kind}")
+        job_id = uuid.uuid4().hex
+        self.store.create_job(job_id, kind, params, self.ttl)
+        asyncio.run_coroutine_threadsafe(self._start(job_id, kind, params), self.loop)
+        return job_id
+
+    async def _start(self, job_id: str, kind: str, params: Dict[str, Any]) -> None:
+        task = asyncio.current_task()
+        self._tasks[job_id] = task
+        try:
+            await self._execute(job_id, kind, params)
+        finally:
+            self._tasks.pop(job_id, None)
+
+    async def _execute(self, job_id: str, kind: str, params: Dict[str, Any]) -> None:
+        try:
+            async with self._semaphore:
+                self.store.set_job_status(job_id, 'running', self.ttl)
+                printer = JobPrinter(self.store, job_id, self.ttl)
+                try:
+                    result = await JOB_HANDLERS[kind](params, printer)
+                finally:
+                    printer.end()
+            self.store.finish_job(job_id, 'succeeded', self.ttl, result=result)
+        except asyncio.CancelledError:
+            self.store.finish_job(job_id, 'cancelled', self.ttl, error='Cancelled')
+        except Exception as e:
+            print(f"Job {job_id} failed: {str(e)}")
+            self.store.finish_job(job_id, 'failed', self.ttl, error=str(e))
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; the owning worker stops the job on its next watch tick"""
+        if not self.store.request_job_cancel(job_id):
+            return False
+        task = self._tasks.get(job_id)
+        if task is not None:
+            self.loop.call_soon_threadsafe(task.cancel)
+        return True
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(JOB_WATCH_INTERVAL)
+            try:
+                for job_id in self.store.cancelled_job_ids(self.pid):
+                    task = self._tasks.get(job_id)
+                    if task is not None:
+                        task.cancel()
+                self.store.touch_jobs(list(self._tasks), self.ttl)
+                self.store.fail_stale_jobs(JOB_STALE_SECONDS, self.ttl)
+                self.store.purge_expired_jobs()
+            except Exception as e:
+                print(f"Error in job watcher: {str(e)}")
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide JobQueue, restarted in each forked worker"""
+    global _queue
+    if _queue is None or _queue.pid != os.getpid():
+        with _queue_lock:
+            if _queue is None or _queue.pid != os.getpid():
+                _queue = JobQueue(get_store())
+    return _queue
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
+
+import httpx
+from openai import AsyncOpenAI
+
+T = TypeVar('T')
+
+MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '100'))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '20'))
+KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '60'))
+REQUEST_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '120'))
+
+
+def _http2_available() -> bool:
+    if os.getenv('OPENAI_HTTP2', '1') == '0':
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ClientLoop:
+    """
+    A daemon thread running one event loop for the whole process, owning the
+    shared AsyncOpenAI client.
+
+    Flask runs each async view on a fresh event loop, and an httpx connection
+    pool cannot be shared across loops. Running every call on this one loop is
+    what lets keep-alive connections survive from one request to the next.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.client: Optional[AsyncOpenAI] = None
+        self.error: Optional[Exception] = None
+        self.pid = os.getpid()
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(ready,), name='openai-client-loop', daemon=True)
+        self.thread.start()
+        ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.client = self._create_client()
+        except Exception as e:
+            self.error = e
+            ready.set()
+            return
+        ready.set()
+        self.loop.run_forever()
+
+    def _create_client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            timeout=REQUEST_TIMEOUT,
+            http_client=httpx.AsyncClient(
+                http2=_http2_available(),
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+            ),
+        )
+
+
+_client_loop: Optional[_ClientLoop] = None
+_client_loop_lock = threading.Lock()
+
+
+def _get_client_loop() -> _ClientLoop:
+    global _client_loop
+    # A forked gunicorn worker inherits the object but not the thread
+    if _client_loop is None or _client_loop.pid != os.getpid():
+        with _client_loop_lock:
+            if _client_loop is None or _client_loop.pid != os.getpid():
+                _client_loop = _ClientLoop()
+    return _client_loop
+
+
+def get_client_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide event loop that owns the shared client"""
+    return _get_client_loop().loop
+
+
+async def call(fn: Callable[[AsyncOpenAI], Awaitable[T]]) -> T:
+    """
+    Run fn(client) on the shared client's loop and await the result from the
+    caller's loop, e.g. `await call(lambda c: c.files.delete(file_id))`.
+    """
+    client_loop = _get_client_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is client_loop.loop:
+        return await fn(client_loop.client)
+    future = asyncio.run_coroutine_threadsafe(fn(client_loop.client), client_loop.loop)
+    return await asyncio.wrap_future(future)
+
+
+async def collect(fn: Callable[[AsyncOpenAI], AsyncIterator[Any]]) -> List[Any]:
+    """Drain an auto-paginating list call (e.g. `c.files.list()`) on the client loop"""
+    async def drain(client: AsyncOpenAI) -> List[Any]:
+        return [item async for item in fn(client)]
+
+    return await call(drain)
+
+
+async def chat_completion(**kwargs: Any) -> Any:
+    """client.chat.completions.create through the shared pooled client"""
+    return await call(lambda client: client.chat.completions.create(**kwargs))
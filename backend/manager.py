@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import asyncio
+import base64
+import os
 import time
 from typing import Dict, List, Any, Optional
 from typing_extensions import TypedDict
@@ -11,38 +13,107 @@ from agents import Runner, FileSearchTool, custom_span, gen_trace_id, trace, Ite
 from working_agents.planner import planner_agent, MANDATORY_WEBSITES
 from working_agents.shopping_agent import shopping_agent
 from working_agents.formatter_agent import formatter_agent, FormattedResults
-from working_agents.compliance_agent import create_compliance_agent, ComplianceResult
+from working_agents.compliance_agent import create_compliance_agent, ComplianceResult, ComplianceCheckResults
 from working_agents.image_search_agent import image_search_agent, ImageSearchResult
-from openai import OpenAI
+import llm_client
+from printer import ProgressSink, make_printer
+from storage import get_store
+from search_cache import get_search_cache
+from plan_cache import website_plans
+from compliance_cache import get_compliance_cache
+from compliance_index import format_passages, get_compliance_index, split_passages
+from compliance_rules import extract_rules, get_compliance_rules
+from pdf_extract import content_hash, extract_text
+
+COMPLIANCE_BATCH_SIZE = int(os.getenv('COMPLIANCE_BATCH_SIZE', '5'))
+COMPLIANCE_CONCURRENCY = int(os.getenv('COMPLIANCE_CONCURRENCY', '4'))
+# 'local' answers from the BM25 index only, 'hosted' uses FileSearchTool, 'auto' uses local when it has text for every file
+COMPLIANCE_RETRIEVAL = os.getenv('COMPLIANCE_RETRIEVAL', 'auto')
+COMPLIANCE_PASSAGES = int(os.getenv('COMPLIANCE_PASSAGES', '5'))
+INGEST_CONCURRENCY = int(os.getenv('COMPLIANCE_INGEST_CONCURRENCY', '8'))
+COMPLIANCE_PAGE_SIZE = int(os.getenv('COMPLIANCE_PAGE_SIZE', '50'))
+# How old the compliance file registry may get before a listing syncs new remote files
+COMPLIANCE_SYNC_INTERVAL = float(os.getenv('COMPLIANCE_SYNC_INTERVAL_SECONDS', '60'))
+
+
+def _planner_version() -> str:
+    """Cached website plans are only valid for the mandatory websites they were built with"""
+    return content_hash(json.dumps(MANDATORY_WEBSITES).encode('utf-8'))[:16]
+
+
+def match_batch_results(batch: List[Dict[str, Any]],
+                        returned: List[ComplianceResult]) -> List[Optional[ComplianceResult]]:
+    """
+    Line up a batch agent's results with its products: by name first, with
+    duplicates taken in order. A product whose name found no result takes the
+    result at its own position, but only when the agent returned one result per
+    product and every name match sits at its own position too, so the order is
+    known to be intact. Anything still unmatched is None.
+    """
+    by_name: Dict[str, List[int]] = {}
+    for index, compliance_result in enumerate(returned):
+        by_name.setdefault(compliance_result.product_name.strip().lower(), []).append(index)
+
+    matched: List[Optional[int]] = []
+    for product in batch:
+        indices = by_name.get(str(product['name']).strip().lower())
+        matched.append(indices.pop(0) if indices else None)
+
+    in_order = all(index == position for position, index in enumerate(matched) if index is not None)
+    if None in matched and len(returned) == len(batch) and in_order:
+        used = {index for index in matched if index is not None}
+        matched = [position if index is None and position not in used else index
+                   for position, index in enumerate(matched)]
+    return [returned[index] if index is not None else None for index in matched]
+
+
+def _encode_cursor(row: Dict[str, Any]) -> str:
+    payload = json.dumps([row["created_at"], row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    if not cursor:
+        return None
+    try:
+        created_at, file_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return created_at, file_id
+    except Exception:
+        raise ValueError("Invalid cursor")
 
 class ProcurementManager:
-    def __init__(self, printer):
-        self.printer = printer
+    def __init__(self, printer: Optional[ProgressSink] = None):
+        self.printer = printer or make_printer()
         self._compliance_file_id = None
         self._vector_store_id = None
-        self.client = OpenAI()
         
     async def create_vector_store(self, name: str = "compliance_store") -> str:
         """Create a vector store for compliance documents"""
-        response = self.client.vector_stores.create(
+        response = await llm_client.call(lambda client: client.vector_stores.create(
             name=name,
             metadata={"type": "compliance"}
-        )
+        ))
         print(f"Vector store created: {response.id}")
-        self._vector_store_id = response.id
-        return response.id
+        self._vector_store_id = get_store().set_meta(f"vector_store:{name}", response.id, overwrite=False)
+        return self._vector_store_id
 
     async def get_or_create_vector_store(self, name: str = "compliance_store") -> str:
         """Get existing vector store or create new one"""
         if self._vector_store_id:
             return self._vector_store_id
 
+        # Any worker that has found or created the store recorded its id
+        registered = get_store().get_meta(f"vector_store:{name}")
+        if registered:
+            self._vector_store_id = registered
+            return registered
+
         # List existing stores
-        stores = self.client.vector_stores.list()
+        stores = await llm_client.collect(lambda client: client.vector_stores.list())
         for store in stores:
             if store.name == name:
-                self._vector_store_id = store.id
-                return store.id
+                self._vector_store_id = get_store().set_meta(f"vector_store:{name}", store.id, overwrite=False)
+                return self._vector_store_id
 
         # Create new if not found
         return await self.create_vector_store(name)
@@ -56,7 +127,7 @@ class ProcurementManager:
         {file_content[:2000]}  # Using first 2000 chars for summary
         """
         
-        response = self.client.chat.completions.create(
+        response = await llm_client.chat_completion(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are a compliance document summarizer. Be concise and focus on key requirements."},
@@ -73,15 +144,27 @@ class ProcurementManager:
         Attempt to read file content with different encodings and handle binary files.
         Returns the file content as a string or a placeholder for binary files.
         """
+        with open(file_path, 'rb') as file:
+            return self._decode_file_content(file.read())
+
+    def _decode_file_content(self, content: bytes) -> str:
+        """Text of an uploaded document, or a placeholder starting with '[' when there is none"""
         # List of encodings to try
         encodings = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
         
-        # First, try to detect if it's a binary file
-        with open(file_path, 'rb') as file:
-            content = file.read()
-            # Check if file might be binary (contains null bytes or too many non-printable characters)
-            if b'\x00' in content[:1024] or sum(1 for c in content[:1024] if c < 32 or c > 126) > 1024 * 0.3:
-                return "[Binary file detected - summary not available]"
+        # PDFs go through the shared extractor, which caches text by content hash
+        if content.startswith(b'%PDF'):
+            try:
+                text = extract_text(content)
+                if text.strip():
+                    return text
+            except Exception as e:
+                print(f"Error extracting PDF text: {str(e)}")
+        
+        # Otherwise, try to detect if it's a binary file
+        # Check if file might be binary (contains null bytes or too many non-printable characters)
+        if b'\x00' in content[:1024] or sum(1 for c in content[:1024] if c < 32 or c > 126) > 1024 * 0.3:
+            return "[Binary file detected - summary not available]"
         
         # Try different encodings
         for encoding in encodings:
@@ -95,82 +178,317 @@ class ProcurementManager:
 
     async def upload_compliance_doc(self, file_path: str, upload_time: float) -> str:
         """Upload compliance document to OpenAI and add to vector store"""
-        # First read the file content for summary
-        file_content = self._read_file_content(file_path)
-        
-        # Generate summary only if we could read the content
-        if not file_content.startswith('['):
-            summary = await self._generate_file_summary(file_content)
-        else:
-            summary = file_content  # Use the placeholder message as summary
-        
-        # Upload file
         with open(file_path, "rb") as file:
-            response = self.client.files.create(
-                file=file,
-                purpose="assistants"
+            result = await self.ingest_compliance_docs([(os.path.basename(file_path), file)], upload_time)
+        if not result["files"]:
+            raise RuntimeError(result["failed"][0]["error"])
+        return result["files"][0]["file_id"]
+
+    async def ingest_compliance_docs(self, uploads: List[tuple], upload_time: float) -> Dict[str, Any]:
+        """
+        Upload (filename, binary stream) pairs concurrently and index them with
+        one vector store file batch.
+
+        Up to INGEST_CONCURRENCY files are in flight at once; each file's summary
+        is generated while its upload runs, and a file whose summary fails is
+        stored with an empty one. Indexing continues remotely after this
+        returns; poll compliance_batch_status with the returned batch_id.
+        """
+        if not uploads:
+            raise ValueError("No files to ingest")
+
+        semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+        vector_store_task = asyncio.create_task(self.get_or_create_vector_store())
+
+        async def summarize(file_content: str) -> str:
+            # Generate summary only if we could read the content
+            if file_content.startswith('['):
+                return file_content  # Use the placeholder message as summary
+            try:
+                return await self._generate_file_summary(file_content)
+            except Exception as e:
+                # The upload runs alongside; a missing summary must not orphan it
+                print(f"Error generating file summary: {str(e)}")
+                return ''
+
+        store = get_store()
+        # First upload of each content hash in this call; identical files wait for it
+        in_flight: Dict[str, asyncio.Future] = {}
+
+        async def ingest(filename: str, stream) -> Dict[str, Any]:
+            async with semaphore:
+                # Read inside the semaphore so only the files in flight are held in memory
+                data = await asyncio.to_thread(stream.read)
+                digest = content_hash(data)
+
+                existing = store.find_compliance_file_by_hash(digest)
+                if existing is None and digest in in_flight:
+                    existing = await asyncio.shield(in_flight[digest])
+                if existing is not None:
+                    return {"file_id": existing["id"], "filename": filename,
+                            "summary": existing["summary"], "duplicate": True}
+
+                claim = asyncio.get_running_loop().create_future()
+                in_flight[digest] = claim
+                try:
+                    record = await upload(filename, data, digest)
+                except BaseException as e:
+                    claim.set_exception(e)
+                    claim.exception()  # Waiters re-raise it; don't warn if there are none
+                    raise
+                claim.set_result(record)
+                return {"file_id": record["id"], "filename": filename,
+                        "summary": record["summary"], "duplicate": False}
+
+        async def upload(filename: str, data: bytes, digest: str) -> Dict[str, Any]:
+            file_content = await asyncio.to_thread(self._decode_file_content, data)
+            summary, response = await asyncio.gather(
+                summarize(file_content),
+                llm_client.call(lambda client: client.files.create(
+                    file=(filename, data),
+                    purpose="assistants"
+                ))
             )
-        self._compliance_file_id = response.id
-        
-        # Store the metadata with summary
-        if not hasattr(self, '_file_metadata'):
-            self._file_metadata = {}
-        self._file_metadata[response.id] = {
-            'upload_time': upload_time,
-            'summary': summary
+            # Store the metadata with summary where every worker can see it
+            record = {
+                'id': response.id,
+                'filename': response.filename,
+                'purpose': response.purpose,
+                'status': response.status,
+                'created_at': response.created_at,
+                'upload_time': upload_time,
+                'summary': summary,
+                'sha256': digest
+            }
+            store.upsert_compliance_files([record])
+            if not file_content.startswith('['):
+                # Keep the text locally for the offline retrieval index and the rules engine
+                store.set_compliance_passages(response.id, split_passages(file_content))
+                store.set_compliance_rules(response.id, extract_rules(file_content))
+            return record
+
+        outcomes = await asyncio.gather(
+            *(ingest(filename, stream) for filename, stream in uploads),
+            return_exceptions=True
+        )
+        uploaded = [o for o in outcomes if not isinstance(o, BaseException)]
+        failed = [
+            {"filename": filename, "error": str(o)}
+            for (filename, _), o in zip(uploads, outcomes) if isinstance(o, BaseException)
+        ]
+        for f in failed:
+            print(f"Error uploading {f['filename']}: {f['error']}")
+        if not uploaded:
+            vector_store_task.cancel()
+            return {"batch_id": None, "status": "failed", "file_counts": None, "files": [], "failed": failed}
+
+        self._compliance_file_id = uploaded[-1]["file_id"]
+        new_files = [f for f in uploaded if not f["duplicate"]]
+        if not new_files:
+            # Everything was already uploaded and indexed
+            vector_store_task.cancel()
+            return {"batch_id": None, "status": "completed", "file_counts": None,
+                    "files": uploaded, "failed": failed}
+
+        # Add every newly uploaded file to the vector store in one batch
+        vector_store_id = await vector_store_task
+        batch = await llm_client.call(lambda client: client.vector_stores.file_batches.create(
+            vector_store_id=vector_store_id,
+            files=[
+                {
+                    "file_id": f["file_id"],
+                    "attributes": {
+                        "type": "compliance",
+                        "upload_time": upload_time,
+                        # Attribute values are limited to 512 characters
+                        "summary": (f["summary"] or "")[:512]
+                    }
+                }
+                for f in new_files
+            ]
+        ))
+        await self._invalidate_compliance_cache()
+
+        return {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "file_counts": batch.file_counts.model_dump(),
+            "files": uploaded,
+            "failed": failed
         }
 
-        # Get or create vector store
+    async def compliance_batch_status(self, batch_id: str, include_files: bool = True) -> Dict[str, Any]:
+        """Indexing progress of a vector store file batch"""
         vector_store_id = await self.get_or_create_vector_store()
-        
-        # Add file to vector store
-        self.client.vector_stores.files.create(
-            vector_store_id=vector_store_id,
-            file_id=self._compliance_file_id,
-            attributes={
-                "type": "compliance", 
-                "upload_time": upload_time,
-                "summary": summary
-            }
-        )
-        
-        return self._compliance_file_id
+        batch = await llm_client.call(lambda client: client.vector_stores.file_batches.retrieve(
+            batch_id,
+            vector_store_id=vector_store_id
+        ))
+        status = {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "file_counts": batch.file_counts.model_dump()
+        }
+        if include_files:
+            files = await llm_client.collect(lambda client: client.vector_stores.file_batches.list_files(
+                batch_id,
+                vector_store_id=vector_store_id
+            ))
+            status["files"] = [
+                {
+                    "file_id": f.id,
+                    "status": f.status,
+                    "error": f.last_error.message if f.last_error else None
+                }
+                for f in files
+            ]
+        return status
+
+    async def check_compliance(self, products: List[Dict[str, Any]], file_id: str,
+                               batch_size: int = COMPLIANCE_BATCH_SIZE) -> List[ComplianceResult]:
+        """
+        Check products against compliance document using vector store search.
+
+        Cached verdicts are reused and products the rules engine can settle skip
+        the agent. The rest are checked batch_size at a time in one agent run each,
+        with up to COMPLIANCE_CONCURRENCY runs in flight. Results come back in
+        product order.
+        """
+        if not products:
+            return []
+
+        # Verdicts only change when the product or the compliance documents do
+        cache = get_compliance_cache()
+        version = await self.compliance_docset_version()
+        compliance_results = cache.get_many(products, version)
+        pending = [i for i, result in enumerate(compliance_results) if result is None]
+
+        # Mechanical rules settle clear-cut products without an agent run. Their
+        # verdicts are cheap to recompute and may turn on the price, which the
+        # cache fingerprint leaves out, so they are not cached.
+        if pending:
+            screened = get_compliance_rules().rule_set().screen([products[i] for i in pending])
+            for i, result in zip(pending, screened):
+                if result is not None:
+                    compliance_results[i] = result
+            pending = [i for i in pending if compliance_results[i] is None]
+
+        if pending:
+            checked = await self._check_products([products[i] for i in pending], file_id, batch_size)
+            for i, result in zip(pending, checked):
+                compliance_results[i] = result
+                cache.put(products[i], version, result)
+        return compliance_results
+
+    async def _check_products(self, products: List[Dict[str, Any]], file_id: str,
+                              batch_size: int) -> List[ComplianceResult]:
+        # Get vector store ID - this is causing the issue; local retrieval needs none
+        vector_store_id = None if self._use_local_retrieval() else await self.get_or_create_vector_store()
+        semaphore = asyncio.Semaphore(COMPLIANCE_CONCURRENCY)
+        batches = [products[i:i + max(1, batch_size)] for i in range(0, len(products), max(1, batch_size))]
+
+        async def check(batch: List[Dict[str, Any]]) -> List[ComplianceResult]:
+            async with semaphore:
+                if len(batch) == 1:
+                    return [await self._check_product(batch[0], file_id, vector_store_id)]
+                try:
+                    return await self._check_batch(batch, file_id, vector_store_id)
+                except Exception as e:
+                    print(f"Batched compliance check failed, checking products one by one: {str(e)}")
+                return list(await asyncio.gather(*(
+                    self._check_product(product, file_id, vector_store_id) for product in batch
+                )))
 
-    async def check_compliance(self, products: List[Dict[str, Any]], file_id: str) -> List[Dict[str, Any]]:
-        """Check products against compliance document using vector store search"""
         compliance_results = []
-        
-        # Get vector store ID - this is causing the issue
-        vector_store_id = await self.get_or_create_vector_store()
-        
+        for results in await asyncio.gather(*(check(batch) for batch in batches)):
+            compliance_results.extend(results)
+        return compliance_results
+
+    def _use_local_retrieval(self) -> bool:
+        if COMPLIANCE_RETRIEVAL == 'local':
+            return True
+        # A file without local text is only reachable through file search
+        return COMPLIANCE_RETRIEVAL == 'auto' and get_compliance_index().covers_all_documents()
+
+    def _retrieve_passages(self, products: List[Dict[str, Any]]) -> str:
+        """The requirement passages plus the top local passages for each product, merged without repeats"""
+        index = get_compliance_index()
+        passages, seen = [], set()
+        candidates = list(index.requirements())
         for product in products:
-            product_query = f"""
-            Check if this product complies with requirements:
-            Name: {product['name']}
-            Price: {product['price']}
-            Website: {product['website']}
-            """
-            
-            with trace(f"Compliance check for {product['name']}"):
-                # Create compliance agent with single vector store ID
-                agent = create_compliance_agent(
-                    file_id=file_id,
-                    vector_store_id=vector_store_id  # Pass single ID instead of array
-                )
-                result = await Runner.run(agent, product_query)
-                compliance_result = result.final_output_as(ComplianceResult)
-                
-                # Add product name to compliance result
-                compliance_result.product_name = product['name']
-                
-                compliance_results.append(compliance_result)
+            candidates.extend(index.search(str(product['name']), k=COMPLIANCE_PASSAGES))
+        for passage in candidates:
+            key = (passage['file_id'], passage['position'])
+            if key not in seen:
+                seen.add(key)
+                passages.append(passage)
+        return format_passages(passages)
+
+    async def _check_product(self, product: Dict[str, Any], file_id: str, vector_store_id: str) -> ComplianceResult:
+        product_query = f"""
+        Check if this product complies with requirements:
+        Name: {product['name']}
+        Price: {product['price']}
+        Website: {product['website']}
+        """
+        local = self._use_local_retrieval()
+        if local:
+            product_query += f"\nCompliance passages:\n{self._retrieve_passages([product])}"
         
+        with trace(f"Compliance check for {product['name']}"):
+            # Create compliance agent with single vector store ID
+            agent = create_compliance_agent(
+                file_id=file_id,
+                vector_store_id=vector_store_id,  # Pass single ID instead of array
+                file_search=not local
+            )
+            result = await Runner.run(agent, product_query)
+            compliance_result = result.final_output_as(ComplianceResult)
+            
+            # Add product name to compliance result
+            compliance_result.product_name = product['name']
+            return compliance_result
+
+    async def _check_batch(self, batch: List[Dict[str, Any]], file_id: str, vector_store_id: str) -> List[ComplianceResult]:
+        """One agent run for several products; products the agent skipped are checked singly"""
+        listing = "\n".join(
+            f"{i}. Name: {product['name']}\n   Price: {product['price']}\n   Website: {product['website']}"
+            for i, product in enumerate(batch, start=1)
+        )
+        batch_query = f"Check if each of these {len(batch)} products complies with requirements:\n{listing}"
+        local = self._use_local_retrieval()
+        if local:
+            batch_query += f"\n\nCompliance passages:\n{self._retrieve_passages(batch)}"
+
+        with trace(f"Compliance check for {len(batch)} products"):
+            agent = create_compliance_agent(file_id=file_id, vector_store_id=vector_store_id, batch=True,
+                                            file_search=not local)
+            result = await Runner.run(agent, batch_query)
+            returned = result.final_output_as(ComplianceCheckResults).results
+
+        compliance_results = match_batch_results(batch, returned)
+        missing = [i for i, r in enumerate(compliance_results) if r is None]
+        if missing:
+            retried = await asyncio.gather(*(
+                self._check_product(batch[i], file_id, vector_store_id) for i in missing
+            ))
+            for i, compliance_result in zip(missing, retried):
+                compliance_results[i] = compliance_result
+
+        for product, compliance_result in zip(batch, compliance_results):
+            compliance_result.product_name = product['name']
         return compliance_results
 
     async def plan(self, query: str) -> list[str]:
         """
         First step: Just plan the searches and return the list of websites
         """
+        version = _planner_version()
+        cached = website_plans.get(query, version)
+        if cached is not None:
+            self.printer.update_item("planning", f"Identified {len(cached)} websites to search (cached)", is_done=True)
+            return list(cached)
+
         trace_id = gen_trace_id()
         with trace("Search Planning", trace_id=trace_id):
             self.printer.update_item(
@@ -186,6 +504,7 @@ class ProcurementManager:
                 f"Query: {query}",
             )
             search_plan = result.final_output_as(list[str])
+            website_plans.put(query, list(search_plan), version)
             
             self.printer.update_item(
                 "planning",
@@ -227,17 +546,16 @@ class ProcurementManager:
                 is_done=False
             )
             
-            products_with_images = []
-            for product in formatted_results.products:
+            async def with_images(product) -> Dict[str, Any]:
+                product_dict = product.dict()
                 try:
                     print(f"\nSearching for images for product: {product.name}")
                     image_result = await self.find_product_images(product.name, product.url)
-                    product_dict = product.dict()
-                    
+
                     # Add images to the product
                     if image_result['images']:
                         product_dict['images'] = image_result['images']
-                        product_dict['image_url'] = image_result['images'][0]['url'] if image_result['images'] else None
+                        product_dict['image_url'] = image_result['images'][0]['url']
                         print(f"Found {len(image_result['images'])} images for {product.name}")
                         for img in image_result['images']:
                             print(f"Image URL: {img['url']}")
@@ -245,15 +563,17 @@ class ProcurementManager:
                         print(f"No images found for {product.name}")
                         product_dict['images'] = []
                         product_dict['image_url'] = None
-                    
-                    products_with_images.append(product_dict)
                 except Exception as e:
                     print(f"Error finding images for {product.name}: {str(e)}")
-                    product_dict = product.dict()
                     product_dict['images'] = []
                     product_dict['image_url'] = None
-                    products_with_images.append(product_dict)
-            
+                return product_dict
+
+            # Every product's page is fetched at once; web_fetch bounds the fan-out
+            products_with_images = list(await asyncio.gather(
+                *(with_images(product) for product in formatted_results.products)
+            ))
+
             self.printer.update_item(
                 "image_search",
                 f"Found images for {len(products_with_images)} products",
@@ -361,6 +681,20 @@ class ProcurementManager:
             return all_results
 
     async def _search_website(self, website: str, query: str) -> List[Dict[str, Any]] | None:
+        """Cached search of one website; stale results are returned while a refresh runs"""
+        cache = get_search_cache()
+        products, fresh = cache.get(website, query)
+        if products is not None:
+            if not fresh:
+                cache.refresh_in_background(website, query, lambda: self._fetch_website(website, query))
+            return [{**product, "website": website} for product in products]
+
+        products = await self._fetch_website(website, query)
+        if products is not None:
+            cache.put(website, query, products)
+        return products
+
+    async def _fetch_website(self, website: str, query: str) -> List[Dict[str, Any]] | None:
         try:
             with custom_span(f"website_{website}"):
                 search_query = f"site:{website} {query}"
@@ -409,8 +743,10 @@ class ProcurementManager:
 
     async def run_streamed(self, query: str, selected_websites: list[str]):
         """
-        Stream the procurement process using OpenAI Agents SDK streaming.
-        Provides detailed streaming updates for each stage of the process.
+        Stream the procurement process as each stage produces results.
+        Every website is searched concurrently and its products are yielded as
+        soon as that website finishes, followed by the formatted results, the
+        image lookups for each product and the optional compliance check.
         
         Args:
             query: The search query
@@ -428,62 +764,79 @@ class ProcurementManager:
                 hide_checkmark=True,
             )
 
-            # Initialize streaming result
-            result = Runner.run_streamed(
-                shopping_agent,
-                input=f"Search for {query} on the following websites: {selected_websites}"
-            )
-            
-            async for event in result.stream_events():
-                # Skip raw response events
-                if event.type == "raw_response_event":
-                    continue
-                    
-                # Handle agent updates
-                elif event.type == "agent_updated_stream_event":
+            yield {
+                "type": "agent_update",
+                "agent": shopping_agent.name
+            }
+
+            async def search(website: str):
+                return website, await self._search_website(website, query)
+
+            tasks = [asyncio.create_task(search(website)) for website in selected_websites]
+            try:
+                for website in selected_websites:
                     yield {
-                        "type": "agent_update",
-                        "agent": event.new_agent.name
+                        "type": "search_progress",
+                        "status": "searching",
+                        "website": website
                     }
-                    
-                # Handle run items (tool calls, outputs, etc)
-                elif event.type == "run_item_stream_event":
-                    if event.item.type == "tool_call_item":
-                        yield {
-                            "type": "search_progress",
-                            "status": "searching",
-                            "website": event.item.tool_name if hasattr(event.item, 'tool_name') else None
-                        }
-                    elif event.item.type == "tool_call_output_item":
-                        products = []
-                        try:
-                            if event.item.output:
-                                products = event.item.output.get('products', [])
-                        except:
-                            pass
-                            
-                        yield {
-                            "type": "search_results",
-                            "products": products
-                        }
-                    elif event.item.type == "message_output_item":
-                        message = ItemHelpers.text_message_output(event.item)
-                        if message:
-                            yield {
-                                "type": "message",
-                                "content": message
-                            }
+
+                all_results = []
+                num_completed = 0
+                for task in asyncio.as_completed(tasks):
+                    website, products = await task
+                    products = products or []
+                    all_results.extend(products)
+                    num_completed += 1
+                    self.printer.update_item(
+                        "searching",
+                        f"Searching... {num_completed}/{len(tasks)} websites completed"
+                    )
+                    yield {
+                        "type": "search_results",
+                        "website": website,
+                        "products": products,
+                        "completed": num_completed,
+                        "total": len(tasks)
+                    }
+            finally:
+                for task in tasks:
+                    task.cancel()
 
             # Format results
-            if result.final_output:
-                formatted_results = await self._format_results(result.final_output, query)
+            if all_results:
+                yield {
+                    "type": "agent_update",
+                    "agent": formatter_agent.name
+                }
+                formatted_results = await self._format_results(all_results, [], query)
+                products = [product.dict() for product in formatted_results.products]
                 yield {
                     "type": "formatted_results",
                     "summary": formatted_results.summary,
                     "total_products": formatted_results.total_products,
                     "price_range": formatted_results.price_range,
-                    "products": [product.dict() for product in formatted_results.products]
+                    "products": products
                 }
+
+                async def images(index: int, product: Dict[str, Any]):
+                    return index, await self.find_product_images(product['name'], product['url'])
+
+                image_tasks = [asyncio.create_task(images(idx, p)) for idx, p in enumerate(products)]
+                try:
+                    for task in asyncio.as_completed(image_tasks):
+                        index, image_result = await task
+                        found = image_result.get('images') or []
+                        yield {
+                            "type": "product_images",
+                            "index": index,
+                            "product_name": products[index]['name'],
+                            "images": found,
+                            "image_url": found[0]['url'] if found else None
+                        }
+                finally:
+                    for task in image_tasks:
+                        task.cancel()
                 
                 # Check compliance if document is uploaded
                 if self._compliance_file_id:
@@ -493,60 +846,171 @@ class ProcurementManager:
                     }
                     
                     compliance_results = await self.check_compliance(
-                        [p.dict() for p in formatted_results.products], 
+                        products,
                         self._compliance_file_id
                     )
                     
                     yield {
                         "type": "compliance_check",
                         "status": "completed",
-                        "results": compliance_results
+                        "results": [result.dict() for result in compliance_results]
                     }
                     
+            self.printer.update_item("final_results", "Search complete", is_done=True)
             yield {
                 "type": "complete"
             }
 
-    async def list_compliance_files(self) -> List[Dict[str, Any]]:
-        """List all uploaded compliance files"""
-        response = self.client.files.list()
-        files = []
-        for file in response:
-            file_data = {
+    async def list_compliance_files(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """List all uploaded compliance files from the local registry"""
+        await self._sync_if_due(full=refresh)
+        return [self._file_data(row) for row in get_store().list_compliance_files()]
+
+    async def page_compliance_files(self, limit: int = COMPLIANCE_PAGE_SIZE, cursor: Optional[str] = None,
+                                    purpose: Optional[str] = None, status: Optional[str] = None,
+                                    q: Optional[str] = None, refresh: bool = False) -> Dict[str, Any]:
+        """
+        One page of compliance files, newest first, from the local registry.
+        Pass the returned next_cursor back to get the following page.
+        """
+        await self._sync_if_due(full=refresh)
+        limit = max(1, min(limit, 500))
+        rows = get_store().page_compliance_files(
+            limit=limit + 1, after=_decode_cursor(cursor), purpose=purpose, status=status, q=q
+        )
+        next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return {
+            "files": [self._file_data(row) for row in rows[:limit]],
+            "next_cursor": next_cursor
+        }
+
+    def _file_data(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        file_data = {
+            "id": row["id"],
+            "filename": row["filename"],
+            "purpose": row["purpose"],
+            "created_at": row["created_at"],
+            "status": row["status"],
+            # Files uploaded elsewhere have no local upload time; their creation time is the closest
+            "upload_time": row["upload_time"] if row["upload_time"] is not None else row["created_at"]
+        }
+        if row["summary"] is not None:
+            file_data['summary'] = row["summary"]
+        return file_data
+
+    async def _sync_if_due(self, full: bool = False) -> None:
+        store = get_store()
+        synced = store.get_meta("compliance_files_synced")
+        if full or synced is None:
+            await self.sync_compliance_files(full=True)
+        elif time.time() - float(synced) > COMPLIANCE_SYNC_INTERVAL:
+            try:
+                await self.sync_compliance_files()
+            except Exception as e:
+                # A stale listing is better than none
+                print(f"Error syncing compliance files: {str(e)}")
+
+    async def sync_compliance_files(self, full: bool = False) -> None:
+        """
+        Bring the registry up to date with the remote file listing.
+
+        Incremental syncs page through the listing newest first and stop at
+        the newest creation time already seen. A full sync reads everything
+        and also drops files deleted remotely. Local summaries are kept.
+        """
+        store = get_store()
+        high_water = None if full else store.get_meta("compliance_files_high_water")
+        since = int(high_water) if high_water is not None else None
+
+        async def fetch(client) -> List[Any]:
+            files = []
+            page = await client.files.list(order="desc", limit=100)
+            while True:
+                for file in page.data:
+                    # Same-second files are re-read; the upsert is idempotent
+                    if since is not None and file.created_at < since:
+                        return files
+                    files.append(file)
+                if not page.has_next_page():
+                    return files
+                page = await page.get_next_page()
+
+        response = await llm_client.call(fetch)
+        store.upsert_compliance_files((
+            {
                 "id": file.id,
                 "filename": file.filename,
                 "purpose": file.purpose,
                 "created_at": file.created_at,
                 "status": file.status
             }
-            
-            # Add upload time and summary if available
-            if hasattr(self, '_file_metadata') and file.id in self._file_metadata:
-                metadata = self._file_metadata[file.id]
-                file_data['upload_time'] = metadata.get('upload_time')
-                file_data['summary'] = metadata.get('summary')
-            
-            files.append(file_data)
-            
-        return files
+            for file in response
+        ), prune=full)
+        newest = max([file.created_at for file in response] + ([since] if since is not None else []), default=None)
+        if newest is not None:
+            store.set_meta("compliance_files_high_water", str(newest))
+        store.set_meta("compliance_files_synced", str(time.time()))
 
     async def get_file_content(self, file_id: str) -> str:
         """Retrieve content of an uploaded compliance file"""
         try:
-            response = self.client.files.content(file_id)
+            response = await llm_client.call(lambda client: client.files.content(file_id))
             return response.text
         except Exception as e:
             print(f"Error retrieving file content: {str(e)}")
             raise
 
+    async def remove_from_vector_store(self, file_id: str) -> None:
+        """Detach a file from the compliance vector store"""
+        vector_store_id = await self.get_or_create_vector_store()
+        await llm_client.call(lambda client: client.vector_stores.files.delete(
+            vector_store_id=vector_store_id,
+            file_id=file_id
+        ))
+        await self._invalidate_compliance_cache()
+
+    async def _vector_store_file_ids(self) -> List[str]:
+        vector_store_id = await self.get_or_create_vector_store()
+        files = await llm_client.collect(lambda client: client.vector_stores.files.list(
+            vector_store_id=vector_store_id
+        ))
+        file_ids = [file.id for file in files]
+        # Local retrieval may only stand in for file search over these files
+        get_store().set_vector_store_files(file_ids)
+        return file_ids
+
+    async def compliance_docset_version(self) -> str:
+        """Version of the compliance document set that cached verdicts are keyed on"""
+        cache = get_compliance_cache()
+        version = cache.docset_version()
+        if version is None or not get_store().vector_store_files_synced():
+            try:
+                file_ids = await self._vector_store_file_ids()
+            except Exception as e:
+                print(f"Error listing vector store files: {str(e)}")
+                file_ids = []
+            if version is None:
+                version = cache.init_docset_version(file_ids)
+        return version
+
+    async def _invalidate_compliance_cache(self) -> None:
+        try:
+            file_ids = await self._vector_store_file_ids()
+        except Exception as e:
+            print(f"Error listing vector store files: {str(e)}")
+            file_ids = []
+        get_compliance_cache().invalidate(file_ids)
+
     async def delete_compliance_file(self, file_id: str) -> bool:
         """Delete a compliance file from OpenAI"""
         try:
-            response = self.client.files.delete(file_id)
+            response = await llm_client.call(lambda client: client.files.delete(file_id))
             
             # Remove from local metadata if exists
-            if hasattr(self, '_file_metadata') and file_id in self._file_metadata:
-                del self._file_metadata[file_id]
+            if response.deleted:
+                get_store().delete_compliance_file(file_id)
+            
+            await self._invalidate_compliance_cache()
                 
             return response.deleted
         except Exception as e:
@@ -574,12 +1038,14 @@ class ProcurementManager:
             }
         }
         
+        get_store().save_rfq(rfq_document)
         return rfq_document
 
     async def send_rfq(self, rfq_document: dict, vendor_emails: List[str]) -> dict:
         """Mock sending RFQ to vendors"""
         # In a real implementation, this would send actual emails
-        # For now, we'll just simulate the sending
+        # For now, we'll just record and simulate the sending
+        get_store().mark_rfq_sent(rfq_document['id'], vendor_emails)
         
         return {
             "success": True,
@@ -599,10 +1065,7 @@ class ProcurementManager:
             )
             
             try:
-                result = await Runner.run(
-                    image_search_agent,
-                    f"{product_name}|{website_url}"
-                )
+                result = await image_search_agent.run(f"{product_name}|{website_url}")
                 
                 self.printer.update_item(
                     "image_search",
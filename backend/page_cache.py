@@ -0,0 +1,185 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from storage import ProcurementStore, get_store
+from web_fetch import fetch
+
+CACHE_DIR = os.getenv(
+    'PAGE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shared_data', 'page_cache')
+)
+PAGE_CACHE_MAX_BYTES = int(os.getenv('PAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+# How long a page is served without revalidation when the site sends no max-age
+PAGE_CACHE_TTL = float(os.getenv('PAGE_CACHE_TTL_SECONDS', '900'))
+PAGE_CACHE_MAX_TTL = float(os.getenv('PAGE_CACHE_MAX_TTL_SECONDS', '86400'))
+
+_MAX_AGE = re.compile(r'\bmax-age\s*=\s*(\d+)', re.I)
+
+
+def page_key(url: str) -> str:
+    return hashlib.sha256(url.strip().encode('utf-8')).hexdigest()
+
+
+def freshness(headers: Any) -> Optional[float]:
+    """Seconds a response may be served without revalidation, or None if it must not be stored"""
+    cache_control = (headers.get('cache-control') or '').lower()
+    if 'no-store' in cache_control:
+        return None
+    if 'no-cache' in cache_control:
+        return 0.0
+    match = _MAX_AGE.search(cache_control)
+    if match:
+        return min(float(match.group(1)), PAGE_CACHE_MAX_TTL)
+    return PAGE_CACHE_TTL
+
+
+class PageCache:
+    """
+    Product pages on disk, keyed by URL, with their validators and LRU
+    bookkeeping in the ProcurementStore so every worker shares them. Fresh
+    pages skip the network; stale ones are revalidated with a conditional GET.
+    Images extracted from a page are cached alongside it, per extraction key
+    (see image_extract.extraction_key).
+    """
+
+    def __init__(self, store: ProcurementStore, directory: str = CACHE_DIR, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.store = store
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.html")
+
+    def _read(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, text: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self._path(key))
+
+    def _remove(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            row = self.store.get_page(key)
+            if row is None:
+                return None
+            text = self._read(key)
+            if text is None:
+                # Evicted by another worker between the lookup and the read
+                self.store.delete_page(key)
+                return None
+            row['text'] = text
+            return row
+        except Exception as e:
+            print(f"Error reading page cache: {str(e)}")
+            return None
+
+    async def get(self, url: str) -> Dict[str, Any]:
+        """
+        The page at `url` as a dict with key, url, digest, text and whether it
+        is held in the cache. Raises FetchError like web_fetch.fetch.
+        """
+        key = page_key(url)
+        cached = self._cached(key)
+        now = time.time()
+        if cached is not None and cached['fresh_until'] > now:
+            try:
+                self.store.touch_page(key)
+            except Exception as e:
+                print(f"Error updating page cache: {str(e)}")
+            return {'key': key, 'url': url, 'digest': cached['digest'], 'text': cached['text'], 'cached': True}
+
+        headers: Dict[str, str] = {}
+        if cached is not None:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        response = await fetch(url, headers=headers or None)
+        ttl = freshness(response['headers'])
+
+        if response['status'] == 304 and cached is not None:
+            try:
+                self.store.revalidate_page(key, now + (ttl or 0.0))
+            except Exception as e:
+                print(f"Error updating page cache: {str(e)}")
+            return {'key': key, 'url': url, 'digest': cached['digest'], 'text': cached['text'], 'cached': True}
+
+        text = response['text'] or ''
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if ttl is None:
+            if cached is not None:
+                self._forget(key)
+            return {'key': key, 'url': url, 'digest': digest, 'text': text, 'cached': False}
+
+        try:
+            self._write(key, text)
+            self.store.put_page({
+                'key': key,
+                'url': url,
+                'digest': digest,
+                'etag': response['headers'].get('etag'),
+                'last_modified': response['headers'].get('last-modified'),
+                'size': len(text.encode('utf-8')),
+                'fresh_until': now + ttl,
+            })
+            for evicted in self.store.evict_pages(self.max_bytes):
+                self._remove(evicted['key'])
+        except Exception as e:
+            print(f"Error writing page cache: {str(e)}")
+            return {'key': key, 'url': url, 'digest': digest, 'text': text, 'cached': False}
+        return {'key': key, 'url': url, 'digest': digest, 'text': text, 'cached': True}
+
+    def _forget(self, key: str) -> None:
+        try:
+            self.store.delete_page(key)
+            self._remove(key)
+        except Exception as e:
+            print(f"Error updating page cache: {str(e)}")
+
+    def images(self, page: Dict[str, Any], extraction_key: str) -> Optional[List[Dict[str, Any]]]:
+        """Images previously extracted from this version of the page under the same extraction key"""
+        if not page['cached']:
+            return None
+        try:
+            return self.store.get_page_images(page['key'], extraction_key, page['digest'])
+        except Exception as e:
+            print(f"Error reading page cache: {str(e)}")
+            return None
+
+    def put_images(self, page: Dict[str, Any], extraction_key: str, images: List[Dict[str, Any]]) -> None:
+        if not page['cached']:
+            return
+        try:
+            self.store.put_page_images(page['key'], extraction_key, page['digest'], images)
+        except Exception as e:
+            print(f"Error writing page cache: {str(e)}")
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PageCache(get_store())
+    return _cache
@@ -0,0 +1,195 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context, resource_tracker, shared_memory
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+import PyPDF2
+
+from storage import get_store
+
+CACHE_DIR = os.getenv(
+    'PDF_TEXT_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shared_data', 'pdf_text_cache')
+)
+PDF_TEXT_CACHE_MAX_BYTES = int(os.getenv('PDF_TEXT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '16'))
+# Smaller documents are extracted in-process; the pool start-up is not worth it
+PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '32'))
+PAGE_SEPARATOR = '\f'
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def stream_hash(stream: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """content_hash of a seekable stream, read in chunks and rewound afterwards"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for this process. Workers are started by a forkserver (or
+    spawned) rather than forked from a threaded server, and a pool inherited
+    through a fork, e.g. by a pre-forking web server, is replaced.
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                method = 'forkserver' if 'forkserver' in get_all_start_methods() else 'spawn'
+                _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=get_context(method))
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _extract_range(shm_name: str, size: int, start: int, end: int) -> List[str]:
+    """Pool worker: extract pages [start, end) from a PDF held in shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # Attaching registers the block with the resource tracker; the parent owns
+    # it, so a worker must not leave it to be unlinked when the worker exits
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or '' for i in range(start, end)]
+
+
+def _cache_path(digest: str) -> str:
+    return os.path.join(CACHE_DIR, f"{digest}.txt")
+
+
+def _record_use(digest: str, size: int) -> None:
+    """LRU bookkeeping in the ProcurementStore; evicted texts are deleted from disk"""
+    try:
+        store = get_store()
+        store.put_pdf_text(digest, size)
+        for evicted in store.evict_pdf_texts(PDF_TEXT_CACHE_MAX_BYTES):
+            try:
+                os.remove(_cache_path(evicted['digest']))
+            except FileNotFoundError:
+                pass
+    except Exception as e:
+        print(f"Error updating PDF text cache: {str(e)}")
+
+
+def cached_pages(digest: str) -> Optional[List[str]]:
+    try:
+        with open(_cache_path(digest), 'r', encoding='utf-8') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None
+    _record_use(digest, len(text.encode('utf-8')))
+    return text.split(PAGE_SEPARATOR)
+
+
+def _store_pages(digest: str, pages: List[str]) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    text = PAGE_SEPARATOR.join(page.replace(PAGE_SEPARATOR, ' ') for page in pages)
+    tmp_path = f"{_cache_path(digest)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, _cache_path(digest))
+    _record_use(digest, len(text.encode('utf-8')))
+
+
+def extract_pages(source: Union[bytes, BinaryIO]) -> Iterator[str]:
+    """
+    Yield the text of each page in order, as soon as it is available.
+
+    `source` is the PDF as bytes or a seekable binary stream; a stream is only
+    read into memory when its pages go to the process pool. Text is cached on
+    disk by content hash, bounded by PDF_TEXT_CACHE_MAX_BYTES with least
+    recently used texts evicted first, so re-uploads of the same file skip
+    extraction entirely. Large documents are split into page ranges that are
+    extracted in a process pool; the PDF bytes are shared with the workers
+    through shared memory rather than pickled once per range.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data: Optional[bytes] = bytes(source)
+        stream: BinaryIO = io.BytesIO(data)
+        digest = content_hash(data)
+    else:
+        data, stream = None, source
+        digest = stream_hash(stream)
+    cached = cached_pages(digest)
+    if cached is not None:
+        yield from cached
+        return
+
+    reader = PyPDF2.PdfReader(stream)
+    page_count = len(reader.pages)
+    pages: List[str] = []
+
+    if page_count < PARALLEL_MIN_PAGES or EXTRACT_WORKERS <= 1:
+        for page in reader.pages:
+            text = page.extract_text() or ''
+            pages.append(text)
+            yield text
+        _store_pages(digest, pages)
+        return
+
+    if data is None:
+        stream.seek(0)
+        data = stream.read()
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    futures: List[Future] = []
+    try:
+        shm.buf[:len(data)] = data
+        try:
+            pool = _get_pool()
+            futures = [
+                pool.submit(_extract_range, shm.name, len(data), start, min(start + PAGES_PER_TASK, page_count))
+                for start in range(0, page_count, PAGES_PER_TASK)
+            ]
+        except Exception as e:
+            print(f"Process pool unavailable, extracting PDF in-process: {str(e)}")
+            futures = []
+
+        if futures:
+            for future in futures:
+                for text in future.result():
+                    pages.append(text)
+                    yield text
+        else:
+            for page in reader.pages:
+                text = page.extract_text() or ''
+                pages.append(text)
+                yield text
+    finally:
+        for future in futures:
+            future.cancel()
+        # Let running workers detach before the block is released
+        for future in futures:
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        shm.close()
+        # Workers share this process's resource tracker and unregister the
+        # block when attaching; register it again so unlink() can drop it
+        resource_tracker.register(shm._name, 'shared_memory')
+        shm.unlink()
+
+    _store_pages(digest, pages)
+
+
+def extract_text(data: bytes) -> str:
+    """Full document text, pages separated by newlines"""
+    return "\n".join(extract_pages(data))
@@ -0,0 +1,126 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
+
+PLAN_CACHE_SIZE = int(os.getenv('PLAN_CACHE_SIZE', '1024'))
+PLAN_CACHE_TTL = float(os.getenv('PLAN_CACHE_TTL_SECONDS', '86400'))
+# Minimum Jaccard similarity of the word tokens for a near-duplicate hit
+PLAN_CACHE_SIMILARITY = float(os.getenv('PLAN_CACHE_SIMILARITY', '0.8'))
+
+_TOKEN = re.compile(r'[a-z0-9]+(?:[./-][a-z0-9]+)*')
+
+# Filler that never changes which websites or action a query needs. Intent
+# verbs (find, search, get, need, want) are kept: they can decide the action
+STOPWORDS = frozenset("""
+a an the and or of for to in on at by with from about into me my we our us i you your please
+can could would will should do does look looking show give some any
+is are be this that these those it its what which where how much many
+""".split())
+
+
+def _stem(token: str) -> str:
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def canonicalize(query: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Split a query into (words, identifiers).
+
+    Identifiers (model and catalog numbers, sizes, domains: anything with a
+    digit or a dot) must match exactly between two queries; words only need
+    to overlap, ignoring case, order, punctuation, plurals and filler.
+    """
+    words: Set[str] = set()
+    identifiers: Set[str] = set()
+    for token in _TOKEN.findall(query.lower()):
+        if any(c.isdigit() for c in token) or '.' in token:
+            identifiers.add(token.replace('-', '').replace('/', ''))
+        elif token not in STOPWORDS:
+            words.add(_stem(token))
+    return frozenset(words), frozenset(identifiers)
+
+
+class PlanCache:
+    """
+    In-memory LRU of plans keyed by canonicalized query.
+
+    Lookups try the exact canonical key first, then near-duplicates that share
+    a word and all identifiers, found through a token -> keys index. Entries
+    live in one process; each is stamped with the version of whatever built
+    it (e.g. a hash of MANDATORY_WEBSITES) and misses once that changes.
+    """
+
+    def __init__(self, size: int = PLAN_CACHE_SIZE, ttl: float = PLAN_CACHE_TTL,
+                 similarity: float = PLAN_CACHE_SIMILARITY):
+        self.size = size
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries: 'OrderedDict[Tuple[FrozenSet[str], FrozenSet[str]], Tuple[Any, float, str]]' = OrderedDict()
+        self._index: Dict[str, Set[Tuple[FrozenSet[str], FrozenSet[str]]]] = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, key: Tuple[FrozenSet[str], FrozenSet[str]]) -> None:
+        self._entries.pop(key, None)
+        for word in key[0]:
+            keys = self._index.get(word)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[word]
+
+    def _live(self, key: Tuple[FrozenSet[str], FrozenSet[str]], now: float, version: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        plan, stored_at, stored_version = entry
+        if now - stored_at > self.ttl or stored_version != version:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return plan
+
+    def get(self, query: str, version: str = '') -> Optional[Any]:
+        key = canonicalize(query)
+        words, identifiers = key
+        now = time.time()
+        with self._lock:
+            plan = self._live(key, now, version)
+            if plan is not None or not words:
+                return plan
+
+            best_key, best_score = None, self.similarity
+            candidates: Set[Tuple[FrozenSet[str], FrozenSet[str]]] = set()
+            for word in words:
+                candidates.update(self._index.get(word, ()))
+            for candidate in candidates:
+                if candidate[1] != identifiers:
+                    continue
+                score = len(words & candidate[0]) / len(words | candidate[0])
+                if score >= best_score:
+                    best_key, best_score = candidate, score
+            return self._live(best_key, now, version) if best_key is not None else None
+
+    def put(self, query: str, plan: Any, version: str = '') -> None:
+        key = canonicalize(query)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (plan, time.time(), version)
+            for word in key[0]:
+                self._index.setdefault(word, set()).add(key)
+            while len(self._entries) > self.size:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+
+
+# Planner website lists and chat ActionPlans are cached separately
+website_plans = PlanCache()
+action_plans = PlanCache()
@@ -1,26 +1,35 @@
+import json
+import logging
+import os
+import sys
+import threading
 from typing import Dict, Any
 from rich.console import Console, Group
 from rich.live import Live
 from rich.spinner import Spinner
 
-class Printer:
+logger = logging.getLogger("procurement.progress")
+PROGRESS_LOG_LEVEL = os.getenv('PROGRESS_LOG_LEVEL', 'INFO').upper()
+
+
+class ProgressSink:
+    """
+    Where ProcurementManager and the upload routes report progress.
+
+    The base class ignores every update, which is what a headless server
+    worker wants; subclasses decide how (and how often) to show them.
+    """
+
     def __init__(self):
-        self.console = Console()
-        self.live = Live(console=self.console)
         self.items: dict[str, tuple[str, bool]] = {}
         self.hide_done_ids: set[str] = set()
-        self.live.start()
-        
-    def end(self) -> None:
-        """Stop the live display"""
-        self.live.stop()
 
     def update_item(
         self, item_id: str, content: str, is_done: bool = False, hide_checkmark: bool = False
     ) -> None:
         """
         Update or add an item to the display
-        
+
         Args:
             item_id: Unique identifier for this item
             content: Text content to display
@@ -30,30 +39,26 @@ class Printer:
         self.items[item_id] = (content, is_done)
         if hide_checkmark:
             self.hide_done_ids.add(item_id)
-        self.flush()
+        self.on_update(item_id, content, is_done)
 
     def mark_item_done(self, item_id: str) -> None:
         """Mark an item as complete"""
         if item_id in self.items:
-            self.items[item_id] = (self.items[item_id][0], True)
-            self.flush()
+            content = self.items[item_id][0]
+            self.items[item_id] = (content, True)
+            self.on_update(item_id, content, True)
 
-    def flush(self) -> None:
-        """Update the display with current items"""
-        renderables: list[Any] = []
-        for item_id, (content, is_done) in self.items.items():
-            if is_done:
-                prefix = "✅ " if item_id not in self.hide_done_ids else ""
-                renderables.append(prefix + content)
-            else:
-                renderables.append(Spinner("dots", text=content))
-        self.live.update(Group(*renderables))
+    def on_update(self, item_id: str, content: str, is_done: bool) -> None:
+        """Hook called after every change to an item"""
+
+    def end(self) -> None:
+        """Release anything the sink holds"""
 
     # Keep the original methods for backward compatibility
     def print_step(self, message: str):
         """Legacy method - prints a step in the process."""
         self.update_item(f"step_{len(self.items)}", message, is_done=True)
-        
+
     def print_results(self, results: Dict[str, Any]):
         """Legacy method - prints the final results."""
         output = [
@@ -61,10 +66,10 @@ class Printer:
             f"Query: {results['query']}",
             "\nWebsites searched:"
         ]
-        
+
         for website in results['websites']:
             output.append(f"- {website}")
-            
+
         output.append("\nProducts found:")
         for product in results['results']:
             output.extend([
@@ -72,5 +77,108 @@ class Printer:
                 f"Price: {product['price']}",
                 f"URL: {product['url']}"
             ])
-            
-        self.update_item("results", "\n".join(output), is_done=True) 
\ No newline at end of file
+
+        self.update_item("results", "\n".join(output), is_done=True)
+
+
+class NullPrinter(ProgressSink):
+    """Headless sink: keeps the latest state in memory and renders nothing"""
+
+
+class LogPrinter(ProgressSink):
+    """Writes each item change as one structured (JSON) log record"""
+
+    def on_update(self, item_id: str, content: str, is_done: bool) -> None:
+        logger.info(json.dumps({"item": item_id, "done": is_done, "content": content}))
+
+
+class Printer(ProgressSink):
+    """
+    Rich live display, redrawn at a fixed frame rate.
+
+    Updates only change self.items; the Live refresh thread renders the latest
+    state `refresh_per_second` times a second, so a burst of updates costs one
+    frame instead of one full re-render each.
+    """
+
+    def __init__(self, refresh_per_second: float = 8):
+        super().__init__()
+        self.console = Console()
+        self.live = Live(self, console=self.console, refresh_per_second=refresh_per_second)
+        self.live.start()
+
+    def end(self) -> None:
+        """Stop the live display"""
+        self.live.stop()
+
+    def flush(self) -> None:
+        """Force an immediate redraw"""
+        self.live.refresh()
+
+    def __rich__(self) -> Group:
+        renderables: list[Any] = []
+        for item_id, (content, is_done) in list(self.items.items()):
+            if is_done:
+                prefix = "✅ " if item_id not in self.hide_done_ids else ""
+                renderables.append(prefix + content)
+            else:
+                renderables.append(Spinner("dots", text=content))
+        return Group(*renderables)
+
+
+class _SharedTerminalPrinter(Printer):
+    """Rich printer that gives the terminal back when it ends"""
+
+    def __init__(self):
+        super().__init__()
+        self._released = False
+
+    def end(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        try:
+            super().end()
+        finally:
+            _terminal_lock.release()
+
+
+_terminal_lock = threading.Lock()
+_logger_lock = threading.Lock()
+
+
+def _configure_logger() -> None:
+    """
+    Give the progress logger a stderr handler unless the app configured one,
+    since nothing else sets up logging and INFO records would be dropped.
+    """
+    with _logger_lock:
+        if logger.handlers:
+            return
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(PROGRESS_LOG_LEVEL)
+        # The records are already written here; don't repeat them through root
+        logger.propagate = False
+
+
+def make_printer() -> ProgressSink:
+    """
+    Create the progress sink configured by PROGRESS_SINK ('none', 'log' or
+    'rich'). Without it, a terminal gets Rich and anything else gets logs.
+
+    Only one Rich display may own the terminal at a time; concurrent requests
+    fall back to the log sink instead of fighting over the screen.
+    """
+    sink = os.getenv('PROGRESS_SINK') or ('rich' if sys.stdout.isatty() else 'log')
+    if sink == 'none':
+        return NullPrinter()
+    if sink == 'rich' and _terminal_lock.acquire(blocking=False):
+        try:
+            return _SharedTerminalPrinter()
+        except Exception:
+            _terminal_lock.release()
+            raise
+    _configure_logger()
+    return LogPrinter()
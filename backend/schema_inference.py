@@ -0,0 +1,234 @@
+import csv
+import io
+import os
+import re
+from difflib import SequenceMatcher
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+TARGET_FIELDS = ['product_name', 'item_code', 'unit_size', 'unit_type', 'current_stock', 'reorder_level']
+NUMERIC_FIELDS = {'current_stock', 'reorder_level'}
+
+# Normalized header spellings seen in vendor and hospital inventory exports
+SYNONYMS: Dict[str, List[str]] = {
+    'product_name': [
+        'product name', 'product', 'name', 'item name', 'item', 'description', 'desc',
+        'prod desc', 'product description', 'item description', 'product desc', 'item desc',
+    ],
+    'item_code': [
+        'item code', 'item number', 'item id', 'sku', 'product code', 'product number', 'product id',
+        'part number', 'part no', 'catalog number', 'catalog no', 'cat number', 'mpn',
+        'mfg prod item number', 'mfg item number', 'manufacturer part number', 'prod item number',
+        'reference number', 'ref', 'ndc', 'code',
+    ],
+    'unit_size': [
+        'unit size', 'pack size', 'package size', 'packaging', 'pack', 'size', 'case size',
+        'number items in a case', 'items per case', 'items in a case', 'units per case', 'qty per case',
+        'units per box', 'per box',
+    ],
+    'unit_type': [
+        'unit type', 'uom', 'unit of measure', 'unit of measurement', 'unit', 'units', 'selling unit',
+    ],
+    'current_stock': [
+        'current stock', 'stock', 'on hand', 'qty on hand', 'quantity on hand', 'in stock',
+        'stock level', 'stock qty', 'stock quantity', 'quantity', 'qty', 'inventory', 'current quantity',
+        'available quantity',
+    ],
+    'reorder_level': [
+        'reorder level', 'reorder point', 'reorder qty', 'reorder quantity', 'par level', 'par',
+        'min', 'minimum', 'min qty', 'minimum stock', 'min stock', 'safety stock',
+    ],
+}
+
+# Header words that rule a field out unless one of its synonyms uses them too:
+# "Unit Price" is no unit type and "Vendor Name" no product name
+_MAKER_TOKENS = frozenset({'vendor', 'supplier', 'manufacturer', 'mfgr', 'mfg', 'brand'})
+_MONEY_TOKENS = frozenset({'price', 'cost', 'amount', 'total', 'value'})
+VETO_TOKENS: Dict[str, frozenset] = {
+    field: _MONEY_TOKENS if field == 'item_code' else _MONEY_TOKENS | _MAKER_TOKENS
+    for field in TARGET_FIELDS
+}
+
+FUZZY_THRESHOLD = 0.82
+CHUNK_ROWS = int(os.getenv('IMPORT_CHUNK_ROWS', '5000'))
+SNIFF_BYTES = 64 * 1024
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_UNIT_TYPE = re.compile(r'/\s*([A-Za-z]+)')
+
+
+def normalize_header(header: str) -> str:
+    text = str(header).lower().replace('#', ' number ').replace('&', ' and ')
+    return _NON_ALNUM.sub(' ', text).strip()
+
+
+def _score(header: str, synonym: str, field: str) -> float:
+    if header == synonym:
+        return 1.0
+    header_tokens = set(header.split())
+    synonym_tokens = set(synonym.split())
+    if (header_tokens - synonym_tokens) & VETO_TOKENS[field]:
+        return 0.0
+    # "mfg prod item number" contains every token of "item number"; a lone
+    # word such as "unit" or "name" is too common to count on its own
+    if len(synonym_tokens) > 1 and synonym_tokens <= header_tokens:
+        coverage = 0.85 + 0.1 * len(synonym_tokens) / len(header_tokens)
+    else:
+        coverage = 0.0
+    return max(coverage, SequenceMatcher(None, header, synonym).ratio())
+
+
+def infer_column_mapping(columns: List[str]) -> Dict[str, str]:
+    """
+    Match source columns to TARGET_FIELDS using the synonym tables and fuzzy
+    matching. Each column and each field is used at most once, best score first.
+    """
+    candidates: List[Tuple[float, str, str]] = []
+    for column in columns:
+        header = normalize_header(column)
+        if not header:
+            continue
+        for field, synonyms in SYNONYMS.items():
+            best = max(_score(header, synonym, field) for synonym in synonyms)
+            if best >= FUZZY_THRESHOLD:
+                candidates.append((best, field, column))
+
+    mapping: Dict[str, str] = {}
+    used_columns = set()
+    for score, field, column in sorted(candidates, key=lambda c: -c[0]):
+        if field in mapping or column in used_columns:
+            continue
+        mapping[field] = column
+        used_columns.add(column)
+    return mapping
+
+
+def numeric_ratio(series: pd.Series) -> float:
+    """Share of non-empty values in a column that parse as numbers"""
+    values = series.dropna().astype(str).str.strip()
+    values = values[values != '']
+    if values.empty:
+        return 0.0
+    return float(pd.to_numeric(values.str.replace(',', ''), errors='coerce').notna().mean())
+
+
+def unmapped_candidates(df: pd.DataFrame, mapping: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """
+    Fields still worth asking the LLM about and the columns that might hold them.
+
+    product_name is required, so it is always worth asking for. The stock
+    fields are only worth a call when an unmapped column looks numeric.
+    """
+    used = set(mapping.values())
+    leftover = [c for c in df.columns if c not in used and df[c].notna().any()]
+    missing = []
+    if 'product_name' not in mapping and leftover:
+        missing.append('product_name')
+    numeric_leftover = [c for c in leftover if numeric_ratio(df[c]) >= 0.8]
+    if numeric_leftover:
+        missing.extend(f for f in NUMERIC_FIELDS if f not in mapping)
+    if not missing:
+        return [], []
+    return missing, leftover
+
+
+def detect_delimiter(sample: str) -> str:
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+    except csv.Error:
+        first_line = sample.splitlines()[0] if sample else ''
+        return max(',;\t|', key=first_line.count)
+
+
+def _detect_encoding(raw: bytes) -> Tuple[str, str]:
+    """Pick utf-8 or cp1252 for a CSV from its first bytes, returning (encoding, sample text)"""
+    try:
+        return 'utf-8', raw.decode('utf-8')
+    except UnicodeDecodeError as e:
+        if len(raw) == SNIFF_BYTES and e.start >= len(raw) - 3:
+            # The sample cut a multi-byte character in half
+            return 'utf-8', raw[:e.start].decode('utf-8')
+        return 'cp1252', raw.decode('cp1252', errors='replace')
+
+
+def _cell_text(value: object) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    text = str(value).strip()
+    return text or None
+
+
+def iter_frames(stream: BinaryIO, file_ext: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Yield a spreadsheet as DataFrames of at most chunk_rows string-typed rows,
+    reading from a binary stream so the whole file is never held in memory.
+    CSV is parsed in pandas chunks; XLSX is walked in openpyxl read-only mode.
+    """
+    if file_ext == 'csv':
+        encoding, sample = _detect_encoding(stream.read(SNIFF_BYTES))
+        stream.seek(0)
+        text = io.TextIOWrapper(stream, encoding=encoding, errors='replace', newline='')
+        reader = pd.read_csv(text, sep=detect_delimiter(sample), dtype=str, chunksize=chunk_rows,
+                             skipinitialspace=True, keep_default_na=False, na_values=[''])
+        for frame in reader:
+            yield frame.dropna(axis=0, how='all')
+        return
+
+    if file_ext == 'xls':
+        # Legacy .xls has no streaming reader; it is small enough to load at once
+        yield pd.read_excel(stream, dtype=str).dropna(axis=0, how='all')
+        return
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        batch: List[List[Optional[str]]] = []
+        for row in rows:
+            batch.append([_cell_text(value) for value in row[:len(columns)]])
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=columns).dropna(axis=0, how='all')
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns).dropna(axis=0, how='all')
+    finally:
+        workbook.close()
+
+
+def map_dataframe(df: pd.DataFrame, mapping: Dict[str, str]) -> List[Dict[str, object]]:
+    """
+    Convert rows to inventory items with column-wise pandas operations. Fields
+    without a column are left out rather than defaulted, so re-importing a
+    sheet never overwrites known stock levels or sizes with zeros or blanks.
+    """
+    out = pd.DataFrame(index=df.index)
+    for field in TARGET_FIELDS:
+        column = mapping.get(field)
+        if column is None:
+            continue
+        if field in NUMERIC_FIELDS:
+            values = df[column].astype(str).str.replace(',', '').str.strip()
+            out[field] = pd.to_numeric(values, errors='coerce').fillna(0).round().astype(int)
+        else:
+            out[field] = df[column].fillna('').astype(str).str.strip()
+
+    if 'unit_type' not in mapping and 'unit_size' in out:
+        # "100/bx" -> "bx"; sizes without a unit leave the field out
+        out['unit_type'] = out['unit_size'].str.extract(_UNIT_TYPE, expand=False).str.lower()
+    if 'product_name' not in mapping and 'item_code' in out:
+        out['product_name'] = out['item_code']
+    if 'product_name' not in out:
+        return []
+
+    out = out[out['product_name'] != '']
+    out = out.astype(object).where(out.notna() & (out != ''), None)
+    return [
+        {field: value for field, value in record.items() if value is not None}
+        for record in out.to_dict(orient='records')
+    ]
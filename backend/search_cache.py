@@ -0,0 +1,127 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import llm_client
+from storage import ProcurementStore, get_store
+
+SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL_SECONDS', '21600'))
+# Entries older than TTL + MAX_STALE are treated as misses rather than served stale
+SEARCH_CACHE_MAX_STALE = float(os.getenv('SEARCH_CACHE_MAX_STALE_SECONDS', '604800'))
+PURGE_INTERVAL = 3600.0
+
+_WHITESPACE = re.compile(r'\s+')
+_SCHEME = re.compile(r'^[a-z]+://')
+
+Products = List[Dict[str, Any]]
+
+
+def normalize_website(website: str) -> str:
+    site = _SCHEME.sub('', website.strip().lower())
+    if site.startswith('www.'):
+        site = site[4:]
+    return site.rstrip('/')
+
+
+def normalize_query(query: str) -> str:
+    return _WHITESPACE.sub(' ', query.strip().lower())
+
+
+def search_key(website: str, query: str) -> str:
+    return f"{normalize_website(website)}\n{normalize_query(query)}"
+
+
+class SearchCache:
+    """
+    Per-website product search results, persisted in the ProcurementStore.
+
+    Fresh entries (younger than ttl) are returned as-is. Stale entries are
+    still returned immediately, and the caller schedules a single background
+    refresh for the key so the next search sees up-to-date results.
+    """
+
+    namespace = 'website_search'
+
+    def __init__(self, store: ProcurementStore, ttl: float = SEARCH_CACHE_TTL,
+                 max_stale: float = SEARCH_CACHE_MAX_STALE):
+        self.store = store
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._refreshing: Set[str] = set()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def get(self, website: str, query: str) -> Tuple[Optional[Products], bool]:
+        """Return (products, is_fresh); products is None on a miss"""
+        try:
+            entry = self.store.cache_get(self.namespace, search_key(website, query))
+        except Exception as e:
+            print(f"Error reading search cache: {str(e)}")
+            return None, False
+        if entry is None:
+            return None, False
+        products, stored_at = entry
+        age = time.time() - stored_at
+        if age > self.ttl + self.max_stale:
+            return None, False
+        return products, age <= self.ttl
+
+    def put(self, website: str, query: str, products: Products) -> None:
+        try:
+            self.store.cache_put(self.namespace, search_key(website, query), products)
+            now = time.time()
+            if now - self._last_purge > PURGE_INTERVAL:
+                self._last_purge = now
+                self.store.cache_purge(self.namespace, now - self.ttl - self.max_stale)
+        except Exception as e:
+            print(f"Error writing search cache: {str(e)}")
+
+    def refresh_in_background(self, website: str, query: str,
+                              fetch: Callable[[], Awaitable[Optional[Products]]]) -> bool:
+        """
+        Re-run fetch for a stale key on the process-wide background loop, so
+        the refresh outlives the request that noticed it. Returns False when a
+        refresh for the key is already in flight.
+        """
+        key = search_key(website, query)
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+
+        async def refresh() -> None:
+            try:
+                products = await fetch()
+                if products is not None:
+                    self.put(website, query, products)
+            except Exception as e:
+                print(f"Error refreshing search cache for {website}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            asyncio.run_coroutine_threadsafe(refresh(), llm_client.get_client_loop())
+        except Exception as e:
+            with self._lock:
+                self._refreshing.discard(key)
+            print(f"Error scheduling search cache refresh: {str(e)}")
+            return False
+        return True
+
+
+_cache: Optional[SearchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Process-wide SearchCache, so in-flight refreshes are shared by every request"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache(get_store())
+    return _cache
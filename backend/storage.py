@@ -0,0 +1,818 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cache_tables import CACHE_SCHEMA, CacheTables
+
+DEFAULT_DB_PATH = os.getenv(
+    'PROCUREMENT_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shared_data', 'procurement.db')
+)
+SEED_INVENTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shared_data', 'inventory.json')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    sku TEXT,
+    name TEXT NOT NULL,
+    category TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_items_sku ON items(sku) WHERE sku IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_items_category ON items(category);
+
+CREATE TABLE IF NOT EXISTS swaps (
+    item_id TEXT NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (item_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL DEFAULT 'Pending',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(created_at);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id INTEGER NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    product_name TEXT,
+    manufacturer_id TEXT,
+    packaging TEXT,
+    unit_of_measure TEXT,
+    quantity INTEGER,
+    PRIMARY KEY (order_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS rfqs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'draft',
+    created_at REAL NOT NULL,
+    document TEXT NOT NULL,
+    vendor_emails TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS idx_rfqs_created ON rfqs(created_at);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner_pid INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs(expires_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_cancel ON jobs(owner_pid, cancel_requested);
+
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS compliance_files (
+    id TEXT PRIMARY KEY,
+    filename TEXT,
+    purpose TEXT,
+    status TEXT,
+    created_at INTEGER,
+    upload_time REAL,
+    summary TEXT,
+    sha256 TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_compliance_files_created ON compliance_files(created_at, id);
+
+CREATE TABLE IF NOT EXISTS compliance_passages (
+    file_id TEXT NOT NULL REFERENCES compliance_files(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (file_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS compliance_rules (
+    file_id TEXT PRIMARY KEY REFERENCES compliance_files(id) ON DELETE CASCADE,
+    rules TEXT NOT NULL
+);
+
+-- Last listing of the compliance vector store; may name files the registry lacks
+CREATE TABLE IF NOT EXISTS vector_store_files (
+    file_id TEXT PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_stored ON cache_entries(namespace, stored_at);
+"""
+
+# Columns added after a table was first released: (table, column, type, index statement)
+MIGRATIONS = [
+    ('compliance_files', 'sha256', 'TEXT',
+     "CREATE INDEX IF NOT EXISTS idx_compliance_files_sha256 ON compliance_files(sha256)"),
+]
+
+# Statements are kept as constants so sqlite3's per-connection statement cache
+# reuses the prepared form on every call.
+SQL_INVENTORY_VERSION = "SELECT value FROM meta WHERE key = 'inventory_version'"
+SQL_BUMP_INVENTORY_VERSION = """
+    INSERT INTO meta (key, value) VALUES ('inventory_version', '1')
+    ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+"""
+SQL_UPSERT_ITEM = """
+    INSERT INTO items (id, sku, name, category, data, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        sku = COALESCE(excluded.sku, items.sku),
+        name = CASE WHEN json_extract(excluded.data, '$.name') IS NULL THEN items.name ELSE excluded.name END,
+        category = COALESCE(excluded.category, items.category),
+        data = json_patch(items.data, excluded.data),
+        updated_at = excluded.updated_at
+"""
+SQL_DELETE_SWAPS = "DELETE FROM swaps WHERE item_id = ?"
+SQL_INSERT_SWAP = "INSERT INTO swaps (item_id, position, data) VALUES (?, ?, ?)"
+SQL_SELECT_ITEMS = "SELECT id, data FROM items ORDER BY id"
+SQL_SELECT_SWAPS = "SELECT item_id, data FROM swaps ORDER BY item_id, position"
+SQL_SELECT_ITEM = "SELECT id, data FROM items WHERE id = ? OR sku = ? LIMIT 1"
+SQL_SELECT_ITEM_SWAPS = "SELECT data FROM swaps WHERE item_id = ? ORDER BY position"
+SQL_SELECT_ID_BY_SKU = "SELECT id FROM items WHERE sku = ?"
+SQL_ITEM_EXISTS = "SELECT 1 FROM items WHERE id = ?"
+SQL_DELETE_ITEM = "DELETE FROM items WHERE id = ? OR sku = ?"
+
+SQL_INSERT_ORDER = "INSERT INTO orders (status, created_at, updated_at) VALUES (?, ?, ?)"
+SQL_UPDATE_ORDER = "UPDATE orders SET status = ?, updated_at = ? WHERE id = ?"
+SQL_DELETE_ORDER_ITEMS = "DELETE FROM order_items WHERE order_id = ?"
+SQL_INSERT_ORDER_ITEM = """
+    INSERT INTO order_items (order_id, position, product_name, manufacturer_id, packaging, unit_of_measure, quantity)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_LIST_ORDERS = """
+    SELECT o.id, o.status, o.created_at, COUNT(i.order_id) AS items_count
+    FROM orders o LEFT JOIN order_items i ON i.order_id = o.id
+    GROUP BY o.id ORDER BY o.created_at DESC
+"""
+SQL_SELECT_ORDER = "SELECT id, status, created_at, updated_at FROM orders WHERE id = ?"
+SQL_SELECT_ORDER_ITEMS = """
+    SELECT product_name, manufacturer_id, packaging, unit_of_measure, quantity
+    FROM order_items WHERE order_id = ? ORDER BY position
+"""
+
+SQL_INSERT_RFQ = """
+    INSERT INTO rfqs (id, status, created_at, document, vendor_emails) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET document = excluded.document
+"""
+SQL_UPDATE_RFQ_SENT = "UPDATE rfqs SET status = 'sent', vendor_emails = ? WHERE id = ?"
+SQL_SELECT_RFQ = "SELECT id, status, created_at, document, vendor_emails FROM rfqs WHERE id = ?"
+SQL_LIST_RFQS = "SELECT id, status, created_at, document, vendor_emails FROM rfqs ORDER BY created_at DESC LIMIT ?"
+
+SQL_INSERT_JOB = """
+    INSERT INTO jobs (id, kind, status, params, owner_pid, created_at, updated_at, expires_at)
+    VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)
+"""
+SQL_UPDATE_JOB_STATUS = "UPDATE jobs SET status = ?, updated_at = ?, expires_at = ? WHERE id = ?"
+# updated_at doubles as the owning worker's heartbeat for unfinished jobs
+SQL_TOUCH_JOB = """
+    UPDATE jobs SET updated_at = ?, expires_at = ?
+    WHERE id = ? AND status IN ('queued', 'running')
+"""
+SQL_FAIL_STALE_JOBS = """
+    UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, expires_at = ?
+    WHERE status IN ('queued', 'running') AND updated_at < ?
+"""
+SQL_FINISH_JOB = """
+    UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ?
+    WHERE id = ?
+"""
+SQL_REQUEST_JOB_CANCEL = """
+    UPDATE jobs SET cancel_requested = 1, updated_at = ?
+    WHERE id = ? AND status IN ('queued', 'running')
+"""
+SQL_SELECT_JOB = "SELECT * FROM jobs WHERE id = ?"
+SQL_SELECT_CANCELLED_JOBS = """
+    SELECT id FROM jobs WHERE owner_pid = ? AND cancel_requested = 1 AND status IN ('queued', 'running')
+"""
+SQL_PURGE_JOBS = "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?"
+SQL_INSERT_JOB_EVENT = """
+    INSERT INTO job_events (job_id, seq, event, created_at)
+    SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ? FROM job_events WHERE job_id = ?
+"""
+SQL_SELECT_JOB_EVENTS = "SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq"
+
+SQL_COMPLIANCE_TEXT_VERSION = "SELECT value FROM meta WHERE key = 'compliance_text_version'"
+SQL_BUMP_COMPLIANCE_TEXT_VERSION = """
+    INSERT INTO meta (key, value) VALUES ('compliance_text_version', '1')
+    ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+"""
+SQL_DELETE_COMPLIANCE_PASSAGES = "DELETE FROM compliance_passages WHERE file_id = ?"
+SQL_INSERT_COMPLIANCE_PASSAGE = "INSERT INTO compliance_passages (file_id, position, text) VALUES (?, ?, ?)"
+SQL_SELECT_COMPLIANCE_PASSAGES = """
+    SELECT p.file_id, f.filename, p.position, p.text
+    FROM compliance_passages p JOIN compliance_files f ON f.id = p.file_id
+    ORDER BY p.file_id, p.position
+"""
+# Vector store files with no local text (scans, or uploaded elsewhere)
+SQL_COUNT_COMPLIANCE_FILES_WITHOUT_TEXT = """
+    SELECT COUNT(*) AS n FROM vector_store_files v
+    WHERE NOT EXISTS (SELECT 1 FROM compliance_passages p WHERE p.file_id = v.file_id)
+"""
+SQL_DELETE_VECTOR_STORE_FILES = "DELETE FROM vector_store_files"
+SQL_INSERT_VECTOR_STORE_FILE = "INSERT OR IGNORE INTO vector_store_files (file_id) VALUES (?)"
+VECTOR_STORE_FILES_SYNCED = 'vector_store_files_synced_at'
+SQL_SET_COMPLIANCE_RULES = """
+    INSERT INTO compliance_rules (file_id, rules) VALUES (?, ?)
+    ON CONFLICT(file_id) DO UPDATE SET rules = excluded.rules
+"""
+SQL_SELECT_COMPLIANCE_RULES = """
+    SELECT r.file_id, f.filename, r.rules
+    FROM compliance_rules r JOIN compliance_files f ON f.id = r.file_id
+    ORDER BY r.file_id
+"""
+
+SQL_SELECT_META = "SELECT value FROM meta WHERE key = ?"
+SQL_SET_META = """
+    INSERT INTO meta (key, value) VALUES (?, ?)
+    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+"""
+SQL_ADD_META = "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)"
+
+SQL_UPSERT_COMPLIANCE_FILE = """
+    INSERT INTO compliance_files (id, filename, purpose, status, created_at, upload_time, summary, sha256, updated_at)
+    VALUES (:id, :filename, :purpose, :status, :created_at, :upload_time, :summary, :sha256, :updated_at)
+    ON CONFLICT(id) DO UPDATE SET
+        filename = COALESCE(excluded.filename, compliance_files.filename),
+        purpose = COALESCE(excluded.purpose, compliance_files.purpose),
+        status = COALESCE(excluded.status, compliance_files.status),
+        created_at = COALESCE(excluded.created_at, compliance_files.created_at),
+        upload_time = COALESCE(excluded.upload_time, compliance_files.upload_time),
+        summary = COALESCE(excluded.summary, compliance_files.summary),
+        sha256 = COALESCE(excluded.sha256, compliance_files.sha256),
+        updated_at = excluded.updated_at
+"""
+SQL_LIST_COMPLIANCE_FILES = "SELECT * FROM compliance_files ORDER BY created_at DESC, id DESC"
+# Keyset pagination, newest first; NULL filters are ignored
+SQL_PAGE_COMPLIANCE_FILES = """
+    SELECT * FROM compliance_files
+    WHERE (:purpose IS NULL OR purpose = :purpose)
+      AND (:status IS NULL OR status = :status)
+      AND (:q IS NULL OR filename LIKE '%' || :q || '%' OR summary LIKE '%' || :q || '%')
+      AND (:after_created IS NULL OR created_at < :after_created
+           OR (created_at = :after_created AND id < :after_id))
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+"""
+SQL_SELECT_COMPLIANCE_FILE = "SELECT * FROM compliance_files WHERE id = ?"
+SQL_SELECT_COMPLIANCE_FILE_BY_HASH = "SELECT * FROM compliance_files WHERE sha256 = ? ORDER BY created_at LIMIT 1"
+SQL_SELECT_COMPLIANCE_FILE_IDS = "SELECT id FROM compliance_files"
+SQL_DELETE_COMPLIANCE_FILE = "DELETE FROM compliance_files WHERE id = ?"
+
+SQL_SELECT_CACHE_ENTRY = "SELECT value, stored_at FROM cache_entries WHERE namespace = ? AND key = ?"
+SQL_PUT_CACHE_ENTRY = """
+    INSERT INTO cache_entries (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, stored_at = excluded.stored_at
+"""
+SQL_DELETE_CACHE_ENTRY = "DELETE FROM cache_entries WHERE namespace = ? AND key = ?"
+SQL_CLEAR_CACHE = "DELETE FROM cache_entries WHERE namespace = ?"
+SQL_PURGE_CACHE = "DELETE FROM cache_entries WHERE namespace = ? AND stored_at < ?"
+
+
+# Filled in only when an item is created, never patched over an existing one
+NEW_ITEM_DEFAULTS = {'currentStock': 0, 'reorderLevel': 0, 'unitType': 'each'}
+
+
+def name_item_id(name: str) -> str:
+    """Stable id for an item without an SKU, so re-imports update it instead of duplicating it"""
+    key = ' '.join(str(name).lower().split())
+    return f"inv-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+
+
+class SkuConflictError(Exception):
+    """An item write would give an SKU to a second item"""
+
+
+def item_from_upload(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a parsed upload row (product_name/item_code/...) onto the inventory item shape"""
+    if 'product_name' not in item and 'item_code' not in item:
+        return dict(item)
+
+    item_code = item.get('item_code')
+    mapped = {
+        'name': item.get('product_name') or item_code,
+        'sku': str(item_code) if item_code else None,
+        'packaging': item.get('unit_size'),
+        'unitType': item.get('unit_type'),
+        'currentStock': item.get('current_stock'),
+        'reorderLevel': item.get('reorder_level'),
+    }
+    if item.get('id'):
+        mapped['id'] = item['id']
+    return {key: value for key, value in mapped.items() if value not in (None, '')}
+
+
+class ProcurementStore(CacheTables):
+    """
+    SQLite storage for inventory, orders, RFQs, background jobs and compliance
+    files. The disk cache tables and their methods live in cache_tables.
+
+    The database runs in WAL mode so the gunicorn workers can read while one of
+    them writes. Every inventory mutation bumps `inventory_version` in the same
+    transaction, which lets each worker's InventoryCache notice changes made by
+    the others with a single indexed lookup.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, seed_path: Optional[str] = SEED_INVENTORY_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection().executescript(SCHEMA + CACHE_SCHEMA)
+        self._migrate()
+        if seed_path:
+            self._seed_inventory(seed_path)
+
+    def connection(self) -> sqlite3.Connection:
+        """Per-thread connection, since sqlite3 connections must not be shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def transaction(self):
+        return _Transaction(self.connection())
+
+    def _migrate(self) -> None:
+        """Add columns introduced after a database was created"""
+        conn = self.connection()
+        for table, column, column_type, index_sql in MIGRATIONS:
+            columns = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                except sqlite3.OperationalError as e:
+                    # Another worker added it first
+                    if 'duplicate column' not in str(e):
+                        raise
+            if index_sql:
+                conn.execute(index_sql)
+
+    def _seed_inventory(self, seed_path: str) -> None:
+        """Import the bundled inventory.json the first time the database is created"""
+        conn = self.connection()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone():
+            return
+        items: List[Dict[str, Any]] = []
+        if os.path.exists(seed_path):
+            try:
+                with open(seed_path, 'r') as f:
+                    items = json.load(f).get('items', [])
+            except Exception as e:
+                print(f"Error reading seed inventory: {str(e)}")
+        with self.transaction() as conn:
+            # Re-check inside the write lock in case another worker seeded first
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone():
+                return
+            self._upsert_items(conn, items)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('seeded', '1')")
+        print(f"Seeded {len(items)} inventory items into {self.db_path}")
+
+    # Inventory
+
+    def inventory_version(self) -> int:
+        row = self.connection().execute(SQL_INVENTORY_VERSION).fetchone()
+        return int(row['value']) if row else 0
+
+    def list_items(self) -> List[Dict[str, Any]]:
+        conn = self.connection()
+        swaps: Dict[str, List[Dict[str, Any]]] = {}
+        for row in conn.execute(SQL_SELECT_SWAPS):
+            swaps.setdefault(row['item_id'], []).append(json.loads(row['data']))
+        items = []
+        for row in conn.execute(SQL_SELECT_ITEMS):
+            item = json.loads(row['data'])
+            if row['id'] in swaps:
+                item['swaps'] = swaps[row['id']]
+            items.append(item)
+        return items
+
+    def get_item(self, item_id_or_sku: str) -> Optional[Dict[str, Any]]:
+        conn = self.connection()
+        row = conn.execute(SQL_SELECT_ITEM, (item_id_or_sku, item_id_or_sku)).fetchone()
+        if row is None:
+            return None
+        item = json.loads(row['data'])
+        swaps = [json.loads(r['data']) for r in conn.execute(SQL_SELECT_ITEM_SWAPS, (row['id'],))]
+        if swaps:
+            item['swaps'] = swaps
+        return item
+
+    def upsert_items(self, items: Iterable[Dict[str, Any]]) -> List[str]:
+        """Insert or merge a batch of items in one transaction, returning their ids"""
+        with self.transaction() as conn:
+            return self._upsert_items(conn, items)
+
+    def _upsert_items(self, conn: sqlite3.Connection, items: Iterable[Dict[str, Any]]) -> List[str]:
+        now = time.time()
+        item_rows = []
+        swap_item_ids = []
+        swap_rows = []
+        ids = []
+        seen = set()
+        for raw in items:
+            item = item_from_upload(raw)
+            sku = item.get('sku')
+            item_id = item.get('id')
+            if sku:
+                existing = conn.execute(SQL_SELECT_ID_BY_SKU, (sku,)).fetchone()
+                if existing and item_id and existing['id'] != item_id:
+                    raise SkuConflictError(f"SKU {sku} already belongs to item {existing['id']}")
+                if not item_id:
+                    item_id = existing['id'] if existing else sku
+            if not item_id:
+                item_id = name_item_id(item['name']) if item.get('name') else f"inv-{uuid.uuid4().hex[:12]}"
+            item['id'] = item_id
+            if item_id not in seen and conn.execute(SQL_ITEM_EXISTS, (item_id,)).fetchone() is None:
+                item = {**NEW_ITEM_DEFAULTS, **item}
+            seen.add(item_id)
+
+            swaps = item.pop('swaps', None)
+            if swaps is not None:
+                swap_item_ids.append((item_id,))
+                swap_rows.extend(
+                    (item_id, position, json.dumps(swap)) for position, swap in enumerate(swaps)
+                )
+            item_rows.append((
+                item_id,
+                sku,
+                item.get('name') or item_id,
+                item.get('category'),
+                json.dumps(item),
+                now,
+            ))
+            ids.append(item_id)
+
+        if item_rows:
+            try:
+                conn.executemany(SQL_UPSERT_ITEM, item_rows)
+            except sqlite3.IntegrityError as e:
+                # e.g. two rows of one batch giving the same SKU to different ids
+                raise SkuConflictError(f"Conflicting SKUs: {str(e)}")
+            conn.executemany(SQL_DELETE_SWAPS, swap_item_ids)
+            conn.executemany(SQL_INSERT_SWAP, swap_rows)
+            conn.execute(SQL_BUMP_INVENTORY_VERSION)
+        return ids
+
+    def update_item(self, item_id_or_sku: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merge changes into an existing item, returning the updated item or None if missing"""
+        with self.transaction() as conn:
+            row = conn.execute(SQL_SELECT_ITEM, (item_id_or_sku, item_id_or_sku)).fetchone()
+            if row is None:
+                return None
+            changes = item_from_upload(changes)
+            changes['id'] = row['id']
+            self._upsert_items(conn, [{**json.loads(row['data']), **changes}])
+        return self.get_item(row['id'])
+
+    def delete_item(self, item_id_or_sku: str) -> bool:
+        with self.transaction() as conn:
+            deleted = conn.execute(SQL_DELETE_ITEM, (item_id_or_sku, item_id_or_sku)).rowcount
+            if deleted:
+                conn.execute(SQL_BUMP_INVENTORY_VERSION)
+        return bool(deleted)
+
+    # Orders
+
+    def save_order(self, items: List[Dict[str, Any]], status: str = 'Pending',
+                   order_id: Optional[int] = None) -> int:
+        """Create or replace an order and its line items, returning the order id"""
+        now = time.time()
+        with self.transaction() as conn:
+            if order_id is None:
+                order_id = conn.execute(SQL_INSERT_ORDER, (status, now, now)).lastrowid
+            elif conn.execute(SQL_UPDATE_ORDER, (status, now, order_id)).rowcount == 0:
+                raise KeyError(f"Order {order_id} not found")
+            conn.execute(SQL_DELETE_ORDER_ITEMS, (order_id,))
+            conn.executemany(SQL_INSERT_ORDER_ITEM, [
+                (
+                    order_id,
+                    position,
+                    item.get('product_name'),
+                    item.get('manufacturer_id'),
+                    item.get('packaging'),
+                    item.get('unit_of_measure'),
+                    int(item.get('quantity') or 0),
+                )
+                for position, item in enumerate(items)
+            ])
+        return order_id
+
+    def list_orders(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.connection().execute(SQL_LIST_ORDERS)]
+
+    def get_order(self, order_id: int) -> Optional[Dict[str, Any]]:
+        conn = self.connection()
+        row = conn.execute(SQL_SELECT_ORDER, (order_id,)).fetchone()
+        if row is None:
+            return None
+        order = dict(row)
+        order['items'] = [dict(r) for r in conn.execute(SQL_SELECT_ORDER_ITEMS, (order_id,))]
+        return order
+
+    # RFQs
+
+    def save_rfq(self, rfq_document: Dict[str, Any]) -> str:
+        with self.transaction() as conn:
+            conn.execute(SQL_INSERT_RFQ, (
+                rfq_document['id'],
+                'draft',
+                time.time(),
+                json.dumps(rfq_document),
+                '[]',
+            ))
+        return rfq_document['id']
+
+    def mark_rfq_sent(self, rfq_id: str, vendor_emails: List[str]) -> bool:
+        with self.transaction() as conn:
+            updated = conn.execute(SQL_UPDATE_RFQ_SENT, (json.dumps(vendor_emails), rfq_id)).rowcount
+        return bool(updated)
+
+    def get_rfq(self, rfq_id: str) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(SQL_SELECT_RFQ, (rfq_id,)).fetchone()
+        return self._rfq_from_row(row) if row else None
+
+    def list_rfqs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return [self._rfq_from_row(row) for row in self.connection().execute(SQL_LIST_RFQS, (limit,))]
+
+    def _rfq_from_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'status': row['status'],
+            'created_at': row['created_at'],
+            'document': json.loads(row['document']),
+            'vendor_emails': json.loads(row['vendor_emails']),
+        }
+
+    # Jobs
+
+    def create_job(self, job_id: str, kind: str, params: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        with self.transaction() as conn:
+            # Queued jobs also expire, in case the owning worker dies before running them
+            conn.execute(SQL_INSERT_JOB, (job_id, kind, json.dumps(params), os.getpid(), now, now, now + ttl))
+
+    def set_job_status(self, job_id: str, status: str, ttl: float) -> None:
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(SQL_UPDATE_JOB_STATUS, (status, now, now + ttl, job_id))
+
+    def touch_jobs(self, job_ids: Iterable[str], ttl: float) -> None:
+        """Heartbeat unfinished jobs and push their expiry out by ttl"""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(SQL_TOUCH_JOB, [(now, now + ttl, job_id) for job_id in job_ids])
+
+    def fail_stale_jobs(self, stale_after: float, ttl: float) -> int:
+        """Fail unfinished jobs whose worker has not sent a heartbeat in stale_after seconds"""
+        now = time.time()
+        with self.transaction() as conn:
+            return conn.execute(SQL_FAIL_STALE_JOBS, (
+                'Worker stopped responding', now, now + ttl, now - stale_after
+            )).rowcount
+
+    def finish_job(self, job_id: str, status: str, ttl: float,
+                   result: Any = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(SQL_FINISH_JOB, (
+                status,
+                json.dumps(result, default=str) if result is not None else None,
+                error,
+                now,
+                now + ttl,
+                job_id,
+            ))
+
+    def request_job_cancel(self, job_id: str) -> bool:
+        with self.transaction() as conn:
+            return bool(conn.execute(SQL_REQUEST_JOB_CANCEL, (time.time(), job_id)).rowcount)
+
+    def cancelled_job_ids(self, owner_pid: int) -> List[str]:
+        return [row['id'] for row in self.connection().execute(SQL_SELECT_CANCELLED_JOBS, (owner_pid,))]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(SQL_SELECT_JOB, (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def add_job_event(self, job_id: str, event: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Record a progress event; with ttl, an unfinished job's expiry moves out too"""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(SQL_INSERT_JOB_EVENT, (job_id, json.dumps(event, default=str), now, job_id))
+            if ttl is not None:
+                conn.execute(SQL_TOUCH_JOB, (now, now + ttl, job_id))
+
+    def job_events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        return [
+            {'seq': row['seq'], **json.loads(row['event'])}
+            for row in self.connection().execute(SQL_SELECT_JOB_EVENTS, (job_id, after))
+        ]
+
+    def purge_expired_jobs(self) -> int:
+        with self.transaction() as conn:
+            return conn.execute(SQL_PURGE_JOBS, (time.time(),)).rowcount
+
+    # Meta values
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.connection().execute(SQL_SELECT_META, (key,)).fetchone()
+        return row['value'] if row else None
+
+    def set_meta(self, key: str, value: str, overwrite: bool = True) -> str:
+        """Store a meta value and return the one in effect (the existing one if overwrite is False)"""
+        with self.transaction() as conn:
+            conn.execute(SQL_SET_META if overwrite else SQL_ADD_META, (key, value))
+            return conn.execute(SQL_SELECT_META, (key,)).fetchone()['value']
+
+    # Compliance files
+
+    def upsert_compliance_files(self, files: Iterable[Dict[str, Any]], prune: bool = False) -> None:
+        """
+        Record compliance files; fields left out or None keep their stored value.
+        With prune=True, files is the complete remote listing and anything else is dropped.
+        """
+        now = time.time()
+        columns = ('id', 'filename', 'purpose', 'status', 'created_at', 'upload_time', 'summary', 'sha256')
+        rows = [{**{c: f.get(c) for c in columns}, 'updated_at': now} for f in files]
+        with self.transaction() as conn:
+            conn.executemany(SQL_UPSERT_COMPLIANCE_FILE, rows)
+            if prune:
+                keep = {row['id'] for row in rows}
+                stale = [(row['id'],) for row in conn.execute(SQL_SELECT_COMPLIANCE_FILE_IDS) if row['id'] not in keep]
+                conn.executemany(SQL_DELETE_COMPLIANCE_FILE, stale)
+                if stale:
+                    # Their passages went with them
+                    conn.execute(SQL_BUMP_COMPLIANCE_TEXT_VERSION)
+
+    def list_compliance_files(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.connection().execute(SQL_LIST_COMPLIANCE_FILES)]
+
+    def page_compliance_files(self, limit: int = 50, after: Optional[Tuple[int, str]] = None,
+                              purpose: Optional[str] = None, status: Optional[str] = None,
+                              q: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One page of compliance files after the (created_at, id) of the previous page's last row"""
+        params = {
+            'purpose': purpose,
+            'status': status,
+            'q': q,
+            'after_created': after[0] if after else None,
+            'after_id': after[1] if after else None,
+            'limit': limit,
+        }
+        return [dict(row) for row in self.connection().execute(SQL_PAGE_COMPLIANCE_FILES, params)]
+
+    def get_compliance_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(SQL_SELECT_COMPLIANCE_FILE, (file_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_compliance_file_by_hash(self, sha256: str) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(SQL_SELECT_COMPLIANCE_FILE_BY_HASH, (sha256,)).fetchone()
+        return dict(row) if row else None
+
+    def delete_compliance_file(self, file_id: str) -> bool:
+        with self.transaction() as conn:
+            deleted = bool(conn.execute(SQL_DELETE_COMPLIANCE_FILE, (file_id,)).rowcount)
+            if deleted:
+                conn.execute(SQL_BUMP_COMPLIANCE_TEXT_VERSION)
+            return deleted
+
+    def compliance_text_version(self) -> int:
+        """Bumped whenever the stored compliance passages or rules change"""
+        row = self.connection().execute(SQL_COMPLIANCE_TEXT_VERSION).fetchone()
+        return int(row['value']) if row else 0
+
+    def set_compliance_passages(self, file_id: str, passages: List[str]) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_DELETE_COMPLIANCE_PASSAGES, (file_id,))
+            conn.executemany(SQL_INSERT_COMPLIANCE_PASSAGE, [
+                (file_id, position, text) for position, text in enumerate(passages)
+            ])
+            conn.execute(SQL_BUMP_COMPLIANCE_TEXT_VERSION)
+
+    def set_compliance_rules(self, file_id: str, rules: Dict[str, Any]) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_SET_COMPLIANCE_RULES, (file_id, json.dumps(rules)))
+            conn.execute(SQL_BUMP_COMPLIANCE_TEXT_VERSION)
+
+    def compliance_rules(self) -> List[Dict[str, Any]]:
+        return [
+            {'file_id': row['file_id'], 'filename': row['filename'], 'rules': json.loads(row['rules'])}
+            for row in self.connection().execute(SQL_SELECT_COMPLIANCE_RULES)
+        ]
+
+    def compliance_passages(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.connection().execute(SQL_SELECT_COMPLIANCE_PASSAGES)]
+
+    def set_vector_store_files(self, file_ids: Iterable[str]) -> None:
+        """Replace the recorded membership of the compliance vector store with a fresh listing"""
+        with self.transaction() as conn:
+            conn.execute(SQL_DELETE_VECTOR_STORE_FILES)
+            conn.executemany(SQL_INSERT_VECTOR_STORE_FILE, [(file_id,) for file_id in file_ids])
+            conn.execute(SQL_SET_META, (VECTOR_STORE_FILES_SYNCED, str(time.time())))
+
+    def vector_store_files_synced(self) -> bool:
+        return self.get_meta(VECTOR_STORE_FILES_SYNCED) is not None
+
+    def count_compliance_files_without_text(self) -> Optional[int]:
+        """Vector store files with no local text, or None before the vector store was first listed"""
+        if not self.vector_store_files_synced():
+            return None
+        return self.connection().execute(SQL_COUNT_COMPLIANCE_FILES_WITHOUT_TEXT).fetchone()['n']
+
+    # Cache entries
+
+    def cache_get(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Cached (value, stored_at) for a key, or None"""
+        row = self.connection().execute(SQL_SELECT_CACHE_ENTRY, (namespace, key)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row['value']), row['stored_at']
+
+    def cache_put(self, namespace: str, key: str, value: Any) -> None:
+        with self.transaction() as conn:
+            conn.execute(SQL_PUT_CACHE_ENTRY, (namespace, key, json.dumps(value, default=str), time.time()))
+
+    def cache_delete(self, namespace: str, key: Optional[str] = None) -> int:
+        """Drop one key, or the whole namespace when key is None"""
+        with self.transaction() as conn:
+            if key is None:
+                return conn.execute(SQL_CLEAR_CACHE, (namespace,)).rowcount
+            return conn.execute(SQL_DELETE_CACHE_ENTRY, (namespace, key)).rowcount
+
+    def cache_purge(self, namespace: str, older_than: float) -> int:
+        with self.transaction() as conn:
+            return conn.execute(SQL_PURGE_CACHE, (namespace, older_than)).rowcount
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block, taking the write lock up front"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+
+
+_store: Optional[ProcurementStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ProcurementStore:
+    """Process-wide ProcurementStore, opened on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ProcurementStore()
+    return _store
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import queue
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+_DONE = object()
+
+
+def _to_jsonable(value: Any) -> Any:
+    """json.dumps fallback for pydantic models and other objects in agent events"""
+    if hasattr(value, 'model_dump'):
+        return value.model_dump()
+    if hasattr(value, 'dict'):
+        return value.dict()
+    return str(value)
+
+
+def iterate_events(make_events: Callable[[], AsyncIterator[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    """
+    Drive an async event generator on its own event loop thread and hand each
+    event to the calling (WSGI) thread as soon as it is produced.
+
+    The generator runs as a single task, so context managers such as trace()
+    stay within one context for its whole lifetime. If the consumer stops early
+    (e.g. the client disconnected) the task is cancelled.
+    """
+    events: "queue.Queue[Any]" = queue.Queue()
+    loop = asyncio.new_event_loop()
+
+    async def pump():
+        try:
+            async for event in make_events():
+                events.put(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error in event stream: {str(e)}")
+            events.put({"type": "error", "message": str(e)})
+        finally:
+            events.put(_DONE)
+
+    task = loop.create_task(pump())
+
+    def run_loop():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run_loop, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            event = events.get()
+            if event is _DONE:
+                break
+            yield event
+    finally:
+        if not task.done():
+            loop.call_soon_threadsafe(task.cancel)
+        thread.join()
+        loop.close()
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Encode an event as a Server-Sent Events message"""
+    data = json.dumps(event, default=_to_jsonable)
+    return f"event: {event.get('type', 'message')}\ndata: {data}\n\n"
+
+
+def format_ndjson(event: Dict[str, Any]) -> str:
+    """Encode an event as one line of newline-delimited JSON"""
+    return json.dumps(event, default=_to_jsonable) + "\n"
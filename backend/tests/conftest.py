@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# Modules import each other as top-level names (`from storage import ...`), as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_scratch = tempfile.mkdtemp(prefix='procurement-tests-')
+os.environ.setdefault('OPENAI_API_KEY', 'sk-test')
+os.environ.setdefault('PROGRESS_SINK', 'none')
+# Agent runs are faked in tests; don't try to upload their traces
+os.environ.setdefault('OPENAI_AGENTS_DISABLE_TRACING', '1')
+os.environ.setdefault('PROCUREMENT_DB_PATH', os.path.join(_scratch, 'procurement.db'))
+os.environ.setdefault('PAGE_CACHE_DIR', os.path.join(_scratch, 'page_cache'))
+os.environ.setdefault('THUMBNAIL_CACHE_DIR', os.path.join(_scratch, 'thumbnails'))
+os.environ.setdefault('PDF_TEXT_CACHE_DIR', os.path.join(_scratch, 'pdf_text_cache'))
@@ -0,0 +1,82 @@
+from manager import match_batch_results
+from working_agents.compliance_agent import ComplianceResult
+
+
+def _result(name, compliant=True):
+    return ComplianceResult(product_name=name, compliant=compliant, explanation=name,
+                            matched_file_info='', drug_description='')
+
+
+def _batch(*names):
+    return [{'name': name} for name in names]
+
+
+def test_matches_by_name_regardless_of_order():
+    returned = [_result('B'), _result('A')]
+    matched = match_batch_results(_batch('A', 'B'), returned)
+    assert [r.explanation for r in matched] == ['A', 'B']
+
+
+def test_reordered_and_renamed_results_keep_name_matches():
+    # The agent reordered its results and rewrote one name
+    returned = [_result('C'), _result('A'), _result('Product B (rewritten)')]
+    matched = match_batch_results(_batch('A', 'B', 'C'), returned)
+    assert matched[0].explanation == 'A'
+    assert matched[1] is None
+    assert matched[2].explanation == 'C'
+
+
+def test_positions_fill_gaps_only_when_order_is_intact():
+    returned = [_result('A'), _result('Product B (rewritten)'), _result('C')]
+    matched = match_batch_results(_batch('A', 'B', 'C'), returned)
+    assert [r.explanation for r in matched] == ['A', 'Product B (rewritten)', 'C']
+
+
+def test_missing_results_are_left_for_single_retries():
+    matched = match_batch_results(_batch('A', 'B', 'C'), [_result('A'), _result('C')])
+    assert matched[0].explanation == 'A'
+    assert matched[1] is None
+    assert matched[2].explanation == 'C'
+
+
+def test_duplicate_names_are_taken_in_order():
+    returned = [_result('A', compliant=True), _result('A', compliant=False)]
+    matched = match_batch_results(_batch('A', 'A'), returned)
+    assert [r.compliant for r in matched] == [True, False]
+
+
+class _RunResult:
+    def __init__(self, output):
+        self.output = output
+
+    def final_output_as(self, _):
+        return self.output
+
+
+def test_check_batch_retries_only_unmatched_products(monkeypatch):
+    import asyncio
+
+    import manager
+    from working_agents.compliance_agent import ComplianceCheckResults
+
+    returned = ComplianceCheckResults(results=[_result('C'), _result('A'), _result('Product B (rewritten)')])
+
+    async def fake_run(agent, query):
+        return _RunResult(returned)
+
+    retried = []
+
+    async def fake_check_product(self, product, file_id, vector_store_id):
+        retried.append(product['name'])
+        return _result('retried')
+
+    monkeypatch.setattr(manager.Runner, 'run', fake_run)
+    monkeypatch.setattr(manager, 'create_compliance_agent', lambda **kwargs: None)
+    monkeypatch.setattr(manager.ProcurementManager, '_use_local_retrieval', lambda self: False)
+    monkeypatch.setattr(manager.ProcurementManager, '_check_product', fake_check_product)
+
+    batch = [{'name': name, 'price': '$1', 'website': 'a.com'} for name in ('A', 'B', 'C')]
+    results = asyncio.run(manager.ProcurementManager()._check_batch(batch, 'file-1', 'vs-1'))
+    assert retried == ['B']
+    assert [r.explanation for r in results] == ['A', 'retried', 'C']
+    assert [r.product_name for r in results] == ['A', 'B', 'C']
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+import manager
+from compliance_cache import ComplianceCache, product_fingerprint
+from storage import ProcurementStore
+from working_agents.compliance_agent import ComplianceResult
+
+
+def _verdict(name, compliant=True):
+    return ComplianceResult(product_name=name, compliant=compliant, explanation='ok',
+                            matched_file_info='', drug_description='')
+
+
+def _cache(tmp_path):
+    return ComplianceCache(ProcurementStore(str(tmp_path / 'store.db'), seed_path=None))
+
+
+def test_fingerprint_ignores_formatting_but_not_mpn():
+    product = {'name': 'Nitrile  Gloves', 'mpn': 'AB-1', 'website': 'https://www.a.com/'}
+    assert product_fingerprint(product) == product_fingerprint({'name': 'nitrile gloves', 'mpn': 'ab-1', 'website': 'a.com'})
+    assert product_fingerprint(product) != product_fingerprint({**product, 'mpn': 'AB-2'})
+
+
+def test_verdicts_are_cached_per_docset_version(tmp_path):
+    cache = _cache(tmp_path)
+    version = cache.init_docset_version(['file-1'])
+    product = {'name': 'Gloves', 'website': 'a.com'}
+    cache.put(product, version, _verdict('Gloves'))
+
+    [hit] = cache.get_many([{'name': 'gloves', 'website': 'a.com'}], version)
+    assert hit.compliant and hit.product_name == 'gloves'
+
+    new_version = cache.invalidate(['file-1', 'file-2'])
+    assert new_version != version
+    assert cache.get_many([product], new_version) == [None]
+    assert cache.get_many([product], version) == [None]
+
+
+def test_deleting_a_compliance_file_invalidates_verdicts(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    remote_files = ['file-1', 'file-2']
+
+    async def delete_file(file_id):
+        remote_files.remove(file_id)
+        return SimpleNamespace(deleted=True)
+
+    client = SimpleNamespace(
+        files=SimpleNamespace(delete=delete_file),
+        vector_stores=SimpleNamespace(files=SimpleNamespace(list=lambda vector_store_id: None)),
+    )
+
+    async def call(fn):
+        return await fn(client)
+
+    async def collect(fn):
+        return [SimpleNamespace(id=file_id) for file_id in remote_files]
+
+    monkeypatch.setattr(manager.llm_client, 'call', call)
+    monkeypatch.setattr(manager.llm_client, 'collect', collect)
+    monkeypatch.setattr(manager, 'get_store', lambda: cache.store)
+    monkeypatch.setattr(manager, 'get_compliance_cache', lambda: cache)
+    procurement = manager.ProcurementManager()
+    procurement._vector_store_id = 'vs-1'
+
+    version = asyncio.run(procurement.compliance_docset_version())
+    product = {'name': 'Gloves', 'website': 'a.com'}
+    cache.put(product, version, _verdict('Gloves'))
+
+    assert asyncio.run(procurement.delete_compliance_file('file-2'))
+    new_version = asyncio.run(procurement.compliance_docset_version())
+    assert new_version != version
+    assert cache.get_many([product], new_version) == [None]
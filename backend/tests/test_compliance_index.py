@@ -0,0 +1,70 @@
+from compliance_index import BM25Index, ComplianceIndex, requirement_passages, split_passages, tokenize
+from storage import ProcurementStore
+
+
+def _passages(*texts):
+    return [{'file_id': 'file-1', 'filename': 'policy.pdf', 'position': i, 'text': text}
+            for i, text in enumerate(texts)]
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize('The Gloves and masks') == ['glove', 'mask']
+
+
+def test_split_passages_overlaps_windows():
+    text = ' '.join(str(i) for i in range(10))
+    assert split_passages(text, words=4, overlap=2) == ['0 1 2 3', '2 3 4 5', '4 5 6 7', '6 7 8 9']
+
+
+def test_search_ranks_matching_passages_first():
+    index = BM25Index(_passages(
+        'Syringes must be sterile and individually wrapped.',
+        'Nitrile gloves must be powder free. Gloves must meet ASTM D6319.',
+        'Deliveries arrive on weekdays.',
+    ))
+    results = index.search('nitrile gloves', k=2)
+    assert [r['position'] for r in results] == [1]
+    assert results[0]['score'] > 0
+
+
+def test_search_limits_results_and_ignores_unknown_terms():
+    index = BM25Index(_passages('gauze pads', 'gauze rolls', 'gauze sponges'))
+    assert len(index.search('gauze', k=2)) == 2
+    assert index.search('defibrillator') == []
+    assert BM25Index([]).search('gauze') == []
+
+
+def test_requirement_passages_prefer_requirement_wording_in_document_order():
+    passages = _passages(
+        'About our hospital.',
+        'Vendors must hold ISO 13485 and prices shall not exceed $50.',
+        'Our history.',
+        'Only approved vendors may be used.',
+    )
+    assert [p['position'] for p in requirement_passages(passages, k=2)] == [1, 3]
+    assert requirement_passages(_passages('Nothing to see.')) == []
+
+
+def _store(tmp_path):
+    return ProcurementStore(str(tmp_path / 'store.db'))
+
+
+def test_index_covers_all_documents_only_when_every_file_has_text(tmp_path):
+    store = _store(tmp_path)
+    index = ComplianceIndex(store)
+    store.upsert_compliance_files([{'id': 'file-1', 'filename': 'a.pdf', 'purpose': 'assistants'}])
+    store.set_compliance_passages('file-1', ['Gloves must be nitrile.'])
+    # Until the vector store has been listed its contents are unknown
+    assert not index.covers_all_documents()
+    store.set_vector_store_files(['file-1'])
+    assert index.covers_all_documents()
+
+    # Other assistants files in the registry are not searched by the compliance check
+    store.upsert_compliance_files([{'id': 'file-3', 'filename': 'notes.txt', 'purpose': 'assistants'}])
+    assert index.covers_all_documents()
+
+    # A scanned file, or one uploaded elsewhere, is only in the hosted vector store
+    store.set_vector_store_files(['file-1', 'file-2'])
+    assert index.has_documents()
+    assert not index.covers_all_documents()
+    assert [p['text'] for p in index.requirements()] == ['Gloves must be nitrile.']
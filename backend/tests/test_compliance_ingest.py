@@ -0,0 +1,105 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+
+import manager
+from storage import ProcurementStore
+
+
+class _FakeClient:
+    def __init__(self):
+        self.created = []
+        self.batches = []
+        self.files = SimpleNamespace(create=self._create_file)
+        self.vector_stores = SimpleNamespace(file_batches=SimpleNamespace(create=self._create_batch))
+
+    async def _create_file(self, file, purpose):
+        filename, data = file
+        await asyncio.sleep(0.01)
+        self.created.append(filename)
+        return SimpleNamespace(id=f"file-{len(self.created)}", filename=filename, purpose=purpose,
+                               status='processed', created_at=1)
+
+    async def _create_batch(self, vector_store_id, files):
+        self.batches.append([f['file_id'] for f in files])
+        return SimpleNamespace(id='batch-1', status='in_progress',
+                               file_counts=SimpleNamespace(model_dump=lambda: {'total': len(files)}))
+
+
+@pytest.fixture
+def ingest_env(tmp_path, monkeypatch):
+    client = _FakeClient()
+    store = ProcurementStore(str(tmp_path / 'store.db'), seed_path=None)
+
+    async def call(fn):
+        return await fn(client)
+
+    async def summary(self, content):
+        return f"summary of {content}"
+
+    async def no_invalidate(self):
+        return None
+
+    monkeypatch.setattr(manager.llm_client, 'call', call)
+    monkeypatch.setattr(manager, 'get_store', lambda: store)
+    monkeypatch.setattr(manager.ProcurementManager, '_generate_file_summary', summary)
+    monkeypatch.setattr(manager.ProcurementManager, '_invalidate_compliance_cache', no_invalidate)
+    procurement = manager.ProcurementManager()
+    procurement._vector_store_id = 'vs-1'
+    return SimpleNamespace(client=client, store=store, manager=procurement)
+
+
+def test_files_upload_concurrently_into_one_batch(ingest_env):
+    uploads = [(f"doc{i}.txt", io.BytesIO(f"policy {i}".encode())) for i in range(3)]
+    result = asyncio.run(ingest_env.manager.ingest_compliance_docs(uploads, upload_time=1.0))
+
+    assert result['batch_id'] == 'batch-1'
+    assert sorted(ingest_env.client.created) == ['doc0.txt', 'doc1.txt', 'doc2.txt']
+    assert len(ingest_env.client.batches) == 1
+    assert [f['summary'] for f in result['files']] == ['summary of policy 0', 'summary of policy 1', 'summary of policy 2']
+
+
+def test_failed_summary_keeps_the_uploaded_file(ingest_env, monkeypatch):
+    async def failing_summary(self, content):
+        raise RuntimeError('rate limited')
+
+    monkeypatch.setattr(manager.ProcurementManager, '_generate_file_summary', failing_summary)
+    result = asyncio.run(ingest_env.manager.ingest_compliance_docs(
+        [('doc.txt', io.BytesIO(b'policy'))], upload_time=1.0))
+
+    assert result['failed'] == []
+    [uploaded] = result['files']
+    assert uploaded['summary'] == ''
+    assert ingest_env.client.batches == [[uploaded['file_id']]]
+    assert ingest_env.store.find_compliance_file_by_hash(manager.content_hash(b'policy'))['id'] == uploaded['file_id']
+
+
+def test_identical_concurrent_uploads_share_one_file(ingest_env, monkeypatch):
+    summaries = []
+
+    async def counting_summary(self, content):
+        summaries.append(content)
+        return 'summary'
+
+    monkeypatch.setattr(manager.ProcurementManager, '_generate_file_summary', counting_summary)
+    uploads = [('a.txt', io.BytesIO(b'same policy')), ('copy of a.txt', io.BytesIO(b'same policy'))]
+    result = asyncio.run(ingest_env.manager.ingest_compliance_docs(uploads, upload_time=1.0))
+
+    assert ingest_env.client.created == ['a.txt']
+    assert len(summaries) == 1
+    first, second = result['files']
+    assert second['file_id'] == first['file_id']
+    assert [first['duplicate'], second['duplicate']] == [False, True]
+    assert ingest_env.client.batches == [[first['file_id']]]
+
+
+def test_reuploads_reuse_the_stored_file_and_summary(ingest_env):
+    asyncio.run(ingest_env.manager.ingest_compliance_docs([('a.txt', io.BytesIO(b'policy'))], upload_time=1.0))
+    result = asyncio.run(ingest_env.manager.ingest_compliance_docs([('b.txt', io.BytesIO(b'policy'))], upload_time=2.0))
+
+    assert ingest_env.client.created == ['a.txt']
+    assert result['batch_id'] is None
+    assert result['files'][0]['summary'] == 'summary of policy'
+    assert result['files'][0]['duplicate']
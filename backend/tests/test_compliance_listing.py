@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import manager
+from storage import ProcurementStore
+
+
+def _file(file_id, created_at, purpose='assistants'):
+    return SimpleNamespace(id=file_id, filename=f"{file_id}.pdf", purpose=purpose,
+                           created_at=created_at, status='processed')
+
+
+class _Page:
+    def __init__(self, files, size, offset=0):
+        self._files, self._size, self._offset = files, size, offset
+        self.data = files[offset:offset + size]
+
+    def has_next_page(self):
+        return self._offset + self._size < len(self._files)
+
+    async def get_next_page(self):
+        return _Page(self._files, self._size, self._offset + self._size)
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    store = ProcurementStore(str(tmp_path / 'store.db'), seed_path=None)
+    state = SimpleNamespace(files=[], reads=[], store=store)
+
+    async def list_files(order, limit):
+        newest_first = sorted(state.files, key=lambda f: (f.created_at, f.id), reverse=True)
+        return _Page(newest_first, 2)
+
+    client = SimpleNamespace(files=SimpleNamespace(list=list_files))
+
+    async def call(fn):
+        files = await fn(client)
+        state.reads.append([f.id for f in files])
+        return files
+
+    monkeypatch.setattr(manager, 'get_store', lambda: store)
+    monkeypatch.setattr(manager.llm_client, 'call', call)
+    return state
+
+
+def test_pages_follow_the_cursor_without_overlap(remote):
+    remote.files = [_file(f"file-{i}", created_at=100 + i // 2) for i in range(7)]
+    procurement = manager.ProcurementManager()
+
+    seen, cursor = [], None
+    while True:
+        page = asyncio.run(procurement.page_compliance_files(limit=3, cursor=cursor))
+        seen.extend(f['id'] for f in page['files'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    # Ties on created_at are broken by id, so nothing repeats or goes missing
+    assert seen == [f.id for f in sorted(remote.files, key=lambda f: (f.created_at, f.id), reverse=True)]
+
+
+def test_pages_filter_on_purpose_and_text(remote):
+    remote.files = [_file('gloves-policy', 100), _file('batch-out', 101, purpose='batch_output')]
+    procurement = manager.ProcurementManager()
+
+    page = asyncio.run(procurement.page_compliance_files(purpose='assistants'))
+    assert [f['id'] for f in page['files']] == ['gloves-policy']
+    page = asyncio.run(procurement.page_compliance_files(q='batch'))
+    assert [f['id'] for f in page['files']] == ['batch-out']
+
+
+def test_incremental_sync_reads_only_files_since_the_high_water_mark(remote):
+    remote.files = [_file(f"file-{i}", created_at=100 + i) for i in range(5)]
+    procurement = manager.ProcurementManager()
+    asyncio.run(procurement.sync_compliance_files(full=True))
+    assert remote.store.get_meta('compliance_files_high_water') == '104'
+
+    remote.files.append(_file('file-5', created_at=105))
+    asyncio.run(procurement.sync_compliance_files())
+    # Stops at the first file older than the newest one already seen
+    assert remote.reads[-1] == ['file-5', 'file-4']
+    assert remote.store.get_meta('compliance_files_high_water') == '105'
+    assert len(remote.store.list_compliance_files()) == 6
+
+
+def test_full_sync_drops_files_deleted_remotely(remote):
+    remote.files = [_file('file-1', 100), _file('file-2', 101)]
+    procurement = manager.ProcurementManager()
+    asyncio.run(procurement.sync_compliance_files(full=True))
+
+    remote.files = [_file('file-2', 101)]
+    asyncio.run(procurement.sync_compliance_files())
+    assert len(remote.store.list_compliance_files()) == 2
+    asyncio.run(procurement.sync_compliance_files(full=True))
+    assert [f['id'] for f in remote.store.list_compliance_files()] == ['file-2']
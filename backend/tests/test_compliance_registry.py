@@ -0,0 +1,45 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import manager
+from storage import ProcurementStore
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    store = ProcurementStore(str(tmp_path / 'store.db'), seed_path=None)
+    listings = []
+
+    async def collect(fn):
+        listings.append(fn)
+        return [SimpleNamespace(id='vs-remote', name='compliance_store')]
+
+    monkeypatch.setattr(manager, 'get_store', lambda: store)
+    monkeypatch.setattr(manager.llm_client, 'collect', collect)
+    return SimpleNamespace(store=store, listings=listings)
+
+
+def test_vector_store_id_is_shared_by_every_manager(registry):
+    assert asyncio.run(manager.ProcurementManager().get_or_create_vector_store()) == 'vs-remote'
+    assert asyncio.run(manager.ProcurementManager().get_or_create_vector_store()) == 'vs-remote'
+    assert len(registry.listings) == 1
+    assert registry.store.get_meta('vector_store:compliance_store') == 'vs-remote'
+
+
+def test_summaries_and_upload_times_outlive_the_manager(registry, monkeypatch):
+    registry.store.upsert_compliance_files([{
+        'id': 'file-1', 'filename': 'policy.pdf', 'purpose': 'assistants', 'status': 'processed',
+        'created_at': 100, 'upload_time': 150.0, 'summary': 'Gloves must be nitrile.',
+    }])
+    registry.store.set_meta('compliance_files_synced', str(time.time()))
+
+    [listed] = asyncio.run(manager.ProcurementManager().list_compliance_files())
+    assert listed['summary'] == 'Gloves must be nitrile.'
+    assert listed['upload_time'] == 150.0
+
+    # A later sync of the remote listing keeps the local fields
+    registry.store.upsert_compliance_files([{'id': 'file-1', 'filename': 'policy.pdf', 'status': 'processed'}])
+    assert registry.store.get_compliance_file('file-1')['summary'] == 'Gloves must be nitrile.'
@@ -0,0 +1,87 @@
+from compliance_rules import FAIL, PASS, RuleSet, extract_rules
+
+
+def _rule_set(*texts):
+    return RuleSet([
+        {'file_id': f"file-{i}", 'filename': f"doc{i}.pdf", 'rules': extract_rules(text)}
+        for i, text in enumerate(texts)
+    ])
+
+
+def test_price_ceiling_needs_a_currency_amount():
+    assert extract_rules("Price adjustments may be made at most 2 times per year.")['max_price'] is None
+    assert extract_rules("Quotes must remain valid for up to 30 days. Price holds apply.")['max_price'] is None
+    assert extract_rules("Price increases may not exceed 5% per year.")['max_price'] is None
+    assert extract_rules("The unit price must not exceed $12.50 each.")['max_price'] == 12.5
+    assert extract_rules("Unit price must not exceed $0.50 per glove.")['max_price'] == 0.5
+    assert extract_rules("Cost per case: no more than 40 USD.")['max_price'] == 40.0
+
+
+def test_contract_totals_are_not_unit_ceilings():
+    assert extract_rules("The total contract price shall not exceed $250,000.")['max_price'] is None
+    assert extract_rules("Annual cost must be below $1,000,000.")['max_price'] is None
+
+
+def test_banned_list_references_name_no_manufacturer():
+    assert extract_rules("Excluded vendors are listed in Appendix B.")['banned_manufacturers'] == []
+    rules = extract_rules("Banned manufacturers: Acme Medical, Globex and Initech.")
+    assert rules['banned_manufacturers'] == ['Acme Medical', 'Globex', 'Initech']
+    assert extract_rules("Products from Umbrella Corp are prohibited.")['banned_manufacturers'] == ['Umbrella Corp']
+
+
+def test_certifications_and_flags():
+    rules = extract_rules("All gloves must be FDA 510(k) cleared. Gloves must be latex-free and powder-free.")
+    assert rules['certifications'] == ['FDA 510(K)']
+    assert rules['flags'] == ['latex_free', 'powder_free']
+    assert rules['complete'] is True
+
+
+def test_uncovered_requirements_mark_rules_incomplete():
+    assert extract_rules("Gloves must be latex-free.")['complete'] is True
+    assert extract_rules("Gloves must be latex-free. Suppliers must hold a current state license.")['complete'] is False
+
+
+def test_failures_are_settled_and_passes_are_left_to_the_llm():
+    rules = _rule_set("Gloves must be latex-free. Banned manufacturers: Acme.")
+    results = rules.screen([
+        {'name': 'Nitrile exam gloves'},
+        {'name': 'Latex surgical gloves'},
+        {'name': 'Acme nitrile gloves'},
+    ])
+    assert results[0] is None
+    assert results[1].compliant is False and 'latex-free' in results[1].explanation
+    assert results[2].compliant is False and 'banned' in results[2].explanation
+    assert results[1].matched_file_info == 'doc0.pdf'
+
+
+def test_screen_mode_passes_only_when_rules_cover_the_documents():
+    covered = _rule_set("Gloves must be latex-free.")
+    assert covered.screen([{'name': 'Nitrile exam gloves'}], mode='screen')[0].compliant is True
+
+    partial = _rule_set("Gloves must be latex-free. Suppliers must hold a current state license.")
+    assert partial.screen([{'name': 'Nitrile exam gloves'}], mode='screen') == [None]
+
+
+def test_pack_price_ceilings_are_left_to_the_llm():
+    rules = extract_rules("The unit price must not exceed $12.50 per box.")
+    assert rules['max_price'] is None
+    assert not rules['complete']
+
+
+def test_price_rule_compares_unit_prices():
+    rules = _rule_set("Unit price must not exceed $0.50 per glove.")
+    outcomes = rules.evaluate([
+        {'name': 'Nitrile Exam Gloves, Box of 100', 'price': '$12.99'},
+        {'name': 'Vinyl Gloves 50/box', 'price': '$40.00'},
+        {'name': 'Latex Gloves', 'price': '$0.75 each'},
+        {'name': 'Exam Gloves 200 ct', 'price': '$20'},
+        {'name': 'Nitrile Exam Gloves', 'price': '$12.99'},
+        {'name': 'c'},
+    ])
+    assert list(outcomes['price']) == [PASS, FAIL, FAIL, PASS, 0, 0]
+
+
+def test_pack_prices_are_not_rejected_against_unit_ceilings():
+    rules = _rule_set("Unit price must not exceed $0.50 per glove.")
+    assert rules.screen([{'name': 'Nitrile Exam Gloves, Box of 100', 'price': '$12.99'}]) == [None]
+    assert rules.screen([{'name': 'Nitrile Exam Gloves', 'price': '$12.99'}]) == [None]
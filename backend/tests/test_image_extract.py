@@ -0,0 +1,73 @@
+import pytest
+
+import image_extract
+from image_extract import canonical_url, dedupe_key, extract_images, extraction_key, size_hint
+
+PAGE = """
+<html><body>
+  <header><img src="/static/logo.png" alt="Acme Medical Supply logo" width="40"></header>
+  <div class="product-gallery">
+    <div><img src="/media/nitrile-exam-gloves.jpg?w=800" alt="Nitrile Exam Gloves" width="800"></div>
+    <img src="/media/nitrile-exam-gloves.jpg?w=200" alt="Nitrile Exam Gloves">
+  </div>
+  <p><img src="https://cdn.example.com/product/gloves-box-side.jpg" alt="Gloves box side"></p>
+  <img src="/media/unrelated.jpg" alt="Holiday hours">
+  <img alt="no source">
+</body></html>
+"""
+
+
+@pytest.fixture(params=['lxml', 'stdlib'])
+def parser(request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(image_extract, 'etree', None)
+    elif image_extract.etree is None:
+        pytest.skip('lxml is not installed')
+    return request.param
+
+
+def test_canonical_url_resolves_and_normalizes():
+    assert canonical_url(' img/a.jpg#zoom ', 'https://Shop.Example.com:443/p/1') == 'https://shop.example.com/p/img/a.jpg'
+    assert canonical_url('//cdn.example.com:8080/a.jpg', 'https://shop.example.com/') == 'https://cdn.example.com:8080/a.jpg'
+
+
+def test_dedupe_key_ignores_size_parameters():
+    assert dedupe_key('https://a.com/x.jpg?w=200&id=1') == dedupe_key('https://a.com/x.jpg?id=1&width=800&q=90')
+    assert dedupe_key('https://a.com/x.jpg?id=1') != dedupe_key('https://a.com/x.jpg?id=2')
+
+
+def test_size_hint_reads_markup_and_url():
+    assert size_hint({'width': '120px'}, 'https://a.com/x.jpg') == 120
+    assert size_hint({'srcset': 'a.jpg 300w, b.jpg 900w'}, 'https://a.com/x.jpg') == 900
+    assert size_hint({}, 'https://a.com/x_640x480.jpg') == 640
+    assert size_hint({'width': '100%'}, 'https://a.com/x.jpg') == 0
+
+
+def test_extraction_key_ignores_case_and_spacing():
+    assert extraction_key('Nitrile  Gloves') == extraction_key('nitrile gloves')
+
+
+def test_extract_images_ranks_dedupes_and_drops_noise(parser):
+    images = extract_images(PAGE, 'Nitrile Exam Gloves', 'https://shop.example.com/p/gloves')
+    urls = [image['url'] for image in images]
+    assert urls[0] == 'https://shop.example.com/media/nitrile-exam-gloves.jpg?w=800'
+    # The 200px copy of the same picture counts once
+    assert not any(url.endswith('?w=200') for url in urls)
+    assert 'https://shop.example.com/static/logo.png' not in urls
+    assert 'https://shop.example.com/media/unrelated.jpg' not in urls
+    assert all(image['source_url'] == 'https://shop.example.com/p/gloves' for image in images)
+    assert [image['score'] for image in images] == sorted((image['score'] for image in images), reverse=True)
+
+
+def test_extract_images_parsers_agree(monkeypatch):
+    if image_extract.etree is None:
+        pytest.skip('lxml is not installed')
+    with_lxml = extract_images(PAGE, 'Nitrile Exam Gloves', 'https://shop.example.com/')
+    monkeypatch.setattr(image_extract, 'etree', None)
+    assert extract_images(PAGE, 'Nitrile Exam Gloves', 'https://shop.example.com/') == with_lxml
+
+
+def test_extract_images_handles_empty_and_broken_markup(parser):
+    assert extract_images('', 'Gloves', 'https://a.com/') == []
+    broken = '<div class="product-image"><img src="/g.jpg" alt="Gloves"><div><span>'
+    assert [i['url'] for i in extract_images(broken, 'Gloves', 'https://a.com/')] == ['https://a.com/g.jpg']
@@ -0,0 +1,99 @@
+import asyncio
+import io
+import struct
+
+import pytest
+
+import image_proxy
+from image_proxy import ImageProxyError, check_url, fetch_public, image_dimensions
+
+
+def _png_header(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+def _jpeg_header(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>HBHH', 17, 8, height, width) + b'\x00' * 10
+    return b'\xff\xd8' + app0 + sof0
+
+
+def test_image_dimensions_reads_headers():
+    assert image_dimensions(_png_header(640, 480)) == (640, 480, 'image/png')
+    assert image_dimensions(b'GIF89a' + struct.pack('<HH', 32, 16)) == (32, 16, 'image/gif')
+    assert image_dimensions(_jpeg_header(1200, 800)) == (1200, 800, 'image/jpeg')
+    bmp = b'BM' + b'\x00' * 16 + struct.pack('<ii', 100, -50)
+    assert image_dimensions(bmp) == (100, 50, 'image/bmp')
+    assert image_dimensions(b'<html></html>') is None
+
+
+def test_image_dimensions_matches_pillow():
+    Image = pytest.importorskip('PIL.Image')
+    for fmt, expected in (('WEBP', 'image/webp'), ('JPEG', 'image/jpeg'), ('PNG', 'image/png')):
+        out = io.BytesIO()
+        Image.new('RGB', (301, 157)).save(out, fmt)
+        assert image_dimensions(out.getvalue()[:image_proxy.PROBE_BYTES]) == (301, 157, expected)
+
+
+@pytest.mark.parametrize('url', [
+    'ftp://example.com/a.png',
+    '/relative/a.png',
+    'http://127.0.0.1/a.png',
+    'http://169.254.169.254/latest/meta-data/',
+    'http://10.0.0.5/a.png',
+    'http://[::1]/a.png',
+    'http://localhost:5001/api/inventory',
+])
+def test_check_url_rejects_private_and_malformed(url, monkeypatch):
+    monkeypatch.setattr(image_proxy, 'ALLOW_PRIVATE_HOSTS', False)
+    with pytest.raises(ImageProxyError) as error:
+        asyncio.run(check_url(url))
+    assert error.value.status == 400
+
+
+def test_check_url_returns_vetted_address(monkeypatch):
+    monkeypatch.setattr(image_proxy, 'ALLOW_PRIVATE_HOSTS', False)
+    assert asyncio.run(check_url('https://93.184.216.34/a.png')) == '93.184.216.34'
+
+
+def test_fetch_public_checks_every_redirect(monkeypatch):
+    monkeypatch.setattr(image_proxy, 'ALLOW_PRIVATE_HOSTS', False)
+    calls = []
+
+    async def fake_fetch(url, **options):
+        calls.append((url, options))
+        return {'status': 302, 'headers': {'location': 'http://169.254.169.254/latest/meta-data/'}, 'content': None}
+
+    monkeypatch.setattr(image_proxy, 'fetch', fake_fetch)
+    with pytest.raises(ImageProxyError):
+        asyncio.run(fetch_public('http://93.184.216.34/a.png'))
+    assert len(calls) == 1
+    assert calls[0][1]['follow_redirects'] is False
+    assert calls[0][1]['connect_ip'] == '93.184.216.34'
+
+
+def test_fetch_public_follows_public_redirects(monkeypatch):
+    monkeypatch.setattr(image_proxy, 'ALLOW_PRIVATE_HOSTS', False)
+    responses = [
+        {'status': 301, 'headers': {'location': '/img/b.png'}, 'content': None},
+        {'status': 200, 'headers': {}, 'content': b'ok'},
+    ]
+    calls = []
+
+    async def fake_fetch(url, **options):
+        calls.append(url)
+        return responses[len(calls) - 1]
+
+    monkeypatch.setattr(image_proxy, 'fetch', fake_fetch)
+    assert asyncio.run(fetch_public('http://93.184.216.34/a.png'))['content'] == b'ok'
+    assert calls == ['http://93.184.216.34/a.png', 'http://93.184.216.34/img/b.png']
+
+
+def test_render_refuses_decompression_bombs(monkeypatch):
+    Image = pytest.importorskip('PIL.Image')
+    monkeypatch.setattr(image_proxy, 'MAX_PIXELS', 100 * 100)
+    out = io.BytesIO()
+    Image.new('L', (1000, 1000)).save(out, 'PNG')
+    with pytest.raises(ImageProxyError) as error:
+        image_proxy._render(out.getvalue(), (64,))
+    assert error.value.status == 413
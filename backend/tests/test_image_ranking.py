@@ -0,0 +1,43 @@
+import image_extract
+from image_extract import extract_images
+
+SITE = 'https://shop.example.com/p/gloves'
+
+
+def _gallery(count):
+    return ''.join(
+        f'<div class="product-gallery"><img src="/media/nitrile-gloves-{i}.jpg" alt="Nitrile Gloves view {i}"></div>'
+        for i in range(count)
+    )
+
+
+def test_only_the_top_k_images_are_returned(monkeypatch):
+    monkeypatch.setattr(image_extract, 'IMAGE_TOP_K', 3)
+    images = extract_images(_gallery(8), 'Nitrile Gloves', SITE)
+    # Equal scores keep page order
+    assert [image['url'] for image in images] == [f'https://shop.example.com/media/nitrile-gloves-{i}.jpg' for i in range(3)]
+
+
+def test_a_suggestive_url_alone_is_not_enough():
+    html = '<img src="/product/banner-sale.jpg" alt="Spring sale"><img src="/medical/supply-hours.png">'
+    assert extract_images(html, 'Nitrile Gloves', SITE) == []
+
+
+def test_keyword_overlap_and_product_markup_rank_higher():
+    html = """
+      <img src="/media/gloves.jpg" alt="Gloves">
+      <img src="/media/nitrile-exam-gloves.jpg" alt="Nitrile Exam Gloves">
+      <div class="product-image"><img src="/media/box.jpg" alt="Nitrile Exam Gloves box"></div>
+    """
+    urls = [image['url'].rsplit('/', 1)[1] for image in extract_images(html, 'Nitrile Exam Gloves', SITE)]
+    # A one-word match falls below IMAGE_SEARCH_MIN_SCORE
+    assert urls == ['box.jpg', 'nitrile-exam-gloves.jpg']
+
+
+def test_larger_size_hints_win_between_equal_matches():
+    html = """
+      <img src="/media/gloves-a.jpg" alt="Nitrile Gloves" width="120">
+      <img src="/media/gloves-b.jpg" alt="Nitrile Gloves" srcset="/media/gloves-b.jpg 900w">
+    """
+    urls = [image['url'].rsplit('/', 1)[1] for image in extract_images(html, 'Nitrile Gloves', SITE)]
+    assert urls == ['gloves-b.jpg', 'gloves-a.jpg']
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pandas as pd
+
+import inventory_import
+from inventory_import import chunk_records, estimate_tokens, import_frames, parse_chunks
+
+
+def test_chunks_split_records_by_token_budget():
+    records = [{'name': f'item {i}', 'code': i} for i in range(50)]
+    chunks = [json.loads(chunk) for chunk in chunk_records(records, max_tokens=40)]
+    assert len(chunks) > 1
+    assert [record for chunk in chunks for record in chunk] == records
+    for chunk in chunks:
+        assert sum(estimate_tokens(json.dumps(record)) for record in chunk) <= 40
+
+
+def test_parse_chunks_bounds_concurrency_and_merges_by_code():
+    in_flight = 0
+    peak = 0
+
+    async def parse(chunk):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if chunk == 'bad':
+            raise ValueError('unparseable')
+        return [{'item_code': 'A1', 'product_name': '', 'unit_size': chunk}, {'item_code': chunk, 'product_name': chunk}]
+
+    chunks = ['a', 'bad', 'b', 'c', 'd']
+    parsed = asyncio.run(parse_chunks(chunks, parse, concurrency=2))
+
+    assert peak == 2
+    assert parsed['chunks'] == 5
+    assert parsed['failed_chunks'] == [1]
+    codes = [item['item_code'] for item in parsed['items']]
+    assert codes == ['A1', 'a', 'b', 'c', 'd']
+
+
+def test_progress_total_is_unknown_until_the_input_is_exhausted():
+    calls = []
+    produced = 0
+
+    def chunks():
+        nonlocal produced
+        for chunk in ['a', 'b', 'c']:
+            produced += 1
+            yield chunk
+
+    async def parse(chunk):
+        return []
+
+    def on_progress(completed, total):
+        calls.append((completed, total))
+        # Only a known total may ever equal the completed count
+        assert total is None or produced == 3
+
+    asyncio.run(parse_chunks(chunks(), parse, concurrency=1, on_progress=on_progress))
+    assert calls[-1] == (3, 3)
+    assert [call for call in calls if call[1] is not None] == [(3, 3)]
+
+
+def test_import_frames_reports_the_total_only_at_the_end(monkeypatch):
+    async def no_gpt(samples, fields):
+        return {}
+
+    monkeypatch.setattr(inventory_import, 'map_columns_with_gpt', no_gpt)
+    frames = iter([
+        pd.DataFrame({'Product Name': ['Gauze'], 'Item Code': ['G-1'], 'On Hand': ['3']}),
+        pd.DataFrame({'Product Name': ['Tape'], 'Item Code': ['T-1'], 'On Hand': ['5']}),
+    ])
+    calls = []
+    parsed = asyncio.run(import_frames(frames, on_progress=lambda done, total: calls.append((done, total))))
+
+    assert [item['item_code'] for item in parsed['items']] == ['G-1', 'T-1']
+    assert calls == [(1, None), (2, None), (2, 2)]
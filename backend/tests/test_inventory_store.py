@@ -0,0 +1,66 @@
+import pytest
+
+from storage import ProcurementStore, SkuConflictError
+
+
+def _store(tmp_path):
+    return ProcurementStore(str(tmp_path / 'store.db'), seed_path=None)
+
+
+def test_partial_update_keeps_sku_and_name(tmp_path):
+    store = _store(tmp_path)
+    [item_id] = store.upsert_items([{'id': 'item-1', 'sku': 'SKU-1', 'name': 'Gauze', 'currentStock': 5}])
+
+    store.upsert_items([{'id': item_id, 'currentStock': 9}])
+    item = store.get_item('SKU-1')
+    assert item['id'] == 'item-1'
+    assert item['name'] == 'Gauze'
+    assert item['currentStock'] == 9
+    assert store.connection().execute("SELECT sku, name FROM items WHERE id = 'item-1'").fetchone()[:] == ('SKU-1', 'Gauze')
+
+
+def test_items_without_id_merge_by_sku(tmp_path):
+    store = _store(tmp_path)
+    first = store.upsert_items([{'id': 'item-1', 'sku': 'SKU-1', 'name': 'Gauze'}])
+    again = store.upsert_items([{'sku': 'SKU-1', 'currentStock': 3}])
+    assert again == first
+
+
+def test_sku_of_another_item_is_a_conflict(tmp_path):
+    store = _store(tmp_path)
+    store.upsert_items([{'id': 'item-1', 'sku': 'SKU-1', 'name': 'Gauze'}])
+    store.upsert_items([{'id': 'item-2', 'sku': 'SKU-2', 'name': 'Tape'}])
+
+    with pytest.raises(SkuConflictError):
+        store.upsert_items([{'id': 'item-2', 'sku': 'SKU-1'}])
+    with pytest.raises(SkuConflictError):
+        store.update_item('item-2', {'sku': 'SKU-1'})
+    assert store.get_item('item-2')['sku'] == 'SKU-2'
+
+
+def test_conflicting_skus_within_one_batch_roll_back(tmp_path):
+    store = _store(tmp_path)
+    with pytest.raises(SkuConflictError):
+        store.upsert_items([{'id': 'a', 'sku': 'SKU-1'}, {'id': 'b', 'sku': 'SKU-1'}])
+    assert store.get_item('a') is None
+
+
+def test_reuploaded_rows_without_codes_update_by_name(tmp_path):
+    store = _store(tmp_path)
+    first = store.upsert_items([{'product_name': 'Nitrile Gloves', 'current_stock': 4}])
+    again = store.upsert_items([{'product_name': '  nitrile   GLOVES ', 'current_stock': 7}])
+    assert again == first
+    assert len(store.list_items()) == 1
+    assert store.get_item(first[0])['currentStock'] == 7
+
+
+def test_unmapped_upload_fields_keep_existing_values(tmp_path):
+    store = _store(tmp_path)
+    [item_id] = store.upsert_items([{'product_name': 'Gauze', 'item_code': 'G-1', 'unit_size': '100/bx'}])
+    item = store.get_item(item_id)
+    assert (item['currentStock'], item['reorderLevel'], item['unitType']) == (0, 0, 'each')
+
+    store.upsert_items([{'id': item_id, 'currentStock': 12, 'unitType': 'bx'}])
+    store.upsert_items([{'product_name': 'Gauze', 'item_code': 'G-1', 'unit_size': ''}])
+    item = store.get_item(item_id)
+    assert (item['currentStock'], item['unitType'], item['packaging']) == (12, 'bx', '100/bx')
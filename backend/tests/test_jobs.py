@@ -0,0 +1,44 @@
+import time
+
+from jobs import JobPrinter
+from storage import ProcurementStore
+
+
+def _store(tmp_path):
+    return ProcurementStore(str(tmp_path / 'store.db'))
+
+
+def test_progress_events_extend_expiry(tmp_path):
+    store = _store(tmp_path)
+    store.create_job('job-1', 'search', {}, ttl=10)
+    created = store.get_job('job-1')['expires_at']
+
+    JobPrinter(store, 'job-1', ttl=3600).update_item('search', 'Searching...')
+    job = store.get_job('job-1')
+    assert job['expires_at'] > created + 3000
+    assert store.job_events('job-1')[0]['content'] == 'Searching...'
+
+
+def test_stale_unfinished_jobs_are_failed(tmp_path):
+    store = _store(tmp_path)
+    store.create_job('stale', 'search', {}, ttl=60)
+    store.set_job_status('stale', 'running', ttl=60)
+    store.create_job('alive', 'search', {}, ttl=60)
+    store.create_job('done', 'search', {}, ttl=60)
+    store.finish_job('done', 'succeeded', ttl=60, result={'ok': True})
+    store.connection().execute("UPDATE jobs SET updated_at = ? WHERE id IN ('stale', 'done')", (time.time() - 600,))
+
+    store.touch_jobs(['alive'], ttl=60)
+    assert store.fail_stale_jobs(stale_after=300, ttl=60) == 1
+    assert store.get_job('stale')['status'] == 'failed'
+    assert store.get_job('alive')['status'] == 'queued'
+    assert store.get_job('done')['status'] == 'succeeded'
+
+
+def test_heartbeat_skips_finished_jobs(tmp_path):
+    store = _store(tmp_path)
+    store.create_job('done', 'search', {}, ttl=60)
+    store.finish_job('done', 'cancelled', ttl=5, error='Cancelled')
+    expires_at = store.get_job('done')['expires_at']
+    store.touch_jobs(['done'], ttl=3600)
+    assert store.get_job('done')['expires_at'] == expires_at
@@ -0,0 +1,79 @@
+import asyncio
+
+import page_cache
+from page_cache import PageCache, freshness
+from storage import ProcurementStore
+
+
+def test_freshness_follows_cache_control():
+    assert freshness({'cache-control': 'no-store'}) is None
+    assert freshness({'cache-control': 'no-cache, max-age=60'}) == 0.0
+    assert freshness({'cache-control': 'public, max-age=60'}) == 60.0
+    assert freshness({'cache-control': 'max-age=99999999'}) == page_cache.PAGE_CACHE_MAX_TTL
+    assert freshness({}) == page_cache.PAGE_CACHE_TTL
+
+
+def _cache(tmp_path, responses, requests, max_bytes=1024 * 1024):
+    async def fake_fetch(url, headers=None):
+        requests.append(headers or {})
+        return responses.pop(0)
+
+    cache = PageCache(ProcurementStore(str(tmp_path / 'store.db'), seed_path=None), str(tmp_path / 'pages'), max_bytes)
+    return cache, fake_fetch
+
+
+def test_fresh_pages_skip_the_network(tmp_path, monkeypatch):
+    requests = []
+    cache, fake_fetch = _cache(tmp_path, [
+        {'status': 200, 'text': '<html>v1</html>', 'headers': {'cache-control': 'max-age=600', 'etag': '"v1"'}},
+    ], requests)
+    monkeypatch.setattr(page_cache, 'fetch', fake_fetch)
+
+    first = asyncio.run(cache.get('https://a.com/p'))
+    second = asyncio.run(cache.get('https://a.com/p'))
+    assert first['text'] == second['text'] == '<html>v1</html>'
+    assert second['cached'] and len(requests) == 1
+
+
+def test_stale_pages_are_revalidated(tmp_path, monkeypatch):
+    requests = []
+    cache, fake_fetch = _cache(tmp_path, [
+        {'status': 200, 'text': '<html>v1</html>', 'headers': {'cache-control': 'no-cache', 'etag': '"v1"'}},
+        {'status': 304, 'text': None, 'headers': {'cache-control': 'no-cache'}},
+    ], requests)
+    monkeypatch.setattr(page_cache, 'fetch', fake_fetch)
+
+    first = asyncio.run(cache.get('https://a.com/p'))
+    second = asyncio.run(cache.get('https://a.com/p'))
+    assert requests[1] == {'If-None-Match': '"v1"'}
+    assert second['text'] == '<html>v1</html>'
+    assert second['digest'] == first['digest']
+
+
+def test_images_are_cached_per_page_version(tmp_path, monkeypatch):
+    cache, fake_fetch = _cache(tmp_path, [
+        {'status': 200, 'text': '<html>v1</html>', 'headers': {'cache-control': 'no-cache'}},
+        {'status': 200, 'text': '<html>v2</html>', 'headers': {'cache-control': 'no-cache'}},
+    ], [])
+    monkeypatch.setattr(page_cache, 'fetch', fake_fetch)
+
+    page = asyncio.run(cache.get('https://a.com/p'))
+    cache.put_images(page, 'r1:gloves', [{'url': 'https://a.com/g.jpg'}])
+    assert cache.images(page, 'r1:gloves') == [{'url': 'https://a.com/g.jpg'}]
+    assert cache.images(page, 'r1:masks') is None
+
+    changed = asyncio.run(cache.get('https://a.com/p'))
+    assert cache.images(changed, 'r1:gloves') is None
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path, monkeypatch):
+    cache, fake_fetch = _cache(tmp_path, [
+        {'status': 200, 'text': 'a' * 60, 'headers': {'cache-control': 'max-age=600'}},
+        {'status': 200, 'text': 'b' * 60, 'headers': {'cache-control': 'max-age=600'}},
+    ], [], max_bytes=100)
+    monkeypatch.setattr(page_cache, 'fetch', fake_fetch)
+
+    asyncio.run(cache.get('https://a.com/1'))
+    asyncio.run(cache.get('https://a.com/2'))
+    assert cache.store.get_page(page_cache.page_key('https://a.com/1')) is None
+    assert cache.store.get_page(page_cache.page_key('https://a.com/2')) is not None
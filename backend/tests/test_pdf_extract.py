@@ -0,0 +1,67 @@
+import io
+import os
+
+import PyPDF2
+
+import pdf_extract
+
+
+def _pdf(pages):
+    writer = PyPDF2.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def test_stream_hash_matches_content_hash():
+    data = os.urandom(3 * 1024)
+    stream = io.BytesIO(data)
+    assert pdf_extract.stream_hash(stream, chunk_size=1000) == pdf_extract.content_hash(data)
+    assert stream.tell() == 0
+
+
+def test_extract_pages_from_bytes_or_stream_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extract, 'CACHE_DIR', str(tmp_path))
+    data = _pdf(3)
+    assert list(pdf_extract.extract_pages(io.BytesIO(data))) == ['', '', '']
+    assert os.path.exists(os.path.join(str(tmp_path), f"{pdf_extract.content_hash(data)}.txt"))
+    assert list(pdf_extract.extract_pages(data)) == ['', '', '']
+
+
+def test_text_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extract, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(pdf_extract, 'PDF_TEXT_CACHE_MAX_BYTES', 250)
+    pdf_extract._store_pages('old', ['a' * 100])
+    pdf_extract._store_pages('used', ['b' * 100])
+    assert pdf_extract.cached_pages('old') == ['a' * 100]
+
+    pdf_extract._store_pages('new', ['c' * 100])
+    assert pdf_extract.cached_pages('used') is None
+    assert pdf_extract.cached_pages('old') == ['a' * 100]
+    assert pdf_extract.cached_pages('new') == ['c' * 100]
+
+
+def test_large_documents_are_extracted_in_the_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extract, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(pdf_extract, 'PARALLEL_MIN_PAGES', 2)
+    monkeypatch.setattr(pdf_extract, 'PAGES_PER_TASK', 2)
+    monkeypatch.setattr(pdf_extract, 'EXTRACT_WORKERS', 2)
+    monkeypatch.setattr(pdf_extract, '_pool', None)
+    try:
+        assert list(pdf_extract.extract_pages(_pdf(5))) == [''] * 5
+    finally:
+        pdf_extract._pool.shutdown()
+
+
+def test_pool_inherited_through_a_fork_is_replaced(monkeypatch):
+    inherited = object()
+    monkeypatch.setattr(pdf_extract, '_pool', inherited)
+    monkeypatch.setattr(pdf_extract, '_pool_pid', os.getpid() + 1)
+    pool = pdf_extract._get_pool()
+    try:
+        assert pool is not inherited
+        assert pdf_extract._get_pool() is pool
+    finally:
+        pool.shutdown()
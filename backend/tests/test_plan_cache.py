@@ -0,0 +1,51 @@
+from plan_cache import PlanCache, canonicalize
+
+
+def test_canonicalize_splits_words_and_identifiers():
+    words, identifiers = canonicalize('Show me some Nitrile Gloves, size 7.5 (model AB-100)')
+    assert words == {'nitrile', 'glove', 'size', 'model'}
+    assert identifiers == {'7.5', 'ab100'}
+
+
+def test_near_duplicate_queries_hit():
+    cache = PlanCache(size=10, ttl=60, similarity=0.6)
+    cache.put('nitrile gloves medium', ['a.com'])
+    assert cache.get('Medium nitrile glove please') == ['a.com']
+    assert cache.get('nitrile gloves medium box') == ['a.com']
+
+
+def test_identifiers_must_match_exactly():
+    cache = PlanCache(size=10, ttl=60, similarity=0.5)
+    cache.put('syringe 10ml', ['a.com'])
+    assert cache.get('syringe 5ml') is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PlanCache(size=2, ttl=60)
+    cache.put('gauze', 1)
+    cache.put('tape', 2)
+    cache.get('gauze')
+    cache.put('masks', 3)
+    assert cache.get('tape') is None
+    assert cache.get('gauze') == 1
+
+
+def test_expired_entries_miss():
+    cache = PlanCache(size=10, ttl=-1)
+    cache.put('gauze', 1)
+    assert cache.get('gauze') is None
+
+
+def test_intent_verbs_are_not_filler():
+    cache = PlanCache(size=10, ttl=60)
+    cache.put('find nitrile gloves', {'action': 'search'})
+    assert cache.get('need nitrile gloves') is None
+    assert canonicalize('want gloves')[0] == {'want', 'glove'}
+
+
+def test_entries_from_another_version_miss():
+    cache = PlanCache(size=10, ttl=60)
+    cache.put('gauze', ['a.com'], version='v1')
+    assert cache.get('gauze', version='v1') == ['a.com']
+    assert cache.get('gauze', version='v2') is None
+    assert cache.get('gauze', version='v1') is None
@@ -0,0 +1,28 @@
+import json
+import logging
+
+import printer
+
+
+def test_log_sink_configures_its_logger(monkeypatch, capsys):
+    monkeypatch.setenv('PROGRESS_SINK', 'log')
+    monkeypatch.setattr(printer.logger, 'handlers', [])
+    monkeypatch.setattr(printer.logger, 'propagate', True)
+    monkeypatch.setattr(printer.logger, 'level', logging.NOTSET)
+
+    sink = printer.make_printer()
+    assert isinstance(sink, printer.LogPrinter)
+    sink.update_item('search', 'Searching...', is_done=True)
+    printer.make_printer()
+
+    lines = capsys.readouterr().err.strip().splitlines()
+    assert len(printer.logger.handlers) == 1
+    assert len(lines) == 1
+    assert json.loads(lines[0].split(' procurement.progress ', 1)[1]) == {
+        'item': 'search', 'done': True, 'content': 'Searching...'
+    }
+
+
+def test_none_sink_is_silent(monkeypatch):
+    monkeypatch.setenv('PROGRESS_SINK', 'none')
+    assert type(printer.make_printer()) is printer.NullPrinter
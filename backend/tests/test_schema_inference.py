@@ -0,0 +1,63 @@
+import pandas as pd
+
+from schema_inference import infer_column_mapping, map_dataframe, normalize_header
+
+
+def test_normalize_header_spells_out_symbols():
+    assert normalize_header('Mfg Prod Item #') == 'mfg prod item number'
+    assert normalize_header(' Qty/On-Hand ') == 'qty on hand'
+
+
+def test_maps_common_headers():
+    mapping = infer_column_mapping([
+        'Product Description', 'Vendor Item Number', 'UOM', 'Units Per Case', 'On Hand', 'Par Level',
+    ])
+    assert mapping == {
+        'product_name': 'Product Description',
+        'item_code': 'Vendor Item Number',
+        'unit_type': 'UOM',
+        'unit_size': 'Units Per Case',
+        'current_stock': 'On Hand',
+        'reorder_level': 'Par Level',
+    }
+
+
+def test_maps_vendor_export_headers():
+    mapping = infer_column_mapping(['Mfgr Name', 'Mfg Prod Item #', 'Prod Desc', '# items in a case', 'Case Price'])
+    assert mapping == {
+        'item_code': 'Mfg Prod Item #',
+        'product_name': 'Prod Desc',
+        'unit_size': '# items in a case',
+    }
+
+
+def test_price_columns_are_not_unit_types():
+    mapping = infer_column_mapping(['Price', 'Unit Price', 'Product Name'])
+    assert mapping == {'product_name': 'Product Name'}
+
+
+def test_cost_columns_are_not_unit_types():
+    mapping = infer_column_mapping(['Item', 'Unit Cost', 'Reorder Point'])
+    assert mapping == {'product_name': 'Item', 'reorder_level': 'Reorder Point'}
+
+
+def test_vendor_name_is_not_a_product_name():
+    mapping = infer_column_mapping(['Vendor Name', 'Mfgr Item Code', 'Qty On Hand'])
+    assert mapping == {'item_code': 'Mfgr Item Code', 'current_stock': 'Qty On Hand'}
+
+
+def test_each_column_maps_once():
+    mapping = infer_column_mapping(['Stock', 'Stock Qty'])
+    assert list(mapping.values()).count('Stock') <= 1
+    assert mapping['current_stock'] == 'Stock'
+
+
+def test_map_dataframe_derives_unit_type_and_names():
+    df = pd.DataFrame({'Code': ['A1', 'B2'], 'Pack': ['100/bx', '10'], 'Qty': ['1,200', '']})
+    rows = map_dataframe(df, {'item_code': 'Code', 'unit_size': 'Pack', 'current_stock': 'Qty'})
+    assert rows[0]['product_name'] == 'A1'
+    assert rows[0]['unit_type'] == 'bx'
+    assert rows[0]['current_stock'] == 1200
+    assert rows[1]['current_stock'] == 0
+    assert 'unit_type' not in rows[1]
+    assert 'reorder_level' not in rows[0]
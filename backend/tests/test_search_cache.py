@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+from search_cache import SearchCache
+from storage import ProcurementStore
+
+
+def _cache(tmp_path, **kwargs):
+    return SearchCache(ProcurementStore(str(tmp_path / 'store.db'), seed_path=None), **kwargs)
+
+
+def test_hits_ignore_scheme_case_and_spacing(tmp_path):
+    cache = _cache(tmp_path, ttl=60)
+    cache.put('https://www.HeyMedSupply.com/', 'Nitrile  gloves', [{'name': 'Gloves'}])
+    assert cache.get('heymedsupply.com', ' nitrile gloves') == ([{'name': 'Gloves'}], True)
+    assert cache.get('heymedsupply.com', 'latex gloves') == (None, False)
+
+
+def test_stale_entries_are_served_until_max_stale(tmp_path):
+    cache = _cache(tmp_path, ttl=0, max_stale=60)
+    cache.put('a.com', 'gauze', [{'name': 'Gauze'}])
+    time.sleep(0.01)
+    assert cache.get('a.com', 'gauze') == ([{'name': 'Gauze'}], False)
+
+    expired = _cache(tmp_path, ttl=0, max_stale=0)
+    assert expired.get('a.com', 'gauze') == (None, False)
+
+
+def test_one_background_refresh_per_key_updates_the_entry(tmp_path):
+    cache = _cache(tmp_path, ttl=60)
+    cache.put('a.com', 'gauze', [{'name': 'Old'}])
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        started.set()
+        await asyncio.get_running_loop().run_in_executor(None, release.wait, 5)
+        return [{'name': 'New'}]
+
+    assert cache.refresh_in_background('a.com', 'gauze', fetch)
+    assert started.wait(5)
+    assert not cache.refresh_in_background('https://a.com', 'Gauze', fetch)
+    release.set()
+
+    deadline = time.time() + 5
+    while cache.get('a.com', 'gauze')[0] != [{'name': 'New'}] and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get('a.com', 'gauze')[0] == [{'name': 'New'}]
+    assert calls == [1]
+
+
+def test_repeat_website_searches_skip_the_agent(tmp_path, monkeypatch):
+    import manager
+
+    cache = _cache(tmp_path, ttl=60)
+    fetched = []
+
+    async def fetch(self, website, query):
+        fetched.append((website, query))
+        return [{'name': 'Gloves', 'price': '$5', 'url': 'https://a.com/g', 'website': website}]
+
+    monkeypatch.setattr(manager, 'get_search_cache', lambda: cache)
+    monkeypatch.setattr(manager.ProcurementManager, '_fetch_website', fetch)
+    procurement = manager.ProcurementManager()
+
+    first = asyncio.run(procurement._search_website('https://a.com/', 'gloves'))
+    again = asyncio.run(procurement._search_website('https://a.com/', 'Gloves'))
+    assert again == first
+    assert fetched == [('https://a.com/', 'gloves')]
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import threading
+
+from streaming import format_ndjson, format_sse, iterate_events
+
+
+def test_events_arrive_in_order_as_they_are_produced():
+    release = threading.Event()
+
+    async def events():
+        yield {'type': 'search_progress', 'website': 'a.com'}
+        # The first event must reach the consumer before the next one exists
+        await asyncio.get_running_loop().run_in_executor(None, release.wait, 5)
+        yield {'type': 'search_results', 'website': 'a.com'}
+        yield {'type': 'formatted_results'}
+
+    stream = iterate_events(events)
+    assert next(stream)['type'] == 'search_progress'
+    release.set()
+    assert [event['type'] for event in stream] == ['search_results', 'formatted_results']
+
+
+def test_closing_the_stream_cancels_the_producer():
+    cancelled = threading.Event()
+
+    async def events():
+        try:
+            yield {'type': 'agent_update'}
+            await asyncio.sleep(60)
+            yield {'type': 'never'}
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    stream = iterate_events(events)
+    assert next(stream)['type'] == 'agent_update'
+    # What the WSGI server does when the client disconnects
+    stream.close()
+    assert cancelled.is_set()
+
+
+def test_producer_errors_become_an_error_event():
+    async def events():
+        yield {'type': 'agent_update'}
+        raise RuntimeError('search failed')
+
+    assert list(iterate_events(events)) == [
+        {'type': 'agent_update'},
+        {'type': 'error', 'message': 'search failed'},
+    ]
+
+
+def test_sse_and_ndjson_framing():
+    event = {'type': 'search_results', 'products': [{'name': 'Gauze'}]}
+    assert format_sse(event) == f"event: search_results\ndata: {json.dumps(event)}\n\n"
+    assert json.loads(format_ndjson(event)) == event
+    assert format_ndjson(event).endswith('\n')
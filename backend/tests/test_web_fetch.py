@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import llm_client
+import web_fetch
+from web_fetch import FetchError
+
+
+@pytest.fixture
+def site(monkeypatch):
+    """Route the shared fetcher to an in-memory site that records concurrency per host"""
+    state = {'active': {}, 'peak': {}, 'delay': 0.05}
+
+    async def handler(request):
+        host = request.url.host
+        state['active'][host] = state['active'].get(host, 0) + 1
+        state['peak'][host] = max(state['peak'].get(host, 0), state['active'][host])
+        try:
+            await asyncio.sleep(state['delay'])
+        finally:
+            state['active'][host] -= 1
+        if request.url.path == '/missing':
+            return httpx.Response(404)
+        return httpx.Response(200, text=f"page {request.url.path}")
+
+    monkeypatch.setattr(web_fetch, 'FETCH_PER_HOST', 2)
+    monkeypatch.setattr(web_fetch, 'FETCH_CONCURRENCY', 16)
+
+    async def make():
+        fetcher = web_fetch._Fetcher()
+        fetcher.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return fetcher
+
+    fetcher = asyncio.run_coroutine_threadsafe(make(), llm_client.get_client_loop()).result()
+    monkeypatch.setattr(web_fetch, '_fetcher', fetcher)
+    return state
+
+
+def test_fetches_fan_out_across_hosts_but_not_within_one(site):
+    urls = [f"https://{host}/p{i}" for host in ('a.com', 'b.com', 'c.com') for i in range(4)]
+
+    async def fetch_all():
+        return await asyncio.gather(*(web_fetch.fetch_text(url) for url in urls))
+
+    started = time.monotonic()
+    pages = asyncio.run(fetch_all())
+    elapsed = time.monotonic() - started
+
+    assert pages == [f"page /p{i}" for _ in range(3) for i in range(4)]
+    assert site['peak'] == {'a.com': 2, 'b.com': 2, 'c.com': 2}
+    # Two rounds per host, with all three hosts in parallel
+    assert elapsed < 12 * site['delay']
+
+
+def test_deadlines_and_http_errors_raise_fetch_error(site):
+    with pytest.raises(FetchError, match='longer than'):
+        asyncio.run(web_fetch.fetch('https://a.com/slow', deadline=0.01))
+    with pytest.raises(FetchError, match='404'):
+        asyncio.run(web_fetch.fetch('https://a.com/missing'))
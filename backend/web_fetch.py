@@ -0,0 +1,150 @@
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+import llm_client
+
+FETCH_CONCURRENCY = int(os.getenv('WEB_FETCH_CONCURRENCY', '16'))
+FETCH_PER_HOST = int(os.getenv('WEB_FETCH_PER_HOST', '4'))
+FETCH_MAX_KEEPALIVE = int(os.getenv('WEB_FETCH_MAX_KEEPALIVE', '20'))
+# Whole-request budget (connect, wait and body) for one page
+FETCH_DEADLINE = float(os.getenv('WEB_FETCH_DEADLINE', '10'))
+FETCH_CONNECT_TIMEOUT = float(os.getenv('WEB_FETCH_CONNECT_TIMEOUT', '3'))
+FETCH_MAX_BYTES = int(os.getenv('WEB_FETCH_MAX_BYTES', str(3 * 1024 * 1024)))
+
+# Mimic a browser request; several supplier sites refuse obvious bots
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+
+class FetchError(Exception):
+    """A page could not be fetched within its deadline, size limit or status"""
+
+
+class _Fetcher:
+    """
+    One pooled httpx client per process, living on the shared background loop
+    (see llm_client) so keep-alive connections outlast the Flask request that
+    opened them. A global semaphore bounds fetches in flight and a per-host
+    semaphore keeps any one supplier site from getting more than a few.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.client = httpx.AsyncClient(
+            headers=BROWSER_HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(FETCH_DEADLINE, connect=FETCH_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=FETCH_CONCURRENCY,
+                max_keepalive_connections=FETCH_MAX_KEEPALIVE,
+            ),
+        )
+        self.semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    def host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(FETCH_PER_HOST)
+        return self._hosts[host]
+
+    async def fetch(self, url: str, deadline: float, **options: Any) -> Dict[str, Any]:
+        async with self.semaphore, self.host_semaphore(url):
+            try:
+                return await asyncio.wait_for(self._download(url, **options), deadline)
+            except asyncio.TimeoutError:
+                raise FetchError(f"Fetching {url} took longer than {deadline:g}s")
+            except httpx.HTTPError as e:
+                raise FetchError(f"Error fetching {url}: {str(e)}")
+
+    async def _download(self, url: str, headers: Optional[Dict[str, str]] = None, max_bytes: int = FETCH_MAX_BYTES,
+                        truncate: bool = False, binary: bool = False, follow_redirects: bool = True,
+                        connect_ip: Optional[str] = None) -> Dict[str, Any]:
+        request_url, extensions = url, {}
+        if connect_ip:
+            # Connect to the address the caller vetted, not whatever DNS answers now;
+            # Host and SNI still carry the real name so virtual hosts and TLS checks work
+            parts = urlsplit(url)
+            host = f"[{connect_ip}]" if ':' in connect_ip else connect_ip
+            request_url = urlunsplit((
+                parts.scheme, f"{host}:{parts.port}" if parts.port else host, parts.path, parts.query, ''
+            ))
+            headers = {**(headers or {}), 'Host': f"{parts.hostname}:{parts.port}" if parts.port else parts.hostname}
+            if parts.scheme == 'https':
+                extensions['sni_hostname'] = parts.hostname
+        async with self.client.stream('GET', request_url, headers=headers, follow_redirects=follow_redirects,
+                                      extensions=extensions) as response:
+            if response.status_code == 304 or (not follow_redirects and response.is_redirect):
+                return {'status': response.status_code, 'text': None, 'content': None, 'headers': response.headers}
+            response.raise_for_status()
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+                if len(body) > max_bytes:
+                    if not truncate:
+                        raise FetchError(f"{url} is larger than {max_bytes} bytes")
+                    # Closing the stream early drops the rest of the body
+                    del body[max_bytes:]
+                    break
+            content = bytes(body)
+            return {
+                'status': response.status_code,
+                'text': None if binary else content.decode(response.encoding or 'utf-8', errors='replace'),
+                'content': content if binary else None,
+                'headers': response.headers,
+            }
+
+
+_fetcher: Optional[_Fetcher] = None
+_fetcher_lock = threading.Lock()
+
+
+async def _get_fetcher() -> _Fetcher:
+    """Runs on the background loop, where the client and semaphores must be created"""
+    global _fetcher
+    if _fetcher is None or _fetcher.pid != os.getpid():
+        with _fetcher_lock:
+            if _fetcher is None or _fetcher.pid != os.getpid():
+                _fetcher = _Fetcher()
+    return _fetcher
+
+
+async def fetch(url: str, deadline: float = FETCH_DEADLINE, headers: Optional[Dict[str, str]] = None,
+                max_bytes: int = FETCH_MAX_BYTES, truncate: bool = False, binary: bool = False,
+                follow_redirects: bool = True, connect_ip: Optional[str] = None) -> Dict[str, Any]:
+    """
+    GET a URL through the shared pooled client. Returns its status, response
+    headers and either the decoded text or, with `binary`, the raw content
+    (both None for a 304, or for a redirect when `follow_redirects` is off).
+    Raises FetchError on HTTP errors, timeouts past `deadline` seconds and
+    bodies over `max_bytes`, unless `truncate` asks for just the first
+    `max_bytes`. `connect_ip` pins the connection to an already-resolved address.
+    """
+    async def run() -> Dict[str, Any]:
+        fetcher = await _get_fetcher()
+        return await fetcher.fetch(
+            url, deadline, headers=headers, max_bytes=max_bytes, truncate=truncate, binary=binary,
+            follow_redirects=follow_redirects, connect_ip=connect_ip
+        )
+
+    loop = llm_client.get_client_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        return await run()
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(run(), loop))
+
+
+async def fetch_text(url: str, deadline: float = FETCH_DEADLINE) -> str:
+    """GET a page and return its decoded body"""
+    return (await fetch(url, deadline))['text']
@@ -3,6 +3,9 @@ from agents import Agent, FileSearchTool
 from agents.model_settings import ModelSettings
 from typing import List, Dict, Any
 
+# Used when the caller has no registered vector store id
+DEFAULT_VECTOR_STORE_ID = "vs_67e32445d4788191a105ba3c378106da"
+
 class ComplianceResult(BaseModel):
     """Result of a compliance check for a single product"""
     product_name: str
@@ -37,21 +40,42 @@ Be thorough but concise in your assessments. Focus on factual compliance criteri
 Ensure to extract and document relevant drug information from compliance documents.
 """
 
-def create_compliance_agent(file_id: str, vector_store_id: str = None) -> Agent:
-    """Create a compliance checking agent with access to uploaded compliance docs"""
-    
-    return Agent(
-        name="Compliance Checker",
-        instructions=INSTRUCTIONS,
-        tools=[
+BATCH_INSTRUCTIONS = INSTRUCTIONS + """
+You will be given several numbered products at once. Return exactly one result per product,
+in the same order, and copy each product's name verbatim into product_name.
+"""
+
+LOCAL_PASSAGES_INSTRUCTIONS = """
+The relevant compliance passages are included in the message, numbered and labelled with their
+source document. Base every decision on those passages and cite the document in matched_file_info.
+"""
+
+def create_compliance_agent(file_id: str, vector_store_id: str = None, batch: bool = False,
+                            file_search: bool = True) -> Agent:
+    """
+    Create a compliance checking agent with access to uploaded compliance docs.
+    With batch=True the agent checks several products per run and returns ComplianceCheckResults.
+    With file_search=False it has no retrieval tool and relies on passages given in the message.
+    """
+    instructions = BATCH_INSTRUCTIONS if batch else INSTRUCTIONS
+    if file_search:
+        tools = [
             FileSearchTool(
                 max_num_results=3,
-                vector_store_ids=["vs_67e32445d4788191a105ba3c378106da"],  # Always pass a list, never None
+                vector_store_ids=[vector_store_id or DEFAULT_VECTOR_STORE_ID],  # Always pass a list, never None
                 include_search_results=True
             )
-        ],
+        ]
+    else:
+        tools = []
+        instructions += LOCAL_PASSAGES_INSTRUCTIONS
+    
+    return Agent(
+        name="Compliance Checker",
+        instructions=instructions,
+        tools=tools,
         model_settings=ModelSettings(
             temperature=0.1  # Low temperature for more consistent compliance decisions
         ),
-        output_type=ComplianceResult
+        output_type=ComplianceCheckResults if batch else ComplianceResult
     )
\ No newline at end of file